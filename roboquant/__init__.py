@@ -19,7 +19,7 @@ from .signal import Signal, SignalType
 from .order import Order
 from .monetary import Amount, Wallet
 from .asset import Asset, Stock, Crypto, Forex, Option
-from .run import run
+from .run import run, arun
 from .timeframe import Timeframe, utcnow
 
 logger = logging.getLogger(__name__)
@@ -50,6 +50,7 @@ __all__ = [
     "Forex",
     "Option",
     "run",
+    "arun",
     "Timeframe",
     "utcnow",
 ]
@@ -48,9 +48,12 @@ class Account:
     - The last time the account was updated.
 
     Only the `broker` updates the account and does this only during its `sync` method.
+
+    A broker that keeps track of the market value of the positions itself, can assign that running total to
+    `_mkt_value`. The account will then use it instead of summing the market value over all the positions.
     """
 
-    __slots__ = "buying_power", "positions", "orders", "last_update", "cash"
+    __slots__ = "buying_power", "positions", "orders", "last_update", "cash", "_mkt_value"
 
     def __init__(self, base_currency: Currency = USD):
         """
@@ -64,6 +67,7 @@ class Account:
         self.orders: list[Order] = []
         self.last_update: datetime = datetime.fromisoformat("1900-01-01T00:00:00+00:00")
         self.cash: Wallet = Wallet()
+        self._mkt_value: Wallet | None = None
 
     @property
     def base_currency(self) -> Currency:
@@ -77,6 +81,9 @@ class Account:
         Returns:
             Wallet: The total market value of all open positions.
         """
+        if self._mkt_value is not None:
+            return self._mkt_value.deepcopy()
+
         result = Wallet()
         for asset, position in self.positions.items():
             result += asset.contract_amount(position.size, position.mkt_price)
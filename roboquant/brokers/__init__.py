@@ -1,4 +1,45 @@
 from .broker import Broker
 from .simbroker import SimBroker
+from .fastsimbroker import FastSimBroker
+from .marginsimbroker import MarginSimBroker
+from .trxlog import TransactionLog
+from .commission import (
+    CommissionModel,
+    PerShareCommission,
+    BpsCommission,
+    TieredCommission,
+    RegulatoryFee,
+    CompositeCommission,
+)
+from .fillmodel import (
+    FillModel,
+    FullFillModel,
+    VolumeFillModel,
+    QuoteDepthFillModel,
+    IntrabarFillModel,
+    Slippage,
+    FixedSlippage,
+    SquareRootImpact,
+)
 
-__all__ = ["Broker", "SimBroker"]
+__all__ = [
+    "Broker",
+    "SimBroker",
+    "FastSimBroker",
+    "MarginSimBroker",
+    "TransactionLog",
+    "CommissionModel",
+    "PerShareCommission",
+    "BpsCommission",
+    "TieredCommission",
+    "RegulatoryFee",
+    "CompositeCommission",
+    "FillModel",
+    "FullFillModel",
+    "VolumeFillModel",
+    "QuoteDepthFillModel",
+    "IntrabarFillModel",
+    "Slippage",
+    "FixedSlippage",
+    "SquareRootImpact",
+]
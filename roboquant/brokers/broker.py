@@ -1,3 +1,4 @@
+import asyncio
 from abc import ABC, abstractmethod
 from datetime import datetime, timedelta, timezone
 
@@ -41,6 +42,27 @@ class Broker(ABC):
         """
         ...
 
+    async def async_place_orders(self, orders: list[Order]):
+        """The coroutine version of `place_orders`, used by `arun`.
+        The default implementation invokes `place_orders` directly.
+
+        Args:
+            orders: The orders to be placed.
+        """
+        self.place_orders(orders)
+
+    async def async_sync(self, event: Event | None = None) -> Account:
+        """The coroutine version of `sync`, used by `arun`.
+        The default implementation invokes `sync` directly.
+
+        Args:
+            event: optional the latest event.
+
+        Returns:
+            The latest account object.
+        """
+        return self.sync(event)
+
     @staticmethod
     def _update_positions(account: Account, event: Event | None, price_type: str = "DEFAULT"):
         """utility methid to update the open positions in the account with the latest market prices found in the event"""
@@ -63,6 +85,14 @@ class LiveBroker(Broker):
         super().__init__()
         self.max_delay = timedelta(minutes=30)
 
+    async def async_place_orders(self, orders: list[Order]):
+        """Place the orders in a separate thread, so the event loop isn't blocked by the network I/O."""
+        await asyncio.to_thread(self.place_orders, orders)
+
+    async def async_sync(self, event: Event | None = None) -> Account:
+        """Sync the account in a separate thread, so the event loop isn't blocked by the network I/O."""
+        return await asyncio.to_thread(self.sync, event)
+
     def guard(self, event: Event | None = None) -> datetime:
         """This method will evaluate an event, and if it occurs to far in the past,
         it will raise a ValueError. Implementations of `LiveBroker` should call this
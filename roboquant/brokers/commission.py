@@ -0,0 +1,117 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+
+import numpy as np
+from numpy.typing import NDArray
+
+
+class CommissionModel(ABC):
+    """Calculates the commissions and fees of executed trades.
+
+    The fees of all the trades in a single `sync` are calculated in one batch, so a model works on arrays. The
+    sizes are positive for BUY trades and negative for SELL trades, and the values are the contract values of the
+    trades. The returned fees are positive and denoted in the currency of the assets.
+    """
+
+    @abstractmethod
+    def calc(self, time: datetime, sizes: NDArray[np.float64], prices: NDArray[np.float64], values: NDArray[np.float64]
+             ) -> NDArray[np.float64]:
+        """Return the fee for each trade"""
+        ...
+
+    def reset(self):
+        """Reset any state of the model, like accumulated volumes. This is invoked when the broker is reset.
+        The default implementation does nothing."""
+
+
+class PerShareCommission(CommissionModel):
+    """Fixed commission per share, with a minimum fee per trade and an optional maximum fee per trade expressed
+    as a fraction of the traded value."""
+
+    def __init__(self, per_share: float = 0.005, minimum: float = 1.0, max_pct: float | None = 0.01):
+        self.per_share = per_share
+        self.minimum = minimum
+        self.max_pct = max_pct
+
+    def calc(self, time, sizes, prices, values):
+        fees = np.maximum(np.abs(sizes) * self.per_share, self.minimum)
+        if self.max_pct is not None:
+            fees = np.minimum(fees, np.abs(values) * self.max_pct)
+        return fees
+
+
+class BpsCommission(CommissionModel):
+    """Commission in basis points of the traded value, with an optional minimum fee per trade"""
+
+    def __init__(self, bps: float = 1.0, minimum: float = 0.0):
+        self.bps = bps
+        self.minimum = minimum
+
+    def calc(self, time, sizes, prices, values):
+        return np.maximum(np.abs(values) * self.bps / 10_000.0, self.minimum)
+
+
+class TieredCommission(CommissionModel):
+    """Commission per share that decreases with the number of shares traded during the calendar month.
+
+    The tiers are a list of `(volume, per_share)` tuples, sorted by volume. The rate of a tier applies once the
+    monthly volume before the trade reaches the volume of that tier, so the first tier should start at zero.
+    For example `[(0, 0.0035), (300_000, 0.002), (3_000_000, 0.0015)]`.
+    """
+
+    def __init__(self, tiers: list[tuple[float, float]], minimum: float = 0.35):
+        assert tiers and tiers[0][0] == 0, "the first tier should start at zero volume"
+        self._thresholds = np.array([volume for volume, _ in tiers], dtype=np.float64)
+        self._rates = np.array([rate for _, rate in tiers], dtype=np.float64)
+        self.minimum = minimum
+        self._month: tuple[int, int] | None = None
+        self._volume = 0.0
+
+    def reset(self):
+        self._month = None
+        self._volume = 0.0
+
+    def calc(self, time, sizes, prices, values):
+        month = (time.year, time.month)
+        if month != self._month:
+            self._month = month
+            self._volume = 0.0
+
+        shares = np.abs(sizes)
+        volume_before = self._volume + np.cumsum(shares) - shares
+        self._volume += float(shares.sum())
+        tier = np.searchsorted(self._thresholds, volume_before, side="right") - 1
+        return np.maximum(shares * self._rates[tier], self.minimum)
+
+
+class RegulatoryFee(CommissionModel):
+    """Regulatory fees that only apply to SELL trades: a fee rate over the traded value (like the SEC fee) and a fee
+    per share with a maximum per trade (like the FINRA trading activity fee)."""
+
+    def __init__(self, value_rate: float = 0.0000278, per_share: float = 0.000166, per_share_max: float = 8.30):
+        self.value_rate = value_rate
+        self.per_share = per_share
+        self.per_share_max = per_share_max
+
+    def calc(self, time, sizes, prices, values):
+        is_sell = sizes < 0.0
+        value_fee = np.abs(values) * self.value_rate
+        share_fee = np.minimum(np.abs(sizes) * self.per_share, self.per_share_max)
+        return np.where(is_sell, value_fee + share_fee, 0.0)
+
+
+class CompositeCommission(CommissionModel):
+    """Sum of the fees of multiple models, for example a broker commission plus exchange and regulatory fees"""
+
+    def __init__(self, *models: CommissionModel):
+        self.models = models
+
+    def reset(self):
+        for model in self.models:
+            model.reset()
+
+    def calc(self, time, sizes, prices, values):
+        fees = np.zeros(len(sizes))
+        for model in self.models:
+            fees += model.calc(time, sizes, prices, values)
+        return fees
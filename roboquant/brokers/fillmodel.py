@@ -0,0 +1,367 @@
+from abc import ABC, abstractmethod
+from typing import Any
+
+import numpy as np
+from numpy.typing import NDArray
+
+from roboquant.event import Bar, PriceItem, Quote
+from roboquant.order import Order
+
+
+class Slippage(ABC):
+    """Slippage determines the execution prices, given the reference prices and the sizes that will be filled.
+    The returned prices should always be less favorable than the reference prices, so higher for BUY fills and
+    lower for SELL fills.
+    """
+
+    @abstractmethod
+    def apply(self, prices: NDArray[np.float64], fills: NDArray[np.float64], item: PriceItem) -> NDArray[np.float64]:
+        """Return the execution prices.
+
+        Args:
+            prices: The reference prices, one for each order.
+            fills: The fill sizes, positive for BUY and negative for SELL fills.
+            item: The price-item of the asset.
+        """
+        ...
+
+
+class FixedSlippage(Slippage):
+    """Slippage of a fixed percentage of the reference price, for example 0.001 for 0.1%"""
+
+    def __init__(self, pct: float = 0.001):
+        self.pct = pct
+
+    def apply(self, prices, fills, item):
+        return prices * (1.0 + np.sign(fills) * self.pct)
+
+
+class SquareRootImpact(Slippage):
+    """Square-root market impact model, where the price impact is:
+
+    `impact = coefficient * volatility * sqrt(|fill| / volume)`
+
+    If no volatility is provided, the relative range of a `Bar` ((high - low) / close) is used as an estimate.
+    Other price-items require the volatility to be provided. If there is no volume known, no impact is applied.
+    """
+
+    def __init__(self, coefficient: float = 1.0, volatility: float | None = None, volume_type: str = "DEFAULT"):
+        self.coefficient = coefficient
+        self.volatility = volatility
+        self.volume_type = volume_type
+
+    def _get_volatility(self, item: PriceItem) -> float:
+        if self.volatility is not None:
+            return self.volatility
+        if isinstance(item, Bar):
+            _, high, low, close, _ = item.ohlcv
+            return (high - low) / close if close else 0.0
+        return 0.0
+
+    def apply(self, prices, fills, item):
+        volume = item.volume(self.volume_type)
+        if not volume > 0.0:
+            return prices
+        impact = self.coefficient * self._get_volatility(item) * np.sqrt(np.abs(fills) / volume)
+        return prices * (1.0 + np.sign(fills) * impact)
+
+
+class FillModel(ABC):
+    """A fill model determines how much of the open orders of an asset get filled, and at what price.
+
+    The orders are provided as arrays, in the order they were placed. So the first order has the highest priority
+    in the queue. This allows implementations to evaluate all the orders of an asset with a few vectorized operations.
+
+    Fill models that evaluate the `stop` property of orders themselves set `supports_stop` to True. The broker then
+    passes a `triggered` mask to `fill` and keeps track of the triggered orders across events. For other fill
+    models, the broker only passes orders with a stop price once the stop has been triggered.
+    """
+
+    supports_stop: bool = False
+
+    @abstractmethod
+    def fill(
+        self,
+        item: PriceItem,
+        remaining: NDArray[np.float64],
+        limit: NDArray[np.float64],
+        orders: list[Order],
+        triggered: NDArray[np.bool_] | None = None,
+    ) -> tuple[NDArray[np.float64], NDArray[np.float64]]:
+        """Return the fill sizes and the fill prices for the open orders of a single asset.
+
+        Args:
+            item: The price-item of the asset in the current event.
+            remaining: The remaining sizes of the orders, positive for BUY and negative for SELL orders.
+            limit: The limit prices of the orders.
+            orders: The orders themselves, so implementations can access additional order properties and track
+            the state of orders across events using their id.
+            triggered: Only provided to fill models that support stops. The orders whose stop price has been reached
+            in a previous event. The model sets the entries of the orders whose stop price is reached in this
+            price-item to True.
+
+        Returns:
+            A tuple of the fill sizes and the prices. A fill size has the same sign as the remaining size of the order,
+            and is zero if the order isn't filled. A fill should never exceed the remaining size.
+        """
+        ...
+
+    def reset(self):
+        """Reset the state of the fill model, this is invoked when the broker is reset.
+        The default implementation does nothing."""
+
+    def remove(self, order: Order):
+        """Release any state that is kept for an order, this is invoked when the order is completed, cancelled or
+        expired. The default implementation does nothing."""
+
+    @staticmethod
+    def _reference_prices(item: PriceItem, is_buy: NDArray[np.bool_], price_type: str) -> NDArray[np.float64]:
+        """Return the reference price for each order. For quotes this is the ask price for BUY orders and the
+        bid price for SELL orders."""
+        if isinstance(item, Quote):
+            return np.where(is_buy, item.ask_price, item.bid_price)
+        return np.full(len(is_buy), item.price(price_type))
+
+    @staticmethod
+    def _within_limit(prices: NDArray[np.float64], limit: NDArray[np.float64], is_buy: NDArray[np.bool_]) -> NDArray[np.bool_]:
+        return np.where(is_buy, prices <= limit, prices >= limit)
+
+    @staticmethod
+    def _allocate(capacity: float, wanted: NDArray[np.float64]) -> NDArray[np.float64]:
+        """Allocate the capacity to the wanted (absolute) sizes, in the order of priority"""
+        before = np.cumsum(wanted) - wanted
+        return np.clip(capacity - before, 0.0, wanted)
+
+
+class FullFillModel(FillModel):
+    """Fills the remaining size of an order in full, if the execution price is within the limit.
+    No slippage is applied to quotes, since the ask and bid prices already include the spread.
+    With the default settings, this mirrors the default behavior of the `SimBroker`."""
+
+    def __init__(self, price_type: str = "OPEN", slippage: Slippage | None = FixedSlippage()):
+        self.price_type = price_type
+        self.slippage = slippage
+
+    def fill(self, item, remaining, limit, orders):
+        is_buy = remaining > 0.0
+        prices = self._reference_prices(item, is_buy, self.price_type)
+        if self.slippage and not isinstance(item, Quote):
+            prices = self.slippage.apply(prices, remaining, item)
+        fills = np.where(self._within_limit(prices, limit, is_buy), remaining, 0.0)
+        return fills, prices
+
+
+class VolumeFillModel(FillModel):
+    """Caps the fills of all the orders of an asset to a fraction of the volume of the price-item, like the volume
+    of a `Bar` or `Trade`. The available volume is allocated to the orders in the order they were placed, so remaining
+    sizes are filled over the next events.
+
+    Args:
+        participation: The max fraction of the volume that can be filled, default is 0.1 (10%).
+        price_type: The price type to use as reference price.
+        slippage: The slippage to apply, for example a `SquareRootImpact`.
+        size_digits: The number of decimals to round the partial fills down to, default is 0 (whole units).
+    """
+
+    def __init__(
+        self,
+        participation: float = 0.1,
+        price_type: str = "OPEN",
+        slippage: Slippage | None = None,
+        size_digits: int = 0,
+    ):
+        self.participation = participation
+        self.price_type = price_type
+        self.slippage = slippage
+        self.size_digits = size_digits
+
+    def fill(self, item, remaining, limit, orders):
+        is_buy = remaining > 0.0
+        prices = self._reference_prices(item, is_buy, self.price_type)
+        eligible = self._within_limit(prices, limit, is_buy)
+
+        scale = 10.0**self.size_digits
+        capacity = self.participation * item.volume()
+        capacity = np.floor(capacity * scale) / scale if capacity > 0.0 else 0.0
+        wanted = np.where(eligible, np.abs(remaining), 0.0)
+        fills = np.floor(self._allocate(capacity, wanted) * scale) / scale * np.sign(remaining)
+
+        if self.slippage:
+            prices = self.slippage.apply(prices, fills, item)
+            fills = np.where(self._within_limit(prices, limit, is_buy), fills, 0.0)
+        return fills, prices
+
+
+class QuoteDepthFillModel(FillModel):
+    """Fills orders against the displayed depth of a `Quote`. Other types of price-items don't result in fills.
+
+    - Marketable orders (a BUY limit at or above the ask, or a SELL limit at or below the bid) take the
+    ask or bid volume in the order they were placed, and are filled at the ask or bid price.
+    - Passive orders at the touch (a BUY limit equal to the bid, or a SELL limit equal to the ask) join the
+    back of the queue. Every reduction of the displayed volume at that price is assumed to be volume that traded ahead
+    of the order, and once the queue ahead is depleted, the order is filled at its limit. If the price then moves
+    through the limit, the order is filled in full.
+
+    Partial fills leave the remaining size of the order open, so it is filled during the next events.
+    """
+
+    def __init__(self, size_digits: int = 0):
+        self.size_digits = size_digits
+        self._queues: dict[str, tuple[float, float]] = {}
+        """The queue state of passive orders: order id -> (displayed volume, queue ahead)"""
+
+    def _passive_fill(self, order_id: str, at_touch: bool, volume: float, remaining: float) -> float:
+        """Return the fill of a passive order, based on the changes in the displayed volume at its limit."""
+        state = self._queues.pop(order_id, None)
+        if not at_touch:
+            # If the order was in the queue, the price moved through its limit
+            return remaining if state else 0.0
+
+        if state is None:
+            self._queues[order_id] = (volume, volume)
+            return 0.0
+
+        prev_volume, ahead = state
+        ahead -= max(prev_volume - volume, 0.0)
+        fill = min(max(-ahead, 0.0), remaining)
+        if fill < remaining:
+            self._queues[order_id] = (volume, max(ahead, 0.0))
+        return fill
+
+    def reset(self):
+        self._queues = {}
+
+    def remove(self, order):
+        self._queues.pop(order.id, None)  # type: ignore
+
+    def fill(self, item, remaining, limit, orders):
+        fills = np.zeros(len(remaining))
+        prices = limit.copy()
+        if not isinstance(item, Quote):
+            return fills, prices
+
+        is_buy = remaining > 0.0
+        wanted = np.abs(remaining)
+        ask, ask_volume, bid, bid_volume = item.data
+
+        # Marketable orders take the displayed volume at the best price
+        take_buy = is_buy & (limit >= ask)
+        take_sell = ~is_buy & (limit <= bid)
+        fills += self._allocate(ask_volume, np.where(take_buy, wanted, 0.0))
+        fills += self._allocate(bid_volume, np.where(take_sell, wanted, 0.0))
+        prices[take_buy] = ask
+        prices[take_sell] = bid
+
+        # Passive orders that are not behind the best price progress in the queue
+        passive = (is_buy & (limit >= bid) & ~take_buy) | (~is_buy & (limit <= ask) & ~take_sell)
+        for idx in np.flatnonzero(passive):
+            buy = is_buy[idx]
+            at_touch = limit[idx] == (bid if buy else ask)
+            volume = bid_volume if buy else ask_volume
+            fills[idx] = self._passive_fill(orders[idx].id, at_touch, volume, wanted[idx])  # type: ignore
+
+        scale = 10.0**self.size_digits
+        fills = np.floor(fills * scale) / scale * np.sign(remaining)
+        return fills, prices
+
+
+class IntrabarFillModel(FillModel):
+    """Evaluates limit, stop and stop-limit orders against the price path within a `Bar`.
+
+    The path is assumed to be open -> low -> high -> close for bars that close at or above their open, and
+    open -> high -> low -> close otherwise. For other types of price-items the path is a single price, using the ask
+    price for BUY orders and the bid price for SELL orders in case of a `Quote`.
+
+    - A limit order is filled at its limit once the path touches the limit, or at the open price if the
+    bar opens beyond the limit.
+    - An order with a `stop` property, for example `Order(asset, -100, 90.0, stop=95.0)`, is triggered once the path
+    touches the stop price. From that moment on it is a limit order. So a stop-loss that should always execute
+    once triggered, can use a limit that is far away.
+    - Orders with the same `oco` property (one-cancels-other) are evaluated together, and only the order that is
+    touched first within the bar is filled.
+
+    All the orders of an asset are evaluated with a few vectorized operations over the three legs of the path.
+    """
+
+    supports_stop = True
+
+    def __init__(self, slippage: Slippage | None = None):
+        self.slippage = slippage
+
+    @staticmethod
+    def _get_path(item: PriceItem, is_buy: NDArray[np.bool_]) -> NDArray[np.float64]:
+        """Return the price path with shape (4, orders)"""
+        if isinstance(item, Bar):
+            o, h, l, c, _ = item.ohlcv  # noqa: E741
+            path = [o, l, h, c] if c >= o else [o, h, l, c]
+            return np.array(path, dtype=np.float64)[:, None]
+        if isinstance(item, Quote):
+            return np.tile(np.where(is_buy, item.ask_price, item.bid_price), (4, 1))
+        return np.full((4, 1), item.price())
+
+    @staticmethod
+    def _touch(
+        path: NDArray[np.float64], level: NDArray[np.float64], below: NDArray[np.bool_], start: NDArray[np.float64]
+    ) -> tuple[NDArray[np.float64], NDArray[np.float64]]:
+        """Return the first time at or after start that the path touches the level, and the price at that time.
+        The time runs from 0.0 (open) to 3.0 (close), and is infinite if the level isn't touched."""
+        time = np.full(len(level), np.inf)
+        price = np.full(len(level), np.nan)
+        for leg in range(3):
+            a, b = path[leg], path[leg + 1]
+            s = np.maximum(start, leg)
+            active = np.isinf(time) & (s <= leg + 1)
+            p = a + (b - a) * np.where(active, s - leg, 0.0)
+            now = active & np.where(below, p <= level, p >= level)
+            later = active & ~now & np.where(below, b <= level, b >= level)
+            frac = np.divide(level - a, b - a, out=np.zeros(len(level)), where=later & (b != a))
+            time[now] = s[now]
+            price[now] = p[now]
+            time[later] = leg + frac[later]
+            price[later] = level[later]
+        return time, price
+
+    @staticmethod
+    def _first_of_groups(fill_time: NDArray[np.float64], orders: list[Order]) -> NDArray[np.bool_]:
+        """Return a mask of the orders that are not preceded by another order of the same oco group"""
+        keep = np.ones(len(orders), dtype=np.bool_)
+        first: dict[Any, int] = {}
+        for idx in np.flatnonzero(np.isfinite(fill_time)):
+            group = orders[idx].info.get("oco")
+            if group is None:
+                continue
+            other = first.get(group)
+            if other is None:
+                first[group] = idx
+            elif fill_time[idx] < fill_time[other]:
+                keep[other] = False
+                first[group] = idx
+            else:
+                keep[idx] = False
+        return keep
+
+    def fill(self, item, remaining, limit, orders, triggered=None):
+        is_buy = remaining > 0.0
+        path = self._get_path(item, is_buy)
+        stop = np.array([order.info.get("stop", np.nan) for order in orders], dtype=np.float64)
+        pending = ~np.isnan(stop)
+        if triggered is not None:
+            # orders that were triggered in a previous event are limit orders from the open of this price-item
+            pending &= ~triggered
+
+        # A BUY stop is triggered when the price rises to the stop, a SELL stop when the price drops to the stop
+        start = np.zeros(len(orders))
+        if pending.any():
+            trigger_time, _ = self._touch(path, np.where(pending, stop, 0.0), ~is_buy, start)
+            start = np.where(pending, trigger_time, 0.0)
+            if triggered is not None:
+                triggered |= pending & np.isfinite(trigger_time)
+
+        fill_time, prices = self._touch(path, limit, is_buy, start)
+        filled = np.isfinite(fill_time) & self._first_of_groups(fill_time, orders)
+        fills = np.where(filled, remaining, 0.0)
+        prices = np.where(filled, prices, limit)
+
+        if self.slippage:
+            prices = self.slippage.apply(prices, fills, item)
+        return fills, prices
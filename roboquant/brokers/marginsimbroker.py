@@ -0,0 +1,217 @@
+from datetime import timedelta
+import logging
+from typing import Callable
+
+import numpy as np
+from numpy.typing import NDArray
+
+from roboquant.account import Account
+from roboquant.asset import Asset
+from roboquant.brokers.commission import CommissionModel
+from roboquant.brokers.fillmodel import FillModel
+from roboquant.brokers.simbroker import SimBroker, _Trx
+from roboquant.event import Event
+from roboquant.monetary import Amount, Currency, Wallet, USD
+from roboquant.order import Order
+
+logger = logging.getLogger(__name__)
+
+
+class MarginSimBroker(SimBroker):
+    """A `SimBroker` that simulates a margin account.
+
+    Every position requires an initial margin and a maintenance margin, expressed as a fraction of the absolute market
+    value of the position. The margin rates can be set per asset class, for example `{"Crypto": (1.0, 0.5)}`, and
+    default to the `initial_margin` and `maintenance_margin` rates.
+
+    The buying power is the excess equity (equity minus the initial margin of the positions and open orders) divided
+    by the default initial margin rate, so it is expressed as the contract value that can still be bought. It is
+    further capped by the `max_leverage`, the maximum gross exposure as a multiple of the equity.
+
+    If the equity drops below the maintenance margin, positions are liquidated at the execution price of the
+    current event. The positions with the largest maintenance margin are closed first, until the account meets the
+    maintenance margin again. The margin checks are calculated with NumPy over arrays that are indexed by asset, so
+    they stay fast for accounts with many positions.
+    """
+
+    def __init__(
+        self,
+        initial_deposit: Amount = Amount(USD, 1_000_000.0),
+        price_type: str = "OPEN",
+        slippage: float = 0.001,
+        validate: bool = False,
+        fill_model: FillModel | None = None,
+        latency: timedelta | Callable[[], timedelta] | None = None,
+        commission: CommissionModel | dict[str, CommissionModel] | None = None,
+        initial_margin: float = 0.5,
+        maintenance_margin: float = 0.25,
+        asset_class_margins: dict[str, tuple[float, float]] | None = None,
+        max_leverage: float = 4.0,
+        liquidate: bool = True,
+    ):
+        """Create a new MarginSimBroker instance.
+        params:
+        - initial_margin: The default initial margin rate. Default is 0.5, so a leverage of 2
+        - maintenance_margin: The default maintenance margin rate. Default is 0.25
+        - asset_class_margins: The initial and maintenance margin rates per asset class, overriding the defaults
+        - max_leverage: The maximum gross exposure of all the positions and open orders as a multiple of the equity
+        - liquidate: Liquidate positions if the equity drops below the maintenance margin. Default is True
+
+        See the `SimBroker` for the other parameters.
+        """
+        assert 0.0 < maintenance_margin <= initial_margin, "maintenance margin should be between 0 and initial margin"
+        self.initial_margin = initial_margin
+        self.maintenance_margin = maintenance_margin
+        self.asset_class_margins = asset_class_margins or {}
+        self.max_leverage = max_leverage
+        self.liquidate = liquidate
+        super().__init__(initial_deposit, price_type, slippage, validate, fill_model, latency, commission)
+
+    def _init_totals(self):
+        super()._init_totals()
+        self._order_exposures: dict[str, float] = {}
+        self._order_exposure = Wallet()
+        self._margin_idx: dict[Asset, int] = {}
+        self._margin_assets: list[Asset] = []
+        self._currencies: list[Currency] = []
+        self._exposures: NDArray[np.float64] = np.zeros(16)
+        self._initial_rates: NDArray[np.float64] = np.zeros(16)
+        self._maintenance_rates: NDArray[np.float64] = np.zeros(16)
+        self._currency_idx: NDArray[np.int64] = np.zeros(16, dtype=np.int64)
+
+    def _get_rates(self, asset: Asset) -> tuple[float, float]:
+        """Return the initial and maintenance margin rates of an asset"""
+        return self.asset_class_margins.get(asset.asset_class(), (self.initial_margin, self.maintenance_margin))
+
+    def _get_idx(self, asset: Asset) -> int:
+        """Return the index of the asset in the arrays, registering the asset if it is new"""
+        idx = self._margin_idx.get(asset)
+        if idx is None:
+            idx = len(self._margin_assets)
+            if idx == len(self._exposures):
+                # grow the arrays by doubling their capacity
+                self._exposures = np.concatenate([self._exposures, np.zeros(idx)])
+                self._initial_rates = np.concatenate([self._initial_rates, np.zeros(idx)])
+                self._maintenance_rates = np.concatenate([self._maintenance_rates, np.zeros(idx)])
+                self._currency_idx = np.concatenate([self._currency_idx, np.zeros(idx, dtype=np.int64)])
+            if asset.currency not in self._currencies:
+                self._currencies.append(asset.currency)
+            self._margin_idx[asset] = idx
+            self._margin_assets.append(asset)
+            self._initial_rates[idx], self._maintenance_rates[idx] = self._get_rates(asset)
+            self._currency_idx[idx] = self._currencies.index(asset.currency)
+        return idx
+
+    def _update_order_value(self, order: Order):
+        """Update the initial margin reserved for an open order"""
+        assert order.id is not None
+        exposure = self._account.required_buying_power(order).value
+        value = exposure * self._get_rates(order.asset)[0]
+        old_value = self._order_values.get(order.id, 0.0)
+        self._order_values[order.id] = value
+        self._order_value[order.asset.currency] += value - old_value
+        old_exposure = self._order_exposures.get(order.id, 0.0)
+        self._order_exposures[order.id] = exposure
+        self._order_exposure[order.asset.currency] += exposure - old_exposure
+
+    def _remove_order(self, order: Order):
+        assert order.id is not None
+        self._order_exposure[order.asset.currency] -= self._order_exposures.pop(order.id)
+        if not self._order_exposures:
+            self._order_exposure.clear()
+        super()._remove_order(order)
+
+    def _update_position_value(self, asset: Asset):
+        super()._update_position_value(asset)
+        self._exposures[self._get_idx(asset)] = abs(self._position_values.get(asset, 0.0))
+
+    def _calculate_open_orders(self):
+        """Calculate the initial margin required for the open orders"""
+        result = Wallet()
+        for order in self._orders.values():
+            amount = self._account.required_buying_power(order)
+            result[amount.currency] += amount.value * self._get_rates(order.asset)[0]
+        return result
+
+    def _base_exposures(self) -> NDArray[np.float64]:
+        """Return the absolute market value of the positions, denoted in the base currency of the account"""
+        n = len(self._margin_assets)
+        exposures = self._exposures[:n]
+        if len(self._currencies) > 1 or (self._currencies and self._currencies[0] != self._account.base_currency):
+            rates = np.array([self._account.convert(Amount(c, 1.0)) for c in self._currencies])
+            exposures = exposures * rates[self._currency_idx[:n]]
+        return exposures
+
+    def margin_requirements(self) -> tuple[float, float]:
+        """Return the initial and the maintenance margin required for the current positions, denoted in the base
+        currency of the account."""
+        n = len(self._margin_assets)
+        exposures = self._base_exposures()
+        initial = float(exposures @ self._initial_rates[:n])
+        maintenance = float(exposures @ self._maintenance_rates[:n])
+        return initial, maintenance
+
+    def _calculate_buyingpower(self) -> Amount:
+        """Calculate the buying power.
+        The implementation uses the following calculation:
+
+        excess = equity - initial_margin_positions - initial_margin_open_orders
+        buying_power = min(excess / initial_margin, max_leverage * equity - gross_exposure)
+        """
+        acc = self._account
+        equity = acc.equity_value()
+        initial, _ = self.margin_requirements()
+        excess = equity - initial - acc.convert(self._order_value)
+        gross_exposure = float(self._base_exposures().sum()) + acc.convert(self._order_exposure)
+        buying_power = min(excess / self.initial_margin, self.max_leverage * equity - gross_exposure)
+        return Amount(acc.base_currency, buying_power)
+
+    def _liquidate_positions(self, event: Event) -> bool:
+        """Liquidate positions if the equity is below the maintenance margin. Return True if any position
+        was liquidated."""
+        acc = self._account
+        n = len(self._margin_assets)
+        margins = self._base_exposures() * self._maintenance_rates[:n]
+        required = float(margins.sum())
+        equity = acc.equity_value()
+        if equity >= required:
+            return False
+
+        # Close the positions with the largest maintenance margin first. The closing trades include slippage and
+        # fees, so the equity after every close is compared again with the margin of the remaining positions.
+        order = np.argsort(-margins)
+        order = order[margins[order] > 0.0]
+        logger.warning("margin call equity=%s maintenance=%s", equity, required)
+
+        for idx in order.tolist():
+            asset = self._margin_assets[idx]
+            position = acc.positions[asset]
+            for open_order in list(self._asset_orders.get(asset, {}).values()):
+                self._remove_order(open_order)
+
+            close_order = Order(asset, -position.size, position.mkt_price)
+            item = event.price_items.get(asset)
+            price = self._get_execution_price(close_order, item) if item else position.mkt_price
+            trx = self._add_fees([_Trx(asset, -position.size, price)], event.time)[0]
+            logger.info("liquidated position asset=%s trx=%s", asset, trx)
+            self._update_account(trx)
+            self._log_trx(trx, event.time)
+            self._update_asset(asset)
+
+            required -= float(margins[idx])
+            if acc.equity_value() >= required:
+                break
+        return True
+
+    def sync(self, event: Event | None = None) -> Account:
+        acc = super().sync(event)
+        if self.liquidate and event and self._liquidate_positions(event):
+            if self._orders_changed:
+                acc.orders = self._open_orders()
+                self._orders_changed = False
+            acc.buying_power = self._calculate_buyingpower()
+        return acc
+
+    def __repr__(self) -> str:
+        attrs = " ".join([f"{k}={v}" for k, v in self.__dict__.items() if not k.startswith("_")])
+        return f"MarginSimBroker({attrs})"
@@ -1,10 +1,19 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
 from decimal import Decimal
+from typing import Any, Callable
+import heapq
 import logging
+import math
+
+import numpy as np
 
 from roboquant.account import Account, Position
 from roboquant.asset import Asset
 from roboquant.brokers.broker import Broker
+from roboquant.brokers.commission import CommissionModel
+from roboquant.brokers.fillmodel import FillModel
+from roboquant.brokers.trxlog import TransactionLog
 from roboquant.event import Event, Quote, PriceItem
 from roboquant.order import Order
 from roboquant.monetary import Amount, Wallet, USD
@@ -25,20 +34,62 @@ class _Trx:
     price: float
     """The price of the trade denoted in the currency of the asset"""
 
+    fee: float = 0.0
+    """The commissions and fees of the trade denoted in the currency of the asset"""
+
 
 class SimBroker(Broker):
     """Implementation of a Broker that simulates order execution and can be used in back tests.
 
-    This class can be extended to support different types of use-cases, like margin trading.
+    This class can be extended to support different types of use-cases, like margin trading. Fees are calculated
+    by an optional `CommissionModel`, that can be configured per asset class.
+
+    The market value of the positions and the buying power reserved for open orders and short positions are maintained
+    as running totals. They are only updated for the assets that changed, so a `sync` doesn't have to iterate over all
+    the positions and open orders.
+
+    All executed transactions are recorded in the `transactions` log, that can be used for trade level analytics
+    at the end of a run.
+
+    Besides regular limit orders, the following order properties (kwargs) are supported:
+    - `parent`: the id of another order. The order only becomes active once the parent order is completely filled,
+    and is cancelled if the parent order is cancelled or expires. This can be used for bracket orders.
+    - `oco`: an arbitrary group key (one-cancels-other). Once an order of the group gets filled, the other open
+    orders of that group are cancelled.
+    - `stop`: a stop price. A BUY order is triggered once the price rises to the stop price and a SELL order once
+    the price drops to the stop price, and from then on it is a limit order. Fill models that support stops, like the
+    `IntrabarFillModel`, evaluate the trigger within the price-item. Otherwise the broker evaluates it using the
+    `price_type` price, or the ask/bid price of a `Quote`, and the order can be executed in the same event.
     """
 
-    def __init__(self, initial_deposit: Amount=Amount(USD, 1_000_000.0), price_type:str="OPEN", slippage:float=0.001):
+    def __init__(
+        self,
+        initial_deposit: Amount = Amount(USD, 1_000_000.0),
+        price_type: str = "OPEN",
+        slippage: float = 0.001,
+        validate: bool = False,
+        fill_model: FillModel | None = None,
+        latency: timedelta | Callable[[], timedelta] | None = None,
+        commission: CommissionModel | dict[str, CommissionModel] | None = None,
+    ):
         """Create a new SimBroker instance.
         params:
         - initial_deposit: The initial deposit of cash in the account. The currency of the deposit is used as the base currency
         for the account.
         - price_type: The price type to use for the execution, like OPEN, CLOSE, HIGH, LOW
         - slippage: The slippage to use for the execution, a percentage value. Default is 0.1% (0.001)
+        - validate: Validate the running totals against a full recalculation at every sync. This is slow and
+        only intended for debugging. Default is False
+        - fill_model: The fill model to use for the execution, for example a `VolumeFillModel`. If set, the price_type
+        and slippage are not used for the execution. Default is None
+        - latency: The time it takes before a placed order reaches the broker. This is either a fixed timedelta or a
+        function that returns a new timedelta for every order, so the latency can be drawn from a distribution. If
+        set, orders become active at the first event at or after the time of the last event plus the latency.
+        New orders that haven't reached the broker yet are already included in the open orders of the account, so
+        traders can see them, but they don't reserve buying power. Default is None, so orders become active at the
+        next event
+        - commission: The commission model to calculate the fees of the trades, or a dict with a commission model
+        per asset class, like `{"Stock": PerShareCommission()}`. Default is None, so no fees
         """
 
 
@@ -49,10 +100,19 @@ class SimBroker(Broker):
         self._account.cash = Wallet(initial_deposit)
         self._account.buying_power = initial_deposit
         self._order_id = 0
+        self._pending: list[tuple[datetime, int, Order, bool]] = []
+        self._pending_seq = 0
+        self._init_order_book()
+        self._init_totals()
+        self.transactions = TransactionLog()
 
         self.slippage = slippage
         self.price_type = price_type
         self.initial_deposit = initial_deposit
+        self.validate = validate
+        self.fill_model = fill_model
+        self.latency = latency
+        self.commission = commission
 
     def reset(self):
         """Reset the broker with the cash and buying power set to the initial deposit."""
@@ -62,17 +122,156 @@ class SimBroker(Broker):
         self._account.cash = Wallet(self.initial_deposit)
         self._account.buying_power = self.initial_deposit
         self._order_id = 0
+        self._pending: list[tuple[datetime, int, Order, bool]] = []
+        self._pending_seq = 0
+        self._init_order_book()
+        self._init_totals()
+        self.transactions = TransactionLog()
+        if self.fill_model:
+            self.fill_model.reset()
+        models = self.commission.values() if isinstance(self.commission, dict) else [self.commission]
+        for model in models:
+            if model:
+                model.reset()
+
+    def _init_order_book(self):
+        """Initialize the order book. Open orders are indexed by their id and by their asset, so finding, modifying
+        and removing an order is O(1), and only the orders of assets with a price in the event need to be evaluated.
+        Orders with a gtd are also kept in a heap, so expired orders can be found without scanning all orders."""
+        self._orders: dict[str, Order] = {}
+        self._asset_orders: dict[Asset, dict[str, Order]] = {}
+        self._expirations: list[tuple[datetime, str]] = []
+        self._oco_groups: dict[Any, set[str]] = {}
+        self._children: dict[str, list[str]] = {}
+        self._triggered: set[str] = set()
+        self._orders_changed = False
+
+    def _add_order(self, order: Order):
+        """Add a new order to the order book"""
+        assert order.id is not None
+        self._orders[order.id] = order
+        self._asset_orders.setdefault(order.asset, {})[order.id] = order
+        if order.gtd:
+            heapq.heappush(self._expirations, (order.gtd, order.id))
+        if (group := order.info.get("oco")) is not None:
+            self._oco_groups.setdefault(group, set()).add(order.id)
+        if (parent := order.info.get("parent")) is not None:
+            self._children.setdefault(parent, []).append(order.id)
+        self._orders_changed = True
+        self._update_order_value(order)
+
+    def _is_active(self, order: Order) -> bool:
+        """Return True if the order can be executed, so it doesn't have a parent order that is still open"""
+        parent = order.info.get("parent")
+        return parent is None or parent not in self._orders
+
+    def _is_triggered(self, order: Order, item: PriceItem) -> bool:
+        """Return True if the order doesn't have a stop price, or if the stop price has been reached now or before"""
+        stop = order.info.get("stop")
+        if stop is None or order.id in self._triggered:
+            return True
+        if isinstance(item, Quote):
+            price = item.ask_price if order.is_buy else item.bid_price
+        else:
+            price = item.price(self.price_type)
+        if price >= stop if order.is_buy else price <= stop:
+            self._triggered.add(order.id)  # type: ignore
+            return True
+        return False
+
+    def _init_totals(self):
+        """Initialize the running totals, all denoted in the currency of the assets.
+        The account uses the running total of the market value when calculating its equity."""
+        self._position_values: dict[Asset, float] = {}
+        self._short_values: dict[Asset, float] = {}
+        self._order_values: dict[str, float] = {}
+        self._mkt_value = Wallet()
+        self._short_value = Wallet()
+        self._order_value = Wallet()
+        self._account._mkt_value = self._mkt_value
+
+    def _update_order_value(self, order: Order):
+        """Update the buying power reserved for an open order"""
+        assert order.id is not None
+        value = self._account.required_buying_power(order).value
+        old_value = self._order_values.get(order.id, 0.0)
+        self._order_values[order.id] = value
+        self._order_value[order.asset.currency] += value - old_value
+
+    def _release_order_value(self, order: Order):
+        """Release the buying power reserved for an order that is removed"""
+        self._order_value[order.asset.currency] -= self._order_values.pop(order.id)  # type: ignore
+        if not self._order_values:
+            self._order_value.clear()
+
+    def _update_position_value(self, asset: Asset):
+        """Update the market value and the short value of the position in an asset"""
+        currency = asset.currency
+        position = self._account.positions.get(asset)
+        value = asset.contract_value(position.size, position.mkt_price) if position else 0.0
+        self._mkt_value[currency] += value - self._position_values.pop(asset, 0.0)
+        short_value = asset.contract_value(-position.size, position.mkt_price) if position and position.is_short else 0.0
+        self._short_value[currency] += short_value - self._short_values.pop(asset, 0.0)
+
+        if position:
+            self._position_values[asset] = value
+        if short_value:
+            self._short_values[asset] = short_value
+
+        # Avoid accumulating rounding errors when there is nothing left to track
+        if not self._position_values:
+            self._mkt_value.clear()
+        if not self._short_values:
+            self._short_value.clear()
+
+    def _update_asset(self, asset: Asset):
+        """Update the running totals after the position in an asset changed. A change in position size can
+        also change the buying power required for the open orders of that asset."""
+        self._update_position_value(asset)
+        for order in self._asset_orders.get(asset, {}).values():
+            self._update_order_value(order)
+
+    def _get_commission_model(self, asset: Asset) -> CommissionModel | None:
+        if isinstance(self.commission, dict):
+            return self.commission.get(asset.asset_class())
+        return self.commission
 
     def _fee(self, trx: _Trx) -> Amount:
-        """Calculate any additional transaction fee, default is zero"""
-        return Amount(trx.asset.currency, 0.0)
+        """Return the fee of a transaction. The default implementation returns the fee calculated by the commission
+        model, which is zero if there is no commission model for the asset.
+
+        Subclasses can override this method to charge different or additional fees, for example by adding to the
+        value of `super()._fee(trx)`. The returned amount is converted to the currency of the asset."""
+        return Amount(trx.asset.currency, trx.fee)
+
+    def _add_fees(self, trxs: list[_Trx], time: datetime) -> list[_Trx]:
+        """Return the transactions with their fees set. The fees of all the transactions that share a commission
+        model are calculated in a single batch. If a subclass overrides `_fee`, it is invoked for every transaction."""
+        result = list(trxs)
+        if self.commission:
+            batches: dict[int, tuple[CommissionModel, list[int]]] = {}
+            for idx, trx in enumerate(trxs):
+                if model := self._get_commission_model(trx.asset):
+                    batches.setdefault(id(model), (model, []))[1].append(idx)
+
+            for model, indices in batches.values():
+                batch = [trxs[idx] for idx in indices]
+                sizes = np.array([float(trx.size) for trx in batch])
+                prices = np.array([trx.price for trx in batch])
+                values = np.array([trx.asset.contract_value(trx.size, trx.price) for trx in batch])
+                fees = model.calc(time, sizes, prices, values)
+                for idx, trx, fee in zip(indices, batch, fees.tolist()):
+                    result[idx] = replace(trx, fee=fee)
+
+        if type(self)._fee is not SimBroker._fee:
+            result = [replace(trx, fee=self._fee(trx).convert_to(trx.asset.currency, time)) for trx in result]
+        return result
 
     def _update_account(self, trx: _Trx):
         """Update a position and cash based on a new transaction"""
         acc = self._account
         asset = trx.asset
-        acc.cash -= asset.contract_amount(trx.size, trx.price)
-        acc.cash -= self._fee(trx)
+        acc.cash[asset.currency] -= asset.contract_value(trx.size, trx.price) + trx.fee
 
         size = acc.get_position_size(asset)
 
@@ -93,6 +292,10 @@ class SimBroker(Broker):
                 avg_price = (old_price * float(size) + trx.price * float(trx.size)) / (float(size + trx.size))
                 acc.positions[asset] = Position(new_size, avg_price, trx.price)
 
+    def _log_trx(self, trx: _Trx, time: datetime):
+        """Record an executed transaction in the transaction log"""
+        self.transactions.append(time, trx.asset, trx.size, trx.price, trx.fee)
+
     def _get_execution_price(self, order: Order, item: PriceItem) -> float:
         """Return the execution price to use for an order based on the price item.
 
@@ -114,6 +317,26 @@ class SimBroker(Broker):
             return _Trx(order.asset, fill, price)
         return None
 
+    def _execute_batch(self, orders: list[Order], item: PriceItem) -> list[_Trx | None]:
+        """Simulate the execution of all the open orders of an asset using the fill model"""
+        assert self.fill_model is not None
+        remaining = np.array([float(order.remaining) for order in orders])
+        limit = np.array([order.limit for order in orders])
+        if self.fill_model.supports_stop:
+            triggered = np.array([order.id in self._triggered for order in orders], dtype=np.bool_)
+            fills, prices = self.fill_model.fill(item, remaining, limit, orders, triggered)
+            self._triggered.update(order.id for order, is_triggered in zip(orders, triggered) if is_triggered)  # type: ignore
+        else:
+            fills, prices = self.fill_model.fill(item, remaining, limit, orders)
+
+        result: list[_Trx | None] = [None] * len(orders)
+        for idx in np.flatnonzero(fills):
+            order = orders[idx]
+            fill = float(fills[idx])
+            size = order.remaining if abs(fill) >= abs(remaining[idx]) else Decimal(str(fill))
+            result[idx] = _Trx(order.asset, size, float(prices[idx]))
+        return result
+
     def __next_order_id(self):
         result = str(self._order_id)
         self._order_id += 1
@@ -143,21 +366,86 @@ class SimBroker(Broker):
 
         There is no trading simulation yet performed or account updated. This is done during the `sync` method.
         Orders placed at time `t`, will be processed during time `t+1`. This protects against future bias.
+        If a latency is configured, orders are only processed once the time of the event is at or after `t + latency`.
         """
         for order in orders:
             if order.id is None:
                 order.id = self.__next_order_id()
-                self._create_orders.append(order)
+                is_new = True
             else:
-                self._modify_orders.append(order)
+                is_new = False
+
+            if self.latency is None:
+                self._route_order(order, is_new)
+            else:
+                latency = self.latency if isinstance(self.latency, timedelta) else self.latency()
+                activation = self._account.last_update + latency
+                heapq.heappush(self._pending, (activation, self._pending_seq, order, is_new))
+                self._pending_seq += 1
+                self._orders_changed |= is_new
+
+    def _route_order(self, order: Order, is_new: bool):
+        """Queue an order so it is processed during the next sync"""
+        if is_new:
+            self._create_orders.append(order)
+        else:
+            self._modify_orders.append(order)
+
+    def _open_orders(self) -> list[Order]:
+        """Return the open orders, followed by the new orders that haven't reached the broker yet"""
+        result = list(self._orders.values())
+        if self._pending:
+            result += [order for _, _, order, is_new in sorted(self._pending, key=lambda p: p[1]) if is_new]
+        return result
+
+    def _activate_pending_orders(self, time: datetime):
+        """Route the pending orders that reached the broker at the provided time, in order of arrival"""
+        pending = self._pending
+        while pending and pending[0][0] <= time:
+            _, _, order, is_new = heapq.heappop(pending)
+            self._route_order(order, is_new)
 
     def _remove_order(self, order: Order):
         """Remove an order from the account, called when an order is completed, expired or cancelled."""
-        self._account.orders.remove(order)
+        assert order.id is not None
+        del self._orders[order.id]
+        asset_orders = self._asset_orders[order.asset]
+        del asset_orders[order.id]
+        if not asset_orders:
+            del self._asset_orders[order.asset]
+        self._orders_changed = True
+        self._release_order_value(order)
+        self._triggered.discard(order.id)
+        if self.fill_model:
+            self.fill_model.remove(order)
+
+        if (group := order.info.get("oco")) is not None:
+            members = self._oco_groups[group]
+            members.discard(order.id)
+            if not members:
+                del self._oco_groups[group]
+
+        # child orders only become active if the parent order is completely filled
+        children = self._children.pop(order.id, [])
+        if order.remaining:
+            for child_id in children:
+                if child := self._orders.get(child_id):
+                    logger.info("cancelled child order %s", child)
+                    self._remove_order(child)
+
+    def _cancel_oco(self, order: Order):
+        """Cancel the other open orders in the oco group of an order that got filled"""
+        group = order.info.get("oco")
+        if group is None or group not in self._oco_groups:
+            return
+        for order_id in list(self._oco_groups[group]):
+            if order_id != order.id and (other := self._orders.get(order_id)):
+                logger.info("cancelled oco order %s", other)
+                self._remove_order(other)
 
     def _process_modify_orders(self):
         for order in self._modify_orders:
-            orig_order = next((o for o in self._account.orders if o.id == order.id), None)
+            orig_order = self._orders.get(order.id)  # type: ignore
             if not orig_order:
                 logger.info("couldn't find order with id %s", order.id)
                 continue
@@ -168,33 +456,89 @@ class SimBroker(Broker):
                 # update the order
                 orig_order.size = order.size or orig_order.size
                 orig_order.limit = order.limit or orig_order.limit
+                self._update_order_value(orig_order)
                 logger.info("modified order %s", orig_order)
 
         self._modify_orders = []
 
+    def _process_expired_orders(self, time: datetime):
+        expirations = self._expirations
+        while expirations and expirations[0][0] < time:
+            _, order_id = heapq.heappop(expirations)
+            if order := self._orders.get(order_id):
+                logger.info("expired order %s", order)
+                self._remove_order(order)
+
+    def _find_executions(self, event: Event) -> list[tuple[Order, _Trx]]:
+        """Return the open orders that are executed in the event, together with their transactions"""
+        prices = event.price_items
+        asset_orders = self._asset_orders
+        if len(prices) < len(asset_orders):
+            assets = [asset for asset in prices if asset in asset_orders]
+        else:
+            assets = [asset for asset in asset_orders if asset in prices]
+
+        check_stops = not (self.fill_model and self.fill_model.supports_stop)
+        executed: list[tuple[Order, _Trx]] = []
+        for asset in assets:
+            item = prices[asset]
+            orders = [order for order in asset_orders[asset].values() if self._is_active(order)]
+            if check_stops:
+                orders = [order for order in orders if self._is_triggered(order, item)]
+            if not orders:
+                continue
+            if self.fill_model:
+                trxs = self._execute_batch(orders, item)
+            else:
+                trxs = [self._execute(order, item) for order in orders]
+
+            executed += [(order, trx) for order, trx in zip(orders, trxs) if trx is not None]
+        return executed
+
     def _process_open_orders(self, event: Event | None):
-        if not event or not self._account.orders:
+        if not event or not self._orders:
+            return
+
+        self._process_expired_orders(event.time)
+        executed = self._find_executions(event)
+        if not executed:
+            return
+
+        trxs = self._add_fees([trx for _, trx in executed], event.time)
+        for (order, _), trx in zip(executed, trxs):
+            # an order can be cancelled by the fill of another order in the same oco group
+            if order.id in self._orders:
+                logger.info("executed order=%s trx=%s", order, trx)
+                self._update_account(trx)
+                self._log_trx(trx, event.time)
+                order.fill += trx.size
+                self._cancel_oco(order)
+                if not order.remaining:
+                    logger.info("completed order %s", order)
+                    self._remove_order(order)
+                self._update_asset(trx.asset)
+
+    def _update_market_prices(self, event: Event | None):
+        """Update the market prices of the open positions that have a price in the event"""
+        if not event:
             return
+
+        positions = self._account.positions
         prices = event.price_items
+        if len(prices) < len(positions):
+            assets = [asset for asset in prices if asset in positions]
+        else:
+            assets = [asset for asset in positions if asset in prices]
 
-        for order in self._account.orders.copy():
-            if order.is_expired(event.time):
-                logger.info("expired order %s", order)
-                self._remove_order(order)
-            elif item := prices.get(order.asset):
-                trx = self._execute(order, item)
-                if trx is not None:
-                    logger.info("executed order=%s trx=%s", order, trx)
-                    self._update_account(trx)
-                    order.fill += trx.size
-                    if not order.remaining:
-                        logger.info("completed order %s", order)
-                        self._remove_order(order)
+        for asset in assets:
+            if price := prices[asset].price(self.price_type):
+                positions[asset].mkt_price = price
+                self._update_position_value(asset)
 
     def _calculate_open_orders(self):
         """Calculate the buying power required for the open orders"""
         result = Wallet()
-        for order in self._account.orders:
+        for order in self._orders.values():
             result += self._account.required_buying_power(order)
         return result
 
@@ -205,6 +549,24 @@ class SimBroker(Broker):
             reserved += short_value
         return reserved
 
+    def _calculate_mkt_value(self):
+        result = Wallet()
+        for asset, position in self._account.positions.items():
+            result += asset.contract_amount(position.size, position.mkt_price)
+        return result
+
+    def _validate_totals(self):
+        """Validate the running totals against a full recalculation"""
+        for name, running, calculated in (
+            ("market value", self._mkt_value, self._calculate_mkt_value()),
+            ("open orders", self._order_value, self._calculate_open_orders()),
+            ("short positions", self._short_value, self._calculate_short_positions()),
+        ):
+            for currency in running.keys() | calculated.keys():
+                assert math.isclose(
+                    running.get(currency, 0.0), calculated.get(currency, 0.0), rel_tol=1e-9, abs_tol=1e-6
+                ), f"Wrong running total {name} running={running} calculated={calculated}"
+
     def _calculate_buyingpower(self) -> Amount:
         """Calculate the buying power.
         The default implementation uses the following calculation:
@@ -213,8 +575,8 @@ class SimBroker(Broker):
         """
         result = Wallet()
         result += self._account.cash
-        result -= self._calculate_open_orders()
-        result -= self._calculate_short_positions()
+        result -= self._order_value
+        result -= self._short_value
         return Amount(self._account.base_currency, self._account.convert(result))
 
     def sync(self, event: Event | None = None) -> Account:
@@ -224,13 +586,21 @@ class SimBroker(Broker):
         acc = self._account
         if event:
             acc.last_update = event.time
+            if self._pending:
+                self._activate_pending_orders(event.time)
 
-        acc.orders += self._create_orders
+        for order in self._create_orders:
+            self._add_order(order)
         self._create_orders = []
 
         self._process_modify_orders()
         self._process_open_orders(event)
-        self._update_positions(acc, event, self.price_type)
+        if self._orders_changed:
+            acc.orders = self._open_orders()
+            self._orders_changed = False
+        self._update_market_prices(event)
+        if self.validate:
+            self._validate_totals()
         acc.buying_power = self._calculate_buyingpower()
         return acc
 
@@ -0,0 +1,187 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import numpy as np
+from numpy.typing import NDArray
+
+from roboquant.asset import Asset
+
+
+class TransactionLog:
+    """Append-only columnar log of executed transactions.
+
+    Every transaction is stored as a row in a number of NumPy arrays that grow by doubling their capacity, so
+    appending a transaction is cheap. The analytics, like the pnl per trade, are calculated vectorized over all
+    the transactions at once.
+
+    A trade is a round trip in an asset: it starts when a position is opened and ends when the position is closed
+    again. A transaction that reverses a position is split into a transaction that closes the existing position and
+    one that opens the new position. All values are denoted in the currency of the assets.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.assets: list[Asset] = []
+        self._asset_idx: dict[Asset, int] = {}
+        self._len = 0
+        self._time = np.zeros(capacity)
+        self._asset = np.zeros(capacity, dtype=np.int64)
+        self._size = np.zeros(capacity)
+        self._price = np.zeros(capacity)
+        self._value = np.zeros(capacity)
+        self._fee = np.zeros(capacity)
+
+    def append(self, time: datetime, asset: Asset, size: Decimal, price: float, fee: float = 0.0):
+        """Append a new transaction to the log"""
+        idx = self._len
+        if idx == len(self._time):
+            self._grow()
+
+        asset_idx = self._asset_idx.get(asset)
+        if asset_idx is None:
+            asset_idx = len(self.assets)
+            self._asset_idx[asset] = asset_idx
+            self.assets.append(asset)
+
+        self._time[idx] = time.timestamp()
+        self._asset[idx] = asset_idx
+        self._size[idx] = size
+        self._price[idx] = price
+        self._value[idx] = asset.contract_value(size, price)
+        self._fee[idx] = fee
+        self._len = idx + 1
+
+    def _grow(self):
+        n = max(len(self._time), 1)
+        self._time = np.concatenate([self._time, np.zeros(n)])
+        self._asset = np.concatenate([self._asset, np.zeros(n, dtype=np.int64)])
+        self._size = np.concatenate([self._size, np.zeros(n)])
+        self._price = np.concatenate([self._price, np.zeros(n)])
+        self._value = np.concatenate([self._value, np.zeros(n)])
+        self._fee = np.concatenate([self._fee, np.zeros(n)])
+
+    def __len__(self):
+        return self._len
+
+    def __repr__(self) -> str:
+        return f"TransactionLog(transactions={self._len} assets={len(self.assets)})"
+
+    def columns(self) -> dict[str, NDArray]:
+        """Return the transactions as columns. The time is in seconds since epoch, and the asset is
+        the index in the `assets` list."""
+        n = self._len
+        return {
+            "time": self._time[:n],
+            "asset": self._asset[:n],
+            "size": self._size[:n],
+            "price": self._price[:n],
+            "value": self._value[:n],
+            "fee": self._fee[:n],
+        }
+
+    def _split_reversals(self) -> dict[str, NDArray]:
+        """Return the transactions sorted by asset, with reversal transactions split in two"""
+        c = self.columns()
+        order = np.lexsort((np.arange(self._len), c["asset"]))
+        c = {k: v[order] for k, v in c.items()}
+
+        asset, size = c["asset"], c["size"]
+        pos_after = _group_cumsum(size, asset)
+        pos_before = pos_after - size
+        reversal = np.sign(pos_before) * np.sign(pos_after) < 0.0
+
+        if reversal.any():
+            # the part that closes the existing position comes first, followed by the part that opens the new one
+            rows = np.repeat(np.arange(len(size)), np.where(reversal, 2, 1))
+            first = np.r_[True, rows[1:] != rows[:-1]]
+            closing = np.where(reversal, -pos_before, size)
+            new_size = np.where(first, closing[rows], pos_after[rows])
+            fraction = new_size / size[rows]
+            c = {k: v[rows] for k, v in c.items()}
+            c["size"] = new_size
+            c["value"] = c["value"] * fraction
+            c["fee"] = c["fee"] * fraction
+        return c
+
+    def trades(self) -> dict[str, NDArray]:
+        """Return the closed trades as columns:
+        - asset: the index of the asset in the `assets` list
+        - entry: the time of the first transaction, in seconds since epoch
+        - exit: the time of the transaction that closed the position, in seconds since epoch
+        - pnl: the realized profit and loss, including fees
+        - value: the total traded value of the trade
+        """
+        empty = {k: np.zeros(0) for k in ("asset", "entry", "exit", "pnl", "value")}
+        if not self._len:
+            return empty
+
+        c = self._split_reversals()
+        asset, size = c["asset"], c["size"]
+        pos_after = _group_cumsum(size, asset)
+        pos_before = pos_after - size
+        trade_id = np.cumsum(pos_before == 0.0) - 1
+        n_trades = int(trade_id[-1]) + 1
+
+        closed = np.zeros(n_trades, dtype=np.bool_)
+        exit_time = np.zeros(n_trades)
+        is_exit = pos_after == 0.0
+        closed[trade_id[is_exit]] = True
+        exit_time[trade_id[is_exit]] = c["time"][is_exit]
+
+        entry = np.full(n_trades, np.inf)
+        np.minimum.at(entry, trade_id, c["time"])
+        trade_asset = np.zeros(n_trades, dtype=np.int64)
+        trade_asset[trade_id] = asset
+        pnl = np.bincount(trade_id, -c["value"] - c["fee"], n_trades)
+        value = np.bincount(trade_id, np.abs(c["value"]), n_trades)
+
+        return {
+            "asset": trade_asset[closed],
+            "entry": entry[closed],
+            "exit": exit_time[closed],
+            "pnl": pnl[closed],
+            "value": value[closed],
+        }
+
+    def realized_pnl(self) -> float:
+        """Return the total realized pnl of all the closed trades"""
+        return float(self.trades()["pnl"].sum())
+
+    def win_rate(self) -> float:
+        """Return the fraction of closed trades with a positive pnl"""
+        pnl = self.trades()["pnl"]
+        return float((pnl > 0.0).mean()) if len(pnl) else 0.0
+
+    def avg_holding_time(self) -> timedelta:
+        """Return the average holding time of the closed trades"""
+        trades = self.trades()
+        if not len(trades["pnl"]):
+            return timedelta(0)
+        return timedelta(seconds=float((trades["exit"] - trades["entry"]).mean()))
+
+    def turnover(self, equity: float) -> float:
+        """Return the total traded value as a multiple of the provided equity"""
+        return float(np.abs(self.columns()["value"]).sum()) / equity
+
+    def stats(self, equity: float) -> dict[str, float]:
+        """Return the main trade statistics"""
+        trades = self.trades()
+        pnl = trades["pnl"]
+        n = len(pnl)
+        return {
+            "trades": n,
+            "realized_pnl": float(pnl.sum()),
+            "win_rate": float((pnl > 0.0).mean()) if n else 0.0,
+            "avg_pnl": float(pnl.mean()) if n else 0.0,
+            "avg_holding_secs": float((trades["exit"] - trades["entry"]).mean()) if n else 0.0,
+            "turnover": self.turnover(equity),
+        }
+
+
+def _group_cumsum(values: NDArray, groups: NDArray) -> NDArray:
+    """Cumulative sum of values that are sorted by group, restarting at every new group. The result is rounded,
+    so a position that is closed by fractional sizes is exactly zero."""
+    result = np.cumsum(values)
+    starts = np.r_[True, groups[1:] != groups[:-1]]
+    offsets = (result - values)[starts]
+    result -= np.repeat(offsets, np.diff(np.r_[np.flatnonzero(starts), len(values)]))
+    return np.round(result, 9)
@@ -1,6 +1,7 @@
+import asyncio
 from datetime import datetime
 from abc import ABC, abstractmethod
-from typing import Any, Generator, Sequence
+from typing import Any, AsyncGenerator, Generator, Sequence
 
 from roboquant.asset import Asset
 from roboquant.event import Bar, Event
@@ -25,6 +26,23 @@ class Feed(ABC):
         """
         ...
 
+    async def async_play(self, timeframe: Timeframe | None = None) -> AsyncGenerator[Event, Any]:
+        """
+        (Re-)play the events contained in the feed as an asynchronous generator. This is used by `arun`.
+
+        The default implementation wraps the `play` method and gives control back to the event loop after
+        each event. Feeds that wait for external data, like live feeds, should override this method so they
+        don't block the event loop while waiting.
+
+        Parameters
+        ----------
+        timeframe : Timeframe
+            An optional timeframe to limit the events to.
+        """
+        for event in self.play(timeframe):
+            yield event
+            await asyncio.sleep(0)
+
     def timeframe(self) -> Timeframe:
         """Return the timeframe of this feed, default is Timeframe.INFINITE"""
         return Timeframe.INFINITE
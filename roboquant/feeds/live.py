@@ -1,7 +1,8 @@
+import asyncio
 from datetime import datetime, timedelta, timezone
 from multiprocessing import Queue
 from queue import Empty, Full
-from typing import Any, Generator
+from typing import Any, AsyncGenerator, Generator
 
 from roboquant.event import Event
 from roboquant.timeframe import Timeframe
@@ -17,11 +18,16 @@ class LiveFeed(Feed):
     timestamp will be corrected so the event occurs after the previous event.
 
     The default is to increment it by 1 microsecond over the previous event, but this is configurable.
+
+    Events can be consumed either via `play` or via `async_play`. The latter uses an `asyncio.Queue`, so
+    waiting for the next event doesn't block the event loop.
     """
 
     def __init__(self):
         super().__init__()
         self._queue: Queue | None = None
+        self._async_queue: asyncio.Queue | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
         self._last_time = datetime.fromisoformat("1900-01-01T00:00:00+00:00")
         self.increment = timedelta(microseconds=1)
         self.heartbeat_timeout = 10
@@ -51,15 +57,44 @@ class LiveFeed(Feed):
         self._queue.close()
         self._queue = None
 
+    async def async_play(self, timeframe: Timeframe | None = None) -> AsyncGenerator[Event, Any]:
+        self._loop = asyncio.get_running_loop()
+        self._async_queue = asyncio.Queue()
+        timeout = self.heartbeat_timeout
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(self._async_queue.get(), timeout)
+                except TimeoutError:
+                    # We are here due to a timeout, so we need to send a heartbeat event
+                    event = Event(datetime.now(tz=timezone.utc), [])
+
+                if not timeframe or event.time in timeframe:
+                    yield event
+                elif event.time < timeframe.start:
+                    continue
+                else:
+                    break
+        finally:
+            self._async_queue = None
+            self._loop = None
+
     def _put(self, event: Event):
         """Put an event on the queue. If the event is not monotonic in time, it will be corrected.
-        Subclasses should call this method to publish new live events.
+        Subclasses should call this method to publish new live events. This method is thread-safe, so
+        it can be called from the thread that receives the live data.
         """
+        if self._queue or self._async_queue:
+            if event.time <= self._last_time:
+                event.time = self._last_time + self.increment
+            self._last_time = event.time
+
         if self._queue:
             try:
-                if event.time <= self._last_time:
-                    event.time = self._last_time + self.increment
-                self._last_time = event.time
                 self._queue.put(event)
             except Full:
                 pass
+
+        async_queue, loop = self._async_queue, self._loop
+        if async_queue and loop:
+            loop.call_soon_threadsafe(async_queue.put_nowait, event)
@@ -37,3 +37,12 @@ class Journal(ABC):
                 orders to monitor the execution and impact of the strategy's decisions.
         """
         ...
+
+    async def async_track(self, event: Event, account: Account, signals: list[Signal], orders: list[Order]):
+        """The coroutine version of `track`, used by `arun`. The default implementation invokes `track` directly.
+
+        Journals that perform slow I/O, like writing to a remote database, can override this method.
+        The run awaits this coroutine before the account is updated again, so the account can safely be
+        used until the coroutine is finished.
+        """
+        self.track(event, account, signals, orders)
@@ -1,6 +1,10 @@
 from abc import abstractmethod
 from collections import deque
-from datetime import datetime, timezone
+import copy
+from datetime import datetime, timedelta, timezone
+import hashlib
+import os
+import pathlib
 from typing import Any, TypeVar, Generic
 
 import numpy as np
@@ -9,11 +13,54 @@ from numpy.typing import NDArray
 from roboquant.account import Account
 from roboquant.asset import Asset
 from roboquant.event import Event, Bar, Quote
-from roboquant.strategies.buffer import OHLCVBuffer
+from roboquant.feeds.feed import Feed
+from roboquant.strategies.buffer import OHLCVBuffer, OHLCVTensor
+from roboquant.ta.incremental import Indicator
+from roboquant.timeframe import Timeframe
 
 T = TypeVar("T")
 
 
+class EventColumns:
+    """Columnar view of a list of events that is used to calculate features in batch. The columns are extracted
+    once and cached, so they can be shared by all the features that use them."""
+
+    def __init__(self, events: list[Event]) -> None:
+        self.events = events
+        self._cache: dict[tuple, NDArray] = {}
+
+    def __len__(self):
+        return len(self.events)
+
+    def prices(self, asset: Asset, price_type: str = "DEFAULT") -> NDArray[np.float32]:
+        """Return the prices of an asset, with NaN for events without a price for the asset"""
+        key = ("price", asset, price_type)
+        if (result := self._cache.get(key)) is None:
+            result = np.array([evt.get_price(asset, price_type) for evt in self.events], dtype=np.float32)
+            self._cache[key] = result
+        return result
+
+    def volumes(self, asset: Asset, volume_type: str = "DEFAULT") -> NDArray[np.float32]:
+        """Return the volumes of an asset, with NaN for events without a volume for the asset"""
+        key = ("volume", asset, volume_type)
+        if (result := self._cache.get(key)) is None:
+            result = np.array([evt.get_volume(asset, volume_type) for evt in self.events], dtype=np.float32)
+            self._cache[key] = result
+        return result
+
+    def bars(self, asset: Asset) -> NDArray[np.float32]:
+        """Return the ohlcv values of an asset with shape (events, 5), with NaN for events without a bar for the asset"""
+        key = ("bar", asset)
+        if (result := self._cache.get(key)) is None:
+            result = np.full((len(self.events), 5), np.nan, dtype=np.float32)
+            for row, evt in enumerate(self.events):
+                item = evt.price_items.get(asset)
+                if isinstance(item, Bar):
+                    result[row] = item.ohlcv
+            self._cache[key] = result
+        return result
+
+
 class Feature(Generic[T]):
     """Base class for all types of features"""
 
@@ -45,6 +92,24 @@ class Feature(Generic[T]):
     def _full_nan(self):
         return np.full(self._shape(), float("nan"), dtype=np.float32)
 
+    def calc_batch(self, feed: Feed, timeframe: Timeframe | None = None) -> NDArray:
+        """Calculate the feature for all the events in a feed and return the result as an array of shape
+        (events, size).
+
+        This is the same as invoking `reset` followed by `calc` for every event, and afterwards the feature has the
+        same state as it would have had with `calc`. But features that support it calculate their values with
+        vectorized operations over the full history, which is a lot faster when creating training data.
+        """
+        columns = EventColumns(list(feed.play(timeframe)))
+        self.reset()
+        return self._calc_batch(columns).reshape(len(columns), self.size())
+
+    def _calc_batch(self, columns: EventColumns) -> NDArray:
+        """Calculate the feature for all the events, one row per event. Subclasses can override this method with
+        a vectorized implementation. The default implementation invokes `calc` for every event."""
+        rows = [np.reshape(self.calc(evt), -1) for evt in columns.events]
+        return np.array(rows) if rows else np.zeros((0, self.size()), dtype=np.float32)
+
     def cache(self, validate=False) -> "Feature[T]":
         return CacheFeature(self, validate)
 
@@ -59,6 +124,9 @@ class Feature(Generic[T]):
     def __getitem__(self, *args) -> "Feature[T]":
         return SlicedFeature(self, args)  # type: ignore
 
+    def compile(self) -> "Feature[T]":
+        return CompiledFeature(self)
+
 
 class EquityFeature(Feature[Account]):
     """Calculates the total equity value of the account"""
@@ -83,6 +151,10 @@ class SlicedFeature(Feature):
         values = self.feature.calc(value)
         return values[self.args]
 
+    def _calc_batch(self, columns):
+        values = self.feature._calc_batch(columns).reshape(len(columns), -1)
+        return values[(slice(None), *self.args)]
+
     def size(self):
         return self._size
 
@@ -147,6 +219,12 @@ class PriceFeature(Feature[Event]):
         prices = [value.get_price(asset, self.price_type) for asset in self.assets]
         return np.array(prices, dtype=np.float32)
 
+    def _calc_batch(self, columns):
+        result = np.empty((len(columns), len(self.assets)), dtype=np.float32)
+        for idx, asset in enumerate(self.assets):
+            result[:, idx] = columns.prices(asset, self.price_type)
+        return result
+
     def size(self) -> int:
         return len(self.assets)
 
@@ -168,6 +246,12 @@ class BarFeature(Feature[Event]):
 
         return result
 
+    def _calc_batch(self, columns):
+        result = np.empty((len(columns), self.size()), dtype=np.float32)
+        for idx, asset in enumerate(self.assets):
+            result[:, idx * 5: idx * 5 + 5] = columns.bars(asset)
+        return result
+
     def size(self) -> int:
         return 5 * len(self.assets)
 
@@ -205,6 +289,10 @@ class CombinedFeature(Feature):
         data = [feature.calc(value) for feature in self.features]
         return np.hstack(data, dtype=np.float32)
 
+    def _calc_batch(self, columns):
+        data = [feature._calc_batch(columns).reshape(len(columns), -1) for feature in self.features]
+        return np.hstack(data, dtype=np.float32)
+
     def size(self) -> int:
         return self._size
 
@@ -251,6 +339,25 @@ class NormalizeFeature(Feature):
         self.__update(values)
         return self.__normalize_values(values)
 
+    def _calc_batch(self, columns):
+        values = self.feature._calc_batch(columns).reshape(len(columns), -1)
+        (count, mean, m2) = self.existing_aggregate
+        mask = ~np.isnan(values)
+        x = np.where(mask, values, 0.0).astype(np.float64)
+        n = count + np.cumsum(mask, axis=0)
+        sums = np.cumsum(x, axis=0) + mean * count
+        sums2 = np.cumsum(x * x, axis=0) + m2 + mean * mean * count
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = np.where(n > 0, sums / n, 0.0)
+            var = np.where(n > 0, np.maximum(sums2 / n - means * means, 0.0), 0.0)
+            stdev = np.where(n >= self.min_count, np.sqrt(var) + 1e-12, np.nan)
+            result = ((values - means) / stdev).astype(np.result_type(values, np.float32))
+        if len(values):
+            count[:] = n[-1]
+            mean[:] = means[-1]
+            m2[:] = var[-1] * n[-1]
+        return result
+
     def size(self) -> int:
         return self.feature.size()
 
@@ -274,6 +381,17 @@ class FillFeature(Feature):
         self.fill = np.copy(values)
         return values
 
+    def _calc_batch(self, columns):
+        values = self.feature._calc_batch(columns).reshape(len(columns), -1)
+        values = np.vstack([self.fill[None].astype(values.dtype), values])
+        # forward fill the NaN values with the last known value per column
+        rows = np.where(np.isnan(values), 0, np.arange(len(values))[:, None])
+        np.maximum.accumulate(rows, axis=0, out=rows)
+        values = values[rows, np.arange(values.shape[1])][1:]
+        if len(values):
+            self.fill = np.copy(values[-1])
+        return values
+
     def reset(self):
         self.fill = self._full_nan()
         self.feature.reset()
@@ -297,6 +415,10 @@ class FillWithConstantFeature(Feature):
         values[mask] = self.fill[mask]
         return values
 
+    def _calc_batch(self, columns):
+        values = self.feature._calc_batch(columns).reshape(len(columns), -1)
+        return np.where(np.isnan(values), self.fill, values).astype(values.dtype)
+
     def reset(self):
         self.feature.reset()
 
@@ -358,6 +480,12 @@ class VolumeFeature(Feature[Event]):
         volumes = [value.get_volume(asset, self.volume_type) for asset in self.assets]
         return np.array(volumes, dtype=np.float32)
 
+    def _calc_batch(self, columns):
+        result = np.empty((len(columns), len(self.assets)), dtype=np.float32)
+        for idx, asset in enumerate(self.assets):
+            result[:, idx] = columns.volumes(asset, self.volume_type)
+        return result
+
     def size(self) -> int:
         return len(self.assets)
 
@@ -376,6 +504,15 @@ class ReturnFeature(Feature):
         self.history = values
         return r
 
+    def _calc_batch(self, columns):
+        values = self.feature._calc_batch(columns).reshape(len(columns), -1)
+        if not len(values):
+            return values
+        history = np.vstack([self.history[None].astype(values.dtype), values[:-1]])
+        r = values / history - 1.0
+        self.history = values[-1]
+        return r
+
     def size(self) -> int:
         return self.feature.size()
 
@@ -403,6 +540,15 @@ class LongReturnsFeature(Feature):
         h.append(values)
         return r
 
+    def _calc_batch(self, columns):
+        values = self.feature._calc_batch(columns).reshape(len(columns), -1)
+        period = self.history.maxlen
+        assert period is not None and not self.history, "batch calculation requires a reset feature"
+        r = np.full(values.shape, np.nan, dtype=values.dtype)
+        r[period:] = values[period:] / values[:-period] - 1.0
+        self.history.extend(values[-period:])
+        return r
+
     def size(self) -> int:
         return self.feature.size()
 
@@ -494,6 +640,20 @@ class SMAFeature(Feature):
 
         return np.mean(self.history, axis=0)
 
+    def _calc_batch(self, columns):
+        values = self.feature._calc_batch(columns).reshape(len(columns), -1)
+        n, period = len(values), self.period
+        result = np.full(values.shape, np.nan)
+        if n >= period:
+            windows = np.lib.stride_tricks.sliding_window_view(values.astype(np.float64), period, axis=0)
+            result[period - 1:] = windows.mean(axis=-1)
+        if n:
+            self.history = np.zeros((period, values.shape[1]))
+            steps = np.arange(max(0, n - period), n)
+            self.history[steps % period] = values[steps]
+            self._cnt = n
+        return result
+
     def size(self) -> int:
         return self.feature.size()
 
@@ -545,15 +705,27 @@ class TimeDifference(Feature[Event]):
 
 
 class TaFeature(Feature[Event]):
-    """Base class for technical analysis features"""
+    """Base class for technical analysis features.
+
+    Subclasses implement either `_calc`, that is invoked per asset, or `_calc_matrix`, that is invoked once per
+    event for all the assets. If `_calc_matrix` is implemented, the history of all the assets is kept in a single
+    `OHLCVTensor`, so the costs per event don't grow with the number of Python calls per asset.
+    """
 
     def __init__(self, *assets: Asset, history_size: int) -> None:
         super().__init__()
         self._data: dict[Asset, OHLCVBuffer] = {}
         self._size = history_size
         self.assets = list(assets)
+        self._matrix = type(self)._calc_matrix is not TaFeature._calc_matrix
+        self._asset_idx = {asset: idx for idx, asset in enumerate(self.assets)}
+        self._tensor = OHLCVTensor(history_size, assets=max(len(self.assets), 1)) if self._matrix else None
+        self._slots = np.arange(len(self.assets))
 
     def calc(self, value: Event):
+        if self._matrix:
+            return self._calc_all(value)
+
         result = []
         nan = float("nan")
         for asset in self.assets:
@@ -570,13 +742,451 @@ class TaFeature(Feature[Event]):
             result.append(v)
         return np.asarray(result, dtype=np.float32)
 
-    @abstractmethod
+    def _calc_all(self, value: Event):
+        items = value.price_items
+        if len(items) < len(self.assets):
+            bars = [(self._asset_idx.get(asset), item) for asset, item in items.items()]
+        else:
+            bars = [(idx, items.get(asset)) for idx, asset in enumerate(self.assets)]
+        bars = [(idx, item) for idx, item in bars if idx is not None and isinstance(item, Bar)]
+
+        result = np.full(len(self.assets), np.nan, dtype=np.float32)
+        if bars:
+            idx = np.fromiter((idx for idx, _ in bars), np.int64, len(bars))
+            rows = np.array([item.ohlcv for _, item in bars], dtype=np.float64)
+            tensor: OHLCVTensor = self._tensor  # type: ignore
+            ready = tensor.add_bars(idx, rows)
+            if len(ready):
+                mask = np.zeros(len(self.assets), dtype=np.bool_)
+                mask[ready] = True
+                values = self._calc_matrix(tensor.windows(self._slots), mask)
+                result[mask] = values[mask]
+        return result
+
     def _calc(self, asset: Asset, ohlcv: OHLCVBuffer) -> float:
-        """Override this method with technical analysis logic"""
-        ...
+        """Override this method with technical analysis logic for a single asset"""
+        raise NotImplementedError()
+
+    def _calc_matrix(self, windows: NDArray[np.float64], mask: NDArray[np.bool_]) -> NDArray:
+        """Override this method with vectorized technical analysis logic for all the assets at once.
+
+        Args:
+            windows: array of shape (assets, history_size, 5) with the ohlcv history of the assets, oldest bar first.
+            mask: the assets that have a bar in the current event and a full history. The values of the
+            other assets are ignored.
+
+        Returns:
+            An array with one value per asset.
+        """
+        raise NotImplementedError()
 
     def size(self) -> int:
         return len(self.assets)
 
     def reset(self):
         self._data = {}
+        if self._tensor is not None:
+            self._tensor.reset()
+
+
+class IndicatorFeature(Feature[Event]):
+    """Calculates an incremental indicator for one or more assets.
+
+    Unlike a `TaFeature`, the indicator is updated with only the latest bar or price, so the costs per event don't
+    depend on the history size. Indicators with multiple outputs return all the outputs of the first asset,
+    followed by the outputs of the second asset, etc.
+    """
+
+    def __init__(self, indicator: Indicator, *assets: Asset, price_type: str = "DEFAULT") -> None:
+        super().__init__()
+        self.indicator = indicator
+        self.assets = list(assets)
+        self.price_type = price_type
+
+    def calc(self, value: Event):
+        result = np.full((len(self.assets), self.indicator.outputs), np.nan, dtype=np.float32)
+        items = value.price_items
+        if self.indicator.bars:
+            idx = [i for i, asset in enumerate(self.assets) if isinstance(items.get(asset), Bar)]
+            values = [items[self.assets[i]].ohlcv for i in idx]  # type: ignore
+        else:
+            idx = [i for i, asset in enumerate(self.assets) if asset in items]
+            values = [items[self.assets[i]].price(self.price_type) for i in idx]
+
+        if idx:
+            result[idx] = self.indicator.update(values, idx).reshape(len(idx), -1)
+        return result.reshape(-1)
+
+    def size(self) -> int:
+        return len(self.assets) * self.indicator.outputs
+
+    def reset(self):
+        self.indicator.reset()
+
+
+class _NodeFeature(Feature):
+    """Placeholder for a child feature in a compiled graph that returns the result of the child for the current
+    event. If the child has multiple consumers, a copy is returned, since some features modify their input."""
+
+    def __init__(self, results: list, idx: int, size: int, shared: bool) -> None:
+        super().__init__()
+        self._results = results
+        self._idx = idx
+        self._size = size
+        self._shared = shared
+
+    def calc(self, value):
+        result = self._results[self._idx]
+        return result.copy() if self._shared else result
+
+    def size(self) -> int:
+        return self._size
+
+    def reset(self):
+        """The compiled graph resets every node once"""
+
+
+class CompiledFeature(Feature):
+    """Compiles a tree of features into a graph that is evaluated in a single pass per event.
+
+    - identical subfeatures, that are of the same type and have the same configuration and state, are only
+    calculated once per event and their result is shared by all the features that use them.
+    - `CombinedFeature` and `SlicedFeature` are not evaluated, but are resolved at compile time into fixed offsets.
+    Their values are directly copied from the results of the underlying features into a single output array per
+    event, without intermediate arrays.
+    - the other features are evaluated in topological order, so every feature is calculated before it is used.
+
+    The compiled feature works on a deep copy of the provided feature, so the original feature is not affected.
+    """
+
+    def __init__(self, feature: Feature) -> None:
+        super().__init__()
+        self.feature = feature
+        self._results: list = []
+        self._steps: list[tuple[int, Feature | None, list[tuple[int, slice, slice]]]] = []
+        self._keys: dict[Any, int] = {}
+        self._node_idx: dict[int, int] = {}
+        self._originals: list[Feature] = []
+        self._consumers: list[int] = []
+        self._root = self._add(feature)
+        self._consumers[self._root] += 1
+        self._build()
+
+    def _key(self, value: Any) -> Any:
+        """Return a key that is equal for identical features and values"""
+        match value:
+            case Feature():
+                return ("feature", self._add(value))
+            case tuple() | list():
+                return (type(value), tuple(self._key(v) for v in value))
+            case np.ndarray():
+                return ("ndarray", value.dtype.str, value.shape, value.tobytes())
+            case slice():
+                return ("slice", value.start, value.stop, value.step)
+            case deque():
+                return ("deque", value.maxlen, tuple(self._key(v) for v in value))
+            case dict() if not value:
+                return ("dict",)
+        try:
+            hash(value)
+            return ("value", value)
+        except TypeError:
+            return ("id", id(value))
+
+    def _add(self, feature: Feature) -> int:
+        """Add a feature and its children to the graph in topological order, and return the node index"""
+        idx = self._node_idx.get(id(feature))
+        if idx is not None:
+            return idx
+        key = (type(feature), tuple((name, self._key(v)) for name, v in sorted(vars(feature).items())))
+        idx = self._keys.get(key)
+        if idx is None:
+            idx = len(self._originals)
+            self._keys[key] = idx
+            self._originals.append(feature)
+            self._consumers.append(0)
+        self._node_idx[id(feature)] = idx
+        return idx
+
+    def _children(self, feature: Feature) -> list[Feature]:
+        result = []
+        for value in vars(feature).values():
+            if isinstance(value, Feature):
+                result.append(value)
+            elif isinstance(value, (tuple, list)):
+                result.extend(v for v in value if isinstance(v, Feature))
+        return result
+
+    def _plan(self, idx: int) -> tuple[NDArray[np.int64], NDArray[np.int64]]:
+        """Return for every output value of a node the source node and the position in the result of that node"""
+        feature = self._originals[idx]
+        if isinstance(feature, CombinedFeature):
+            plans = [self._plan(self._node_idx[id(f)]) for f in feature.features]
+            return np.concatenate([p[0] for p in plans]), np.concatenate([p[1] for p in plans])
+        if isinstance(feature, SlicedFeature):
+            src, pos = self._plan(self._node_idx[id(feature.feature)])
+            return np.atleast_1d(src[feature.args]), np.atleast_1d(pos[feature.args])
+        size = feature.size()
+        return np.full(size, idx, dtype=np.int64), np.arange(size)
+
+    @staticmethod
+    def _segments(src: NDArray[np.int64], pos: NDArray[np.int64]) -> list[tuple[int, slice, slice]]:
+        """Group the plan into copy operations of contiguous ranges"""
+        segments: list[tuple[int, slice, slice]] = []
+        breaks = np.flatnonzero((src[1:] != src[:-1]) | (pos[1:] != pos[:-1] + 1)) + 1
+        for start, end in zip(np.r_[0, breaks].tolist(), np.r_[breaks, len(src)].tolist()):
+            node, first = int(src[start]), int(pos[start])
+            segments.append((node, slice(start, end), slice(first, first + end - start)))
+        return segments
+
+    def _build(self):
+        assembled = (CombinedFeature, SlicedFeature)
+
+        # count the consumers of every node, the children of assembled nodes are consumed by the assembled node
+        for idx, feature in enumerate(self._originals):
+            if isinstance(feature, assembled):
+                src, _ = self._plan(idx)
+                for node in np.unique(src).tolist():
+                    self._consumers[node] += 1
+            else:
+                for child in self._children(feature):
+                    self._consumers[self._node_idx[id(child)]] += 1
+
+        n = len(self._originals)
+        self._results.extend([None] * n)
+        for idx, feature in enumerate(self._originals):
+            if not self._consumers[idx]:
+                # for example a CombinedFeature that is part of another CombinedFeature
+                continue
+            if isinstance(feature, assembled):
+                src, pos = self._plan(idx)
+                self._steps.append((idx, None, self._segments(src, pos)))
+            else:
+                memo = {}
+                for child in self._children(feature):
+                    child_idx = self._node_idx[id(child)]
+                    size = self._originals[child_idx].size()
+                    memo[id(child)] = _NodeFeature(self._results, child_idx, size, self._consumers[child_idx] > 1)
+                self._steps.append((idx, copy.deepcopy(feature, memo), []))
+
+    def calc(self, value):
+        results = self._results
+        for idx, node, segments in self._steps:
+            if node is not None:
+                results[idx] = node.calc(value)
+            else:
+                out = np.empty(self._originals[idx].size(), dtype=np.float32)
+                for src, dst, pos in segments:
+                    out[dst] = results[src].reshape(-1)[pos]
+                results[idx] = out
+        return results[self._root]
+
+    def size(self) -> int:
+        return self.feature.size()
+
+    def nodes(self) -> int:
+        """Return the number of features that are evaluated per event"""
+        return len(self._steps)
+
+    def reset(self):
+        for _, node, _ in self._steps:
+            if node is not None:
+                node.reset()
+
+
+def _fingerprint(value: Any, seen: dict[int, int] | None = None) -> str:
+    """Return a description of a value that is stable across processes, used to identify a feature definition.
+    Objects that are referenced more than once are described the first time, and later referred to by the order
+    in which they were first visited."""
+    seen = {} if seen is None else seen
+    match value:
+        case None | bool() | int() | float() | str() | datetime() | timedelta() | timezone():
+            return repr(value)
+        case np.ndarray():
+            return f"ndarray({value.dtype.str},{value.shape},{hashlib.sha256(value.tobytes()).hexdigest()})"
+        case Asset():
+            return repr(value)
+        case CompiledFeature():
+            return f"compiled({_fingerprint(value.feature, seen)})"
+
+    if (ref := seen.get(id(value))) is not None:
+        return f"<ref {ref}>"
+    seen[id(value)] = len(seen)
+    match value:
+        case tuple() | list() | deque():
+            return f"{type(value).__name__}[{','.join(_fingerprint(v, seen) for v in value)}]"
+        case dict():
+            items = sorted(f"{_fingerprint(k, seen)}:{_fingerprint(v, seen)}" for k, v in value.items())
+            return f"dict{{{','.join(items)}}}"
+    if hasattr(value, "__dict__"):
+        attrs = ",".join(f"{k}={_fingerprint(v, seen)}" for k, v in sorted(vars(value).items()))
+        return f"{type(value).__module__}.{type(value).__qualname__}({attrs})"
+    return repr(value)
+
+
+def _feed_identity(feed: Feed) -> str:
+    """Return a description of the data in a feed, based on its source (if any), the number of events and the
+    contents of the first and last event"""
+    timeframe = feed.timeframe()
+    assert timeframe != Timeframe.INFINITE, "feeds without a finite timeframe require an explicit key"
+    source = getattr(feed, "parquet_path", None) or getattr(feed, "avro_file", None) or ""
+    first = last = None
+    count = 0
+    for event in feed.play():
+        first = first or event
+        last = event
+        count += 1
+    events = _fingerprint([(evt.time, evt.items) for evt in (first, last) if evt])
+    digest = hashlib.sha256(events.encode()).hexdigest()
+    return f"{type(feed).__qualname__}|{source}|{timeframe}|{count}|{digest}"
+
+
+class PersistentCacheFeature(Feature[Event]):
+    """Cache the results of a feature on disk, so they can be reused across runs and processes, for example when
+    training a model multiple times or during a hyperparameter sweep. It has the same requirements as the
+    `CacheFeature`.
+
+    The results are stored as a contiguous float32 matrix in a NumPy file that is memory-mapped, together with a
+    sorted index of the event times. The files are named after a stable hash of the feature definition and the data,
+    so a different feature or feed never reuses the wrong values. A feed is identified by its type, its source path
+    (if any), the number of events and the contents of the first and last event, which requires one replay of the
+    feed. Alternatively, provide a non-empty string as `feed` that identifies the data, which is required for live
+    feeds.
+
+    Newly calculated results are kept in memory until `max_items` is reached or `flush` is invoked, and are then
+    merged into the files. Also `reset` flushes the results, so they are stored at the end of every run.
+
+    Args:
+        feature: The feature to cache.
+        path: The directory to store the cache files.
+        feed: The feed, or a string that identifies the data the feature is calculated on.
+        max_items: The maximum number of new results to keep in memory before they are written to disk.
+        validate: Validate that the cached values are equal to the calculated values.
+    """
+
+    _epoch = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+    def __init__(self, feature: Feature, path: str | pathlib.Path, feed: Feed | str, max_items: int = 10_000,
+                 validate: bool = False) -> None:
+        super().__init__()
+        self.feature = feature
+        self.path = pathlib.Path(path)
+        self.max_items = max_items
+        self.validate = validate
+        if isinstance(feed, Feed):
+            feed = _feed_identity(feed)
+        assert feed, "a feed or a non-empty string that identifies the data is required"
+        self.key = hashlib.sha256(f"{_fingerprint(feature)}|{feed}".encode()).hexdigest()[:32]
+        self._pending: dict[int, NDArray[np.float32]] = {}
+        self._times: NDArray[np.int64] = np.zeros(0, dtype=np.int64)
+        self._values: NDArray[np.float32] = np.zeros((0, feature.size()), dtype=np.float32)
+        self._cursor = 0
+        self._load()
+
+    def _files(self) -> tuple[pathlib.Path, pathlib.Path]:
+        return self.path / f"{self.key}.times.npy", self.path / f"{self.key}.values.npy"
+
+    def _load(self):
+        """Memory-map the stored results, an incomplete or invalid cache is ignored"""
+        times_file, values_file = self._files()
+        self._cursor = 0
+        if times_file.exists() and values_file.exists():
+            times = np.load(times_file)
+            values = np.load(values_file, mmap_mode="r")
+            if len(times) == len(values) and values.shape[1:] == (self.feature.size(),):
+                self._times, self._values = times, values
+
+    def _time(self, time: datetime) -> int:
+        return (time - self._epoch) // timedelta(microseconds=1)
+
+    def _lookup(self, time: int) -> NDArray[np.float32] | None:
+        times, idx = self._times, self._cursor
+        if idx >= len(times) or times[idx] != time:
+            # during a replay the times are increasing, so the next row is the most likely match
+            idx = int(np.searchsorted(times, time))
+            if idx >= len(times) or times[idx] != time:
+                return None
+        self._cursor = idx + 1
+        return np.array(self._values[idx])
+
+    def calc(self, value):
+        time = self._time(value.time)
+        values = self._pending.get(time)
+        if values is None:
+            values = self._lookup(time)
+        if values is None:
+            values = np.asarray(self.feature.calc(value), dtype=np.float32).reshape(-1)
+            self._pending[time] = values
+            if len(self._pending) >= self.max_items:
+                self.flush()
+        elif self.validate:
+            calc_values = np.asarray(self.feature.calc(value), dtype=np.float32).reshape(-1)
+            assert np.array_equal(
+                values, calc_values, equal_nan=True
+            ), f"Wrong cache time={value.time} cache={values} calculated={calc_values}"
+        return values.copy()
+
+    def _calc_batch(self, columns):
+        times = np.fromiter((self._time(evt.time) for evt in columns.events), np.int64, len(columns))
+        self.flush()
+        idx = np.minimum(np.searchsorted(self._times, times), max(len(self._times) - 1, 0))
+        if len(self._times) and (self._times[idx] == times).all():
+            return np.array(self._values[idx])
+
+        values = self.feature._calc_batch(columns).reshape(len(columns), -1).astype(np.float32)
+        self._pending.update(zip(times.tolist(), values))
+        self.flush()
+        return values
+
+    def flush(self):
+        """Write the results that are only in memory to disk"""
+        if not self._pending:
+            return
+
+        # reload first, since another process might have extended the cache in the meantime
+        self._load()
+        new_times = np.fromiter(self._pending, np.int64, len(self._pending))
+        new_values = np.array(list(self._pending.values()), dtype=np.float32).reshape(len(new_times), -1)
+        times = np.concatenate([self._times, new_times])
+        order = np.argsort(times, kind="stable")
+        keep = np.r_[True, times[order][1:] != times[order][:-1]]
+        order = order[keep]
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        times_file, values_file = self._files()
+        tmp_values = values_file.with_suffix(f".{os.getpid()}.tmp")
+        out = np.lib.format.open_memmap(tmp_values, "w+", np.float32, (len(order), self.feature.size()))
+        stored = order < len(self._times)
+        out[stored] = self._values[order[stored]]
+        out[~stored] = new_values[order[~stored] - len(self._times)]
+        out.flush()
+        del out
+
+        tmp_times = times_file.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_times, "wb") as f:
+            np.save(f, times[order])
+        os.replace(tmp_values, values_file)
+        os.replace(tmp_times, times_file)
+        self._pending = {}
+        self._load()
+
+    def reset(self):
+        """Reset the underlying feature and write the new results to disk. This doesn't clear the cache"""
+        self.feature.reset()
+        self.flush()
+        self._cursor = 0
+
+    def clear(self):
+        """Clear all the cache, including the files on disk"""
+        self._pending = {}
+        for file in self._files():
+            file.unlink(missing_ok=True)
+        self._times = np.zeros(0, dtype=np.int64)
+        self._values = np.zeros((0, self.feature.size()), dtype=np.float32)
+        self._cursor = 0
+
+    def __len__(self):
+        return len(self._times) + len(self._pending)
+
+    def size(self) -> int:
+        return self.feature.size()
@@ -1,10 +1,12 @@
+import copy
 import logging
-from typing import Callable, Generator, Any
+from typing import Callable, Generator, Any, Sequence
 import gymnasium as gym
 from gymnasium import spaces
 from gymnasium.envs.registration import register
 from stable_baselines3.common.policies import BasePolicy
 from stable_baselines3.common.base_class import BaseAlgorithm
+from stable_baselines3.common.vec_env import VecEnv
 
 import numpy as np
 from numpy.typing import NDArray
@@ -15,7 +17,7 @@ from roboquant.brokers.simbroker import SimBroker
 from roboquant.event import Event
 from roboquant.feeds.feed import Feed
 from roboquant.journals.journal import Journal
-from roboquant.ml.features import Feature
+from roboquant.ml.features import EventColumns, Feature
 from roboquant.signal import Signal
 from roboquant.strategies.strategy import Strategy
 from roboquant.timeframe import Timeframe
@@ -28,7 +30,22 @@ logger = logging.getLogger(__name__)
 
 
 class TradingEnv(gym.Env):
-    """A Gym environment for trading strategies"""
+    """A Gym environment for trading strategies.
+
+    If `precompute` is True, the events of the feed and the observation matrix of `obs_feature` are calculated once,
+    on the first reset, using `Feature.calc_batch`. The events and observations are the same for every episode, so
+    a reset only has to reset the broker and the account related features, and a step doesn't recalculate the
+    observation features. This has the same semantics as wrapping `obs_feature` in a `CacheFeature`, but the
+    observations are stored in a single contiguous array.
+
+    The `account_feature` is calculated every step and appended to the observation, so it can be used for
+    observations that depend on the account, like the current positions.
+
+    Episodes normally run from the first valid observation until the events are exhausted. With `episode_length`
+    an episode is truncated after that many steps, and with `random_start` every episode starts at a random valid
+    observation that leaves room for a full episode, using the random generator of the environment. Random starts
+    require `precompute`.
+    """
     # pylint: disable=too-many-instance-attributes,unused-argument
 
     metadata = {"render_modes": ["human", "rgb_array"], "render_fps": 4}
@@ -42,7 +59,11 @@ class TradingEnv(gym.Env):
         trader: Trader | None = None,
         broker: SimBroker | None = None,
         timeframe: Timeframe | None = None,
-        journal_factory: Callable[[str], Journal] | None = None
+        journal_factory: Callable[[str], Journal] | None = None,
+        account_feature: Feature[Account] | None = None,
+        precompute: bool = False,
+        episode_length: int | None = None,
+        random_start: bool = False,
     ):
         self.broker: SimBroker = broker or SimBroker()
         self.feed = feed
@@ -58,9 +79,22 @@ class TradingEnv(gym.Env):
         self.epoch = 0
         self.trader = trader or FlexTrader()
         self.assets = assets
-
-        # The observation space is determined by the final shape of the observation feature
-        self.observation_space = spaces.Box(-1.0, 1.0, shape=(obs_feature.size(),), dtype=np.float32)
+        self.account_feature = account_feature
+        self.precompute = precompute
+        self.episode_length = episode_length
+        self.random_start = random_start
+        assert precompute or not random_start, "random_start requires precompute"
+
+        self._events: list[Event] = []
+        self._observations: NDArray[np.float32] | None = None
+        self._starts: NDArray[np.int64] = np.zeros(0, dtype=np.int64)
+        self._idx = 0
+        self._end = 0
+        self._steps = 0
+
+        # The observation space is determined by the final shape of the observation and account features
+        obs_size = obs_feature.size() + (account_feature.size() if account_feature else 0)
+        self.observation_space = spaces.Box(-1.0, 1.0, shape=(obs_size,), dtype=np.float32)
 
         # The action space is for very asset to predict a number between a strong sell (-1.0) and strong buy (1.0)
         self.action_space = spaces.Box(-1.0, 1.0, shape=(len(self.assets),), dtype=np.float32)
@@ -91,7 +125,7 @@ class TradingEnv(gym.Env):
         if self.journal:
             self.journal.track(self.event, self.account, signals, orders)
 
-        self.event = next(self._event_gen, None)
+        self.event = self._next_event()
 
         if self.event:
             self.account = self.broker.sync(self.event)
@@ -101,23 +135,73 @@ class TradingEnv(gym.Env):
                 logger.info("Account equity < 0, done=True")
                 return None, 0.0, True, False, {}
 
-            observation = self.get_observation(self.event)
+            observation = self._observation(self.event)
             reward = self.get_reward(self.account)
-            return observation, reward, False, False, {}
+            truncated = self.episode_length is not None and self._steps >= self.episode_length
+            return observation, reward, False, truncated, {}
 
         return None, 0.0, True, False, {}
 
+    def _next_event(self) -> Event | None:
+        self._steps += 1
+        if self._observations is None:
+            return next(self._event_gen, None)
+        self._idx += 1
+        return self._events[self._idx] if self._idx < self._end else None
+
+    def _observation(self, evt: Event) -> NDArray[np.float32]:
+        """Return the observation for the current event and account"""
+        if self._observations is not None:
+            # a copy, so changes to the returned observation don't corrupt the observations of the next episodes
+            observation = self._observations[self._idx].copy()
+        else:
+            observation = self.get_observation(evt)
+        return self._add_account_observation(observation)
+
+    def _add_account_observation(self, observation: NDArray[np.float32]) -> NDArray[np.float32]:
+        if self.account_feature:
+            observation = np.concatenate([observation, np.reshape(self.account_feature.calc(self.account), -1)])
+        return observation
+
+    def _precompute(self):
+        """Calculate the observation matrix for all the events in the feed"""
+        self._events = list(self.feed.play(self.timefame))
+        columns = EventColumns(self._events)
+        self.obs_feature.reset()
+        observations = self.obs_feature._calc_batch(columns).reshape(len(columns), self.obs_feature.size())
+        self._observations = np.ascontiguousarray(observations, dtype=np.float32)
+        self._end = len(self._events)
+        # valid start offsets leave room for at least one step, or for a full episode if the length is limited
+        last = max(self._end - (self.episode_length or 1), 1)
+        self._starts = np.flatnonzero(~np.isnan(self._observations[:last]).any(axis=1))
+        assert len(self._starts), "no valid observations"
+        logger.info("precomputed observations=%s valid=%s", self._observations.shape, len(self._starts))
+
     def reset(self, *, seed=None, options=None):
         super().reset(seed=seed, options=options)
         self.broker.reset()
-        self.obs_feature.reset()
         self.reward_feature.reset()
+        if self.account_feature:
+            self.account_feature.reset()
         self.epoch += 1
+        self._steps = 0
 
-        self._event_gen = self.feed.play(self.timefame)
         if self.journal_factory:
             self.journal = self.journal_factory(f"epoch-{self.epoch}")
 
+        if self.precompute:
+            if self._observations is None:
+                self._precompute()
+            starts = self._starts
+            self._idx = int(starts[self.np_random.integers(len(starts))] if self.random_start else starts[0])
+            self.event = self._events[self._idx]
+            self.account = self.broker.sync(self.event)
+            self.get_reward(self.account)
+            return self._observation(self.event), {}
+
+        self.obs_feature.reset()
+        self._event_gen = self.feed.play(self.timefame)
+
         # Warmup the environment until we have the first valid observation
         while True:
             self.event = next(self._event_gen, None)
@@ -126,7 +210,7 @@ class TradingEnv(gym.Env):
             observation = self.get_observation(self.event)
             self.get_reward(self.account)
             if not np.any(np.isnan(observation)):
-                return observation, {}
+                return self._add_account_observation(observation), {}
             logger.info(observation)
 
     def render(self):
@@ -143,6 +227,190 @@ class TradingEnv(gym.Env):
         return result
 
 
+class _SubEnv:
+    """A single environment of a `VecTradingEnv`, with the state that isn't part of the batched arrays. The
+    `get_attr`, `set_attr` and `env_method` methods of a `VecTradingEnv` operate on these objects."""
+
+    def __init__(self, feed: Feed, timeframe: Timeframe | None, obs_feature: Feature[Event]):
+        self.feed = feed
+        self.timeframe = timeframe
+        self.obs_feature = obs_feature
+        self.render_mode = None
+        self.event_gen: Generator[Event, Any, None] | None = None
+
+    def play(self) -> Generator[Event, Any, None]:
+        """Reset the observation feature and (re-)start the replay of the feed"""
+        if self.event_gen is not None:
+            self.event_gen.close()
+        self.obs_feature.reset()
+        self.event_gen = self.feed.play(self.timeframe)
+        return self.event_gen
+
+
+class VecTradingEnv(VecEnv):
+    """A vectorized trading environment that steps multiple independent environments in lockstep, and that is
+    compatible with the Stable Baselines 3 `VecEnv` interface.
+
+    Every environment replays its own feed and/or timeframe with its own copy of the observation feature, and
+    `get_attr`, `set_attr` and `env_method` operate on the selected environments in `envs`. The
+    observations, actions and rewards are batched NumPy arrays with one row per environment. The accounts of all
+    the environments are simulated together with arrays of shape (envs, assets), instead of a `SimBroker` and
+    `Trader` per environment:
+
+    - an action is the target weight of an asset as a fraction of `max_position_perc` of the equity, so an action
+    of 1.0 for every asset results in a gross exposure of `max_position_perc * assets`
+    - the positions are rebalanced towards the target weights at the `price_type` price of the next event,
+    including slippage, and assets without a price keep their position
+    - the reward is the return of the equity, valued at the `valuation_type` price of the event
+
+    An environment is done if its events are exhausted or the equity drops to zero, and it is then automatically
+    reset as required by the `VecEnv` interface. NaN values in the observations are replaced by zero.
+    """
+
+    def __init__(
+        self,
+        feed: Feed | Sequence[Feed],
+        obs_feature: Feature[Event],
+        assets: list[Asset],
+        timeframes: Sequence[Timeframe | None] | None = None,
+        initial_cash: float = 1_000_000.0,
+        max_position_perc: float = 0.1,
+        shorting: bool = False,
+        slippage: float = 0.001,
+        price_type: str = "OPEN",
+        valuation_type: str = "DEFAULT",
+    ):
+        feeds = [feed] if isinstance(feed, Feed) else list(feed)
+        timeframes = list(timeframes) if timeframes is not None else [None] * len(feeds)
+        n = max(len(feeds), len(timeframes))
+        assert len(feeds) in (1, n) and len(timeframes) in (1, n), "feeds and timeframes should have the same length"
+        feeds = feeds * n if len(feeds) == 1 else feeds
+        timeframes = timeframes * n if len(timeframes) == 1 else timeframes
+        self.envs = [_SubEnv(f, tf, copy.deepcopy(obs_feature)) for f, tf in zip(feeds, timeframes)]
+        self.obs_feature = obs_feature
+        self.assets = assets
+        self.initial_cash = initial_cash
+        self.max_position_perc = max_position_perc
+        self.shorting = shorting
+        self.slippage = slippage
+        self.price_type = price_type
+        self.valuation_type = valuation_type
+        self.epoch = 0
+        self.render_mode = None
+
+        observation_space = spaces.Box(-1.0, 1.0, shape=(obs_feature.size(),), dtype=np.float32)
+        action_space = spaces.Box(-1.0, 1.0, shape=(len(assets),), dtype=np.float32)
+        super().__init__(n, observation_space, action_space)
+
+        self._obs = np.zeros((n, obs_feature.size()), dtype=np.float32)
+        self._cash = np.full(n, initial_cash)
+        self._equity = np.full(n, initial_cash)
+        self._positions = np.zeros((n, len(assets)))
+        self._prices = np.full((n, len(assets)), np.nan)
+        self._actions = np.zeros((n, len(assets)), dtype=np.float32)
+
+    def _get_prices(self, event: Event, price_type: str) -> NDArray[np.float64]:
+        return np.array([event.get_price(asset, price_type) for asset in self.assets], dtype=np.float64)
+
+    def _reset_env(self, idx: int) -> NDArray[np.float32]:
+        """Reset a single environment and warm it up until there is a valid observation"""
+        env = self.envs[idx]
+        event_gen = env.play()
+        self._cash[idx] = self.initial_cash
+        self._equity[idx] = self.initial_cash
+        self._positions[idx] = 0.0
+        self._prices[idx] = np.nan
+        while True:
+            event = next(event_gen, None)
+            assert event is not None, "exhausted events already during warmup"
+            prices = self._get_prices(event, self.valuation_type)
+            self._prices[idx] = np.where(np.isnan(prices), self._prices[idx], prices)
+            observation = env.obs_feature.calc(event)
+            if not np.any(np.isnan(observation)):
+                self._obs[idx] = observation
+                return self._obs[idx]
+
+    def reset(self):
+        self.epoch += 1
+        for idx in range(self.num_envs):
+            self._reset_env(idx)
+        self._reset_seeds()
+        self._reset_options()
+        return self._obs.copy()
+
+    def step_async(self, actions: np.ndarray) -> None:
+        self._actions = np.asarray(actions, dtype=np.float32).reshape(self.num_envs, len(self.assets))
+
+    def step_wait(self):
+        n = self.num_envs
+        dones = np.zeros(n, dtype=np.bool_)
+        exec_prices = np.full(self._prices.shape, np.nan)
+        prices = self._prices.copy()
+        terminal_obs = self._obs.copy()
+        for idx, env in enumerate(self.envs):
+            event = next(env.event_gen, None)  # type: ignore
+            if event is None:
+                dones[idx] = True
+                continue
+            exec_prices[idx] = self._get_prices(event, self.price_type)
+            valuation = self._get_prices(event, self.valuation_type)
+            prices[idx] = np.where(np.isnan(valuation), prices[idx], valuation)
+            self._obs[idx] = np.nan_to_num(env.obs_feature.calc(event), nan=0.0)
+
+        # rebalance the positions of all the environments towards their target weights
+        weights = np.clip(self._actions, -1.0, 1.0) * self.max_position_perc
+        if not self.shorting:
+            weights = np.maximum(weights, 0.0)
+        positions = self._positions
+        tradable = np.isfinite(exec_prices) & (exec_prices > 0.0)
+        mark = np.where(tradable, exec_prices, self._prices)
+        equity = self._cash + np.nansum(positions * mark, axis=1)
+        safe_prices = np.where(tradable, exec_prices, 1.0)
+        target = np.where(tradable, weights * equity[:, None] / safe_prices, positions)
+        trades = target - positions
+        fill_prices = safe_prices * (1.0 + self.slippage * np.sign(trades))
+        self._cash -= (trades * fill_prices).sum(axis=1)
+        self._positions = target
+        self._prices = prices
+
+        new_equity = self._cash + np.nansum(target * prices, axis=1)
+        rewards = np.where(dones, 0.0, new_equity / self._equity - 1.0).astype(np.float32)
+        self._equity = new_equity
+        dones |= new_equity <= 0.0
+
+        infos: list[dict[str, Any]] = [{"equity": float(new_equity[idx])} for idx in range(n)]
+        for idx in np.flatnonzero(dones).tolist():
+            infos[idx]["terminal_observation"] = terminal_obs[idx] if new_equity[idx] > 0.0 else self._obs[idx].copy()
+            infos[idx]["TimeLimit.truncated"] = False
+            self._reset_env(idx)
+        return self._obs.copy(), rewards, dones, infos
+
+    def close(self) -> None:
+        for env in self.envs:
+            if env.event_gen is not None:
+                env.event_gen.close()
+
+    def get_attr(self, attr_name: str, indices=None) -> list[Any]:
+        return [getattr(self.envs[idx], attr_name) for idx in self._get_indices(indices)]
+
+    def set_attr(self, attr_name: str, value: Any, indices=None) -> None:
+        for idx in self._get_indices(indices):
+            setattr(self.envs[idx], attr_name, value)
+
+    def env_method(self, method_name: str, *method_args, indices=None, **method_kwargs) -> list[Any]:
+        return [getattr(self.envs[idx], method_name)(*method_args, **method_kwargs) for idx in self._get_indices(indices)]
+
+    def env_is_wrapped(self, wrapper_class: type[gym.Wrapper], indices=None) -> list[bool]:
+        return [False for _ in self._get_indices(indices)]
+
+    def __repr__(self):
+        return (
+            f"VecTradingEnv(\n\tnum_envs={self.num_envs}\n\tfeature_size={self.obs_feature.size()}"
+            f"\n\tobservation_space={self.observation_space}\n\taction_space={self.action_space}"
+            "\n)"
+        )
+
+
 class SB3PolicyStrategy(Strategy):
     """A strategy that uses a Stable Baselines 3 policy to generate signals"""
 
@@ -164,17 +164,8 @@ class RNNStrategy(FeatureStrategy):
 
     def __get_xy(self, feed, timeframe=None, warmup=0) -> tuple[NDArray, NDArray]:
         """Extract input and label features from the feed."""
-        x = []
-        y = []
-        for evt in feed.play(timeframe):
-            if warmup:
-                self.label_feature.calc(evt)
-                self.input_feature.calc(evt)
-                warmup -= 1
-            else:
-                x.append(self.input_feature.calc(evt))
-                y.append(self.label_feature.calc(evt))
-
+        x = self.input_feature.calc_batch(feed, timeframe)[warmup:]
+        y = self.label_feature.calc_batch(feed, timeframe)[warmup:]
         return np.asarray(x, dtype=self._dtype), np.asarray(y, dtype=self._dtype)
 
     @staticmethod
@@ -15,7 +15,8 @@ class Order:
     Orders with a positive `size` are buy orders, and with a negative `size` are sell orders.
 
     The `gtd` (good till date) is optional, and if not set implies the order is valid
-    forever. The `info` can hold any arbitrary properties (kwargs) set on the order.
+    forever. The `info` can hold any arbitrary properties (kwargs) set on the order. Some brokers use
+    specific properties, like `stop`, `oco` and `parent` in case of the `SimBroker`.
 
     The `id` and `fill` are automatically set by the `Broker` and should not be updated.
     """
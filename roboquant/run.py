@@ -1,3 +1,5 @@
+import asyncio
+
 from roboquant.account import Account
 from roboquant.brokers.broker import Broker
 from roboquant.brokers.simbroker import SimBroker
@@ -49,3 +51,50 @@ def run(
 
     return broker.sync()
 
+
+async def arun(
+    feed: Feed,
+    strategy: Strategy | None,
+    trader: Trader | None = None,
+    journal: Journal | None = None,
+    broker: Broker | None = None,
+    timeframe: Timeframe | None = None,
+) -> Account:
+    """Start a new run using asyncio. This is the coroutine version of `run` and is intended for live trading, where
+    the feed, broker and journal might perform (network) I/O.
+
+    Placing the orders at the broker and tracking the journal are scheduled as tasks. So they overlap with waiting for
+    the next event of the feed. Before the broker is synced with the next event, these tasks are awaited. This way the
+    account is never updated while it is still being used.
+
+    Args:
+        feed: The feed to use for this run
+        strategy: The strategy that you want to use, use None if you have all the logic in the Trader
+        trader: The trader to use, default is the `FlexTrader` if None is provided
+        journal: Journal to use to log and/or store progress and metrics, default is None
+        broker: The broker you want to use. If None is specified, the `SimBroker` will be used with its default settings
+        timeframe: Optionally limit the run to events within this timeframe. The default is None
+
+    Returns:
+        The latest version of the account
+    """
+
+    broker = broker or SimBroker()
+    trader = trader or FlexTrader()
+    pending: list[asyncio.Task] = []
+
+    async for event in feed.async_play(timeframe):
+        if pending:
+            await asyncio.gather(*pending)
+
+        account = await broker.async_sync(event)
+        signals = strategy.create_signals(event) if strategy else []
+        orders = trader.create_orders(signals, event, account)
+        pending = [asyncio.create_task(broker.async_place_orders(orders))]
+        if journal:
+            pending.append(asyncio.create_task(journal.async_track(event, account, signals, orders)))
+
+    if pending:
+        await asyncio.gather(*pending)
+
+    return await broker.async_sync()
@@ -1,5 +1,5 @@
-from .buffer import NumpyBuffer, OHLCVBuffer
-from .tastrategy import TaStrategy, TaMultiAssetStrategy
+from .buffer import NumpyBuffer, OHLCVBuffer, OHLCVTensor
+from .tastrategy import TaStrategy, TaMultiAssetStrategy, TaBatchStrategy, TaCrossSectionalStrategy
 from .emacrossover import EMACrossover
 from .ibsstrategy import IBSStrategy
 from .multistrategy import MultiStrategy
@@ -11,7 +11,10 @@ __all__ = [
     "EMACrossover",
     "TaStrategy",
     "TaMultiAssetStrategy",
+    "TaBatchStrategy",
+    "TaCrossSectionalStrategy",
     "NumpyBuffer",
     "OHLCVBuffer",
+    "OHLCVTensor",
     "IBSStrategy",
 ]
@@ -107,3 +107,137 @@ class OHLCVBuffers(UserDict[Asset, OHLCVBuffer]):
     def ready_assets(self) -> set[Asset]:
         """Return the set of assets for which the buffer is already full"""
         return {asset for asset, ohlcv in self.items() if ohlcv.is_full()}
+
+
+class OHLCVTensor:
+    """A OHLCV buffer of a fixed capacity that tracks multiple assets in a single preallocated array.
+
+    The data is stored as an array of shape (assets, 2 * capacity, 5), with a separate write cursor per asset. Every
+    bar is written twice, `capacity` rows apart. This mirrored circular layout means that the latest `capacity` bars
+    of an asset are always a contiguous slice, so windows are returned as zero-copy views without ever shifting data.
+
+    New assets are registered when they are first seen, and the array grows by doubling the number of asset slots.
+
+    If `aligned` is True, all the assets share the same cursor that advances once per event with bars. Assets without a
+    bar in an event get a row of NaN values. All the assets are then aligned in time, and `matrix` returns a zero-copy
+    view of shape (assets, bars, 5) that can be used for cross-sectional calculations. An asset is only considered
+    ready if its window is full and has no missing bars.
+    """
+
+    def __init__(self, capacity: int, assets: int = 64, aligned: bool = False) -> None:
+        """Create a new OHLCV tensor with a capacity per asset and an initial number of asset slots"""
+        self.capacity = capacity
+        self.aligned = aligned
+        self.assets: list[Asset] = []
+        self._asset_idx: dict[Asset, int] = {}
+        self._data: NDArray[np.float64] = np.full((assets, 2 * capacity, 5), np.nan)
+        self._cursors: NDArray[np.int64] = np.zeros(assets, dtype=np.int64)
+        self._clock = 0
+
+    def _get_idx(self, asset: Asset) -> int:
+        idx = self._asset_idx.get(asset)
+        if idx is None:
+            idx = len(self.assets)
+            if idx == len(self._cursors):
+                self._data = np.concatenate([self._data, np.full_like(self._data, np.nan)])
+                self._cursors = np.concatenate([self._cursors, np.zeros_like(self._cursors)])
+            self._asset_idx[asset] = idx
+            self.assets.append(asset)
+        return idx
+
+    def index(self, asset: Asset) -> int | None:
+        """Return the index of the asset, or None if the asset is unknown"""
+        return self._asset_idx.get(asset)
+
+    def add_event(self, event: Event) -> NDArray[np.int64]:
+        """Add all the bars of an event at once and return the indices of the updated assets that have a full buffer.
+        PriceItems in the event that are not of the type `Bar` are ignored.
+        """
+        bars = [item for item in event.items if isinstance(item, Bar)]
+        if not bars:
+            return np.zeros(0, dtype=np.int64)
+
+        idx = np.fromiter((self._get_idx(bar.asset) for bar in bars), np.int64, len(bars))
+        rows = np.array([bar.ohlcv for bar in bars], dtype=np.float64)
+        return self.add_bars(idx, rows)
+
+    def add_bars(self, idx: NDArray[np.int64], rows: NDArray[np.float64]) -> NDArray[np.int64]:
+        """Add the ohlcv rows of the assets at the provided indices and return the indices of the updated assets that
+        have a full buffer. The indices should be registered already, or be within the initial number of asset slots.
+        """
+        cursors = self._cursors[idx]
+        if self.aligned:
+            pos = self._clock % self.capacity
+            n = len(self.assets)
+            self._data[:n, pos] = np.nan
+            self._data[:n, pos + self.capacity] = np.nan
+            self._clock += 1
+        else:
+            pos = cursors % self.capacity
+        self._data[idx, pos] = rows
+        self._data[idx, pos + self.capacity] = rows
+        cursors += 1
+        self._cursors[idx] = cursors
+        if self.aligned:
+            return idx[self._complete(idx)] if self._clock >= self.capacity else idx[:0]
+        return idx[cursors >= self.capacity]
+
+    def _complete(self, idx: NDArray[np.int64]) -> NDArray[np.bool_]:
+        """Return a mask of the assets in idx that have no missing bars in their aligned window"""
+        end = self._clock % self.capacity + self.capacity
+        return ~np.isnan(self._data[idx, end - self.capacity : end, 3]).any(axis=1)
+
+    def window(self, asset: Asset | int) -> NDArray[np.float64]:
+        """Return a zero-copy view of the latest bars of an asset with shape (bars, 5), oldest bar first"""
+        idx = asset if isinstance(asset, int) else self._asset_idx[asset]
+        cursor = self._clock if self.aligned else int(self._cursors[idx])
+        end = cursor % self.capacity + self.capacity
+        return self._data[idx, end - min(cursor, self.capacity) : end]
+
+    def windows(self, idx: NDArray[np.int64] | list[int]) -> NDArray[np.float64]:
+        """Return a copy of the windows of the assets in idx with shape (len(idx), capacity, 5), oldest bar first.
+        The windows of assets that don't have a full buffer yet start with NaN values."""
+        idx = np.asarray(idx, dtype=np.int64)
+        cursors = np.full(len(idx), self._clock) if self.aligned else self._cursors[idx]
+        rows = (cursors % self.capacity)[:, None] + np.arange(self.capacity)
+        return self._data[idx[:, None], rows]
+
+    def matrix(self) -> NDArray[np.float64]:
+        """Return a zero-copy view of the latest bars of all the assets with shape (assets, bars, 5), oldest bar first.
+        The index of the first dimension corresponds to the index in `assets`. Only available if `aligned` is True.
+        Missing bars have NaN values."""
+        assert self.aligned, "matrix is only available for aligned tensors"
+        end = self._clock % self.capacity + self.capacity
+        return self._data[: len(self.assets), end - min(self._clock, self.capacity) : end]
+
+    def bars(self) -> int:
+        """Return the number of bars that are available in `matrix`"""
+        return min(self._clock, self.capacity)
+
+    def clock(self) -> int:
+        """Return the number of events with bars that have been added since the last reset, if `aligned` is True"""
+        return self._clock
+
+    def __len__(self):
+        return len(self.assets)
+
+    def __contains__(self, asset: Asset) -> bool:
+        return asset in self._asset_idx
+
+    def ready_assets(self) -> set[Asset]:
+        """Return the set of assets for which the buffer is already full. If `aligned` is True, the window of the
+        asset should also have no missing bars."""
+        if self.aligned:
+            if self._clock < self.capacity:
+                return set()
+            idx = np.arange(len(self.assets))
+            ready = idx[self._complete(idx)]
+        else:
+            ready = np.flatnonzero(self._cursors[: len(self.assets)] >= self.capacity)
+        return {self.assets[idx] for idx in ready.tolist()}
+
+    def reset(self):
+        """reset the buffer, the registered assets are kept"""
+        self._data.fill(np.nan)
+        self._cursors.fill(0)
+        self._clock = 0
@@ -1,5 +1,8 @@
 from datetime import timedelta
 
+import numpy as np
+from numpy.typing import NDArray
+
 from roboquant.signal import Signal
 from roboquant.asset import Asset
 from roboquant.event import Event
@@ -7,55 +10,71 @@ from roboquant.strategies.strategy import Strategy
 
 
 class EMACrossover(Strategy):
-    """EMA Crossover Strategy implementation."""
+    """EMA Crossover Strategy implementation.
+
+    The state of all the assets, the fast and slow EMA and the number of steps, is kept in NumPy arrays that are
+    indexed by asset. So every event is processed with a single vectorized update, also for universes with thousands
+    of assets.
+    """
 
     def __init__(self, fast_period: int = 13, slow_period: int = 26, smoothing: float = 2.0, price_type: str = "DEFAULT"):
         super().__init__()
-        self._history: dict[Asset, EMACrossover._Calculator] = {}
         self.fast = 1.0 - (smoothing / (fast_period + 1))
         self.slow = 1.0 - (smoothing / (slow_period + 1))
         self.price_type = price_type
         self.min_steps = max(fast_period, slow_period)
         self.cancel_orders_older_than = timedelta(days=5)
+        self._asset_idx: dict[Asset, int] = {}
+        self._assets: list[Asset] = []
+        self._fast_ema: NDArray[np.float64] = np.zeros(64)
+        self._slow_ema: NDArray[np.float64] = np.zeros(64)
+        self._steps: NDArray[np.int64] = np.zeros(64, dtype=np.int64)
+
+    def _register(self, asset: Asset, price: float):
+        """Register a new asset, the first price is used as the initial value of both EMAs"""
+        idx = len(self._assets)
+        if idx == len(self._steps):
+            # grow the arrays by doubling their capacity
+            self._fast_ema = np.concatenate([self._fast_ema, np.zeros(idx)])
+            self._slow_ema = np.concatenate([self._slow_ema, np.zeros(idx)])
+            self._steps = np.concatenate([self._steps, np.zeros(idx, dtype=np.int64)])
+        self._asset_idx[asset] = idx
+        self._assets.append(asset)
+        self._fast_ema[idx] = price
+        self._slow_ema[idx] = price
 
     def create_signals(self, event: Event) -> list[Signal]:
-        result = []
-        for asset, price in event.get_prices(self.price_type).items():
-            if asset not in self._history:
-                self._history[asset] = self._Calculator(self.fast, self.slow, price=price)
+        asset_idx = self._asset_idx
+        indices = []
+        prices = []
+        for asset, item in event.price_items.items():
+            price = item.price(self.price_type)
+            idx = asset_idx.get(asset)
+            if idx is None:
+                self._register(asset, price)
             else:
-                calculator = self._history[asset]
-                old_rating = calculator.is_above()
-                step = calculator.add_price(price)
-
-                if step > self.min_steps:
-                    new_rating = calculator.is_above()
-                    if old_rating != new_rating:
-                        if new_rating:
-                            result.append(Signal.buy(asset))
-                        else:
-                            result.append(Signal.sell(asset))
-        return result
-
-    class _Calculator:
-        """Calculates the EMA crossover for a single asset"""
-
-        __slots__ = "momentum1", "momentum2", "price1", "price2", "step"
-
-        def __init__(self, momentum1: float, momentum2: float, price: float):
-            self.momentum1 = momentum1
-            self.momentum2 = momentum2
-            self.price1 = price
-            self.price2 = price
-            self.step = 0
-
-        def is_above(self) -> bool:
-            """Return True is the first momentum is above the second momentum, False otherwise"""
-            return self.price1 > self.price2
-
-        def add_price(self, price: float) -> int:
-            m1, m2 = self.momentum1, self.momentum2
-            self.price1 = m1 * self.price1 + (1.0 - m1) * price
-            self.price2 = m2 * self.price2 + (1.0 - m2) * price
-            self.step += 1
-            return self.step
+                indices.append(idx)
+                prices.append(price)
+
+        if not indices:
+            return []
+
+        idx = np.array(indices, dtype=np.int64)
+        price = np.array(prices, dtype=np.float64)
+        m1, m2 = self.fast, self.slow
+        fast = self._fast_ema[idx]
+        slow = self._slow_ema[idx]
+        old_above = fast > slow
+        fast = m1 * fast + (1.0 - m1) * price
+        slow = m2 * slow + (1.0 - m2) * price
+        self._fast_ema[idx] = fast
+        self._slow_ema[idx] = slow
+        steps = self._steps[idx] + 1
+        self._steps[idx] = steps
+
+        new_above = fast > slow
+        crossed = np.flatnonzero((steps > self.min_steps) & (old_above != new_above))
+        assets = self._assets
+        return [
+            Signal.buy(assets[indices[i]]) if new_above[i] else Signal.sell(assets[indices[i]]) for i in crossed.tolist()
+        ]
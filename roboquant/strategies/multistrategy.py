@@ -1,7 +1,9 @@
-from itertools import groupby
-from statistics import mean
+from concurrent.futures import Executor
 from typing import Literal
 
+import numpy as np
+
+from roboquant.asset import Asset
 from roboquant.event import Event
 from roboquant.signal import Signal
 from roboquant.strategies.strategy import Strategy
@@ -16,21 +18,32 @@ class MultiStrategy(Strategy):
     - mean: return the mean of the signal ratings. All signals will be `ENTRY_EXIT`.
         If the mean is 0, no signal will be created for that asset.
     - none: return all signals and don't handle conflicts. This is also the default.
+
+    If an executor is provided, like a `ThreadPoolExecutor`, the strategies create their signals concurrently.
+    This speeds up ensembles of strategies that spend most of their time in code that releases the GIL, like
+    NumPy or PyTorch. The signals are always combined in the order of the strategies, so the result is the same
+    as when the strategies run sequentially.
     """
 
     def __init__(
         self,
         *strategies: Strategy,
-        signal_filter: Literal["last", "first", "none", "mean"] = "none"
+        signal_filter: Literal["last", "first", "none", "mean"] = "none",
+        executor: Executor | None = None,
     ):
         super().__init__()
         self.strategies = list(strategies)
         self.filter = signal_filter
+        self.executor = executor
 
     def create_signals(self, event: Event) -> list[Signal]:
         signals: list[Signal] = []
-        for strategy in self.strategies:
-            signals += strategy.create_signals(event)
+        if self.executor is not None and len(self.strategies) > 1:
+            for result in self.executor.map(lambda strategy: strategy.create_signals(event), self.strategies):
+                signals += result
+        else:
+            for strategy in self.strategies:
+                signals += strategy.create_signals(event)
 
         match self.filter:
             case "none":
@@ -42,11 +55,17 @@ class MultiStrategy(Strategy):
                 s = {s.asset: s for s in reversed(signals)}
                 return list(s.values())
             case "mean":
-                result = []
-                for key, group in groupby(signals, lambda signal: signal.asset):
-                    rating = mean(signal.rating for signal in group)
-                    if rating:
-                        result.append(Signal(key, rating))
-                return result
+                return self._mean(signals)
 
         raise ValueError("unsupported signal filter")
+
+    @staticmethod
+    def _mean(signals: list[Signal]) -> list[Signal]:
+        """Return a signal with the mean rating per asset, the assets are in the order they first appear"""
+        if not signals:
+            return []
+        asset_idx: dict[Asset, int] = {}
+        idx = np.fromiter((asset_idx.setdefault(s.asset, len(asset_idx)) for s in signals), np.int64, len(signals))
+        ratings = np.fromiter((s.rating for s in signals), np.float64, len(signals))
+        means = np.bincount(idx, ratings) / np.bincount(idx)
+        return [Signal(asset, float(means[i])) for asset, i in asset_idx.items() if means[i]]
@@ -1,9 +1,12 @@
 from abc import abstractmethod
 
+import numpy as np
+from numpy.typing import NDArray
+
 from roboquant.asset import Asset
 from roboquant.event import Event
 from roboquant.signal import Signal
-from roboquant.strategies.buffer import OHLCVBuffers, OHLCVBuffer
+from roboquant.strategies.buffer import OHLCVBuffers, OHLCVBuffer, OHLCVTensor
 from roboquant.strategies.strategy import Strategy
 
 
@@ -75,3 +78,98 @@ class TaMultiAssetStrategy(Strategy):
         Subclasses should implement this method.
         """
         ...
+
+
+class TaBatchStrategy(Strategy):
+    """Abstract base class for strategies that evaluate technical indicators for all the assets in a single batch,
+    using a history of bars (aka candlesticks).
+
+    Compared to the `TaStrategy`, the history of all the assets is stored in a single `OHLCVTensor`. Every event,
+    the windows of the updated assets that have `size` history are gathered into one array, so indicators can be
+    evaluated over all the assets with a single call, for example with `roboquant.ta.batch` or NumPy.
+
+    Subclasses should implement the `process_batch` method.
+    """
+
+    def __init__(self, size: int) -> None:
+        super().__init__()
+        self._data = OHLCVTensor(size)
+        self.size = size
+
+    def create_signals(self, event: Event) -> list[Signal]:
+        idx = self._data.add_event(event)
+        if not len(idx):
+            return []
+        ohlcv = np.ascontiguousarray(self._data.windows(idx).transpose(2, 0, 1))
+        assets = [self._data.assets[i] for i in idx.tolist()]
+        return self.process_batch(assets, ohlcv)
+
+    @abstractmethod
+    def process_batch(self, assets: list[Asset], ohlcv: NDArray[np.float64]) -> list[Signal]:
+        """
+        Create zero or more signals for the provided assets.
+        Subclasses should implement this method.
+
+        Args:
+            assets: the updated assets that have a full history.
+            ohlcv: array of shape (5, assets, size) with the open, high, low, close and volume of the assets, oldest
+            bar first. Every row is C-contiguous, so it can be passed directly to the TA-Lib functions.
+
+        Sample:
+        ```
+        _, high, low, close, _ = ohlcv
+        rsi = ta.batch(ta.RSI, close, timeperiod=14)
+        return [Signal.buy(assets[i]) for i in np.flatnonzero(rsi < 30.0)]
+        ```
+        """
+        ...
+
+
+class TaCrossSectionalStrategy(Strategy):
+    """Abstract base class for strategies that make cross-sectional decisions over a universe of assets, like ranking
+    or momentum strategies, using a history of bars (aka candlesticks).
+
+    The history of all the assets is kept aligned in time in a single `OHLCVTensor` that is updated incrementally with
+    every event. Subclasses should implement the `process_universe` method that receives the history of all assets
+    as a single NumPy array, so the cross-sectional calculations can be done with a few vectorized operations.
+    This method is only invoked once there are `size` events with bars, and only for events that contain bars.
+    """
+
+    def __init__(self, size: int) -> None:
+        super().__init__()
+        self._data = OHLCVTensor(size, aligned=True)
+        self.size = size
+
+    def create_signals(self, event: Event) -> list[Signal]:
+        clock = self._data.clock()
+        self._data.add_event(event)
+        if self._data.clock() == clock or self._data.bars() < self.size:
+            # no new bars, or not enough history yet
+            return []
+        data = self._data.matrix()
+        data.flags.writeable = False
+        valid = ~np.isnan(data[:, :, 3])
+        return self.process_universe(data, valid, self._data.assets)
+
+    @abstractmethod
+    def process_universe(self, data: NDArray[np.float64], valid: NDArray[np.bool_], assets: list[Asset]) -> list[Signal]:
+        """
+        Create zero or more signals based on the history of all the assets.
+        Subclasses should implement this method.
+
+        Args:
+            data: read-only view of shape (assets, size, 5) with the open, high, low, close and volume
+            of the assets, oldest bar first. Missing bars are NaN.
+            valid: mask of shape (assets, size) that is True for the bars that are available.
+            assets: the assets, in the same order as the first dimension of data.
+
+        Sample:
+        ```
+        close = data[:, :, 3]
+        returns = close[:, -1] / close[:, 0] - 1.0
+        ok = valid[:, [0, -1]].all(axis=1)
+        zscore = (returns - returns[ok].mean()) / returns[ok].std()
+        return [Signal.buy(assets[i]) for i in np.flatnonzero(ok & (zscore > 2.0))]
+        ```
+        """
+        ...
@@ -1,14 +1,54 @@
-"""Set of stubs for the streaming version of the ta-lib indicators that makes them discoverable and typed."""
+"""Set of stubs for the streaming version of the ta-lib indicators that makes them discoverable and typed.
 
+The `roboquant.ta.incremental` module contains native incremental indicators that don't require TA-Lib.
+"""
+
+import logging
 import numpy as np
+from concurrent.futures import Executor
 from enum import Enum
-from typing import Tuple
+from typing import Any, Callable, Tuple
 from numpy.typing import NDArray
 
+logger = logging.getLogger(__name__)
+
 try:
     import talib._ta_lib as _ta_lib  # type: ignore
 except ImportError:
-    print("TA-Lib not installed, TA functions will not be available")
+    logger.info("TA-Lib not installed, TA functions will not be available")
+
+
+def batch(func: Callable[..., Any], *inputs: NDArray, executor: Executor | None = None, **kwargs) -> NDArray[np.float64]:
+    """Evaluate an indicator function for many assets at once and return the results aligned with the assets.
+
+    The inputs are 2-D arrays of shape (assets, window), and row `i` of every input is passed to the function for
+    asset `i`. The inputs are converted once to C-contiguous float64 arrays, so the rows can be passed to TA-Lib
+    without making a copy per asset. If an executor is provided, like a `ThreadPoolExecutor`, the rows are
+    evaluated in parallel, which helps if the function releases the GIL.
+
+    Sample:
+    ```
+    rsi = ta.batch(ta.RSI, close, timeperiod=14)
+    upper, middle, lower = ta.batch(ta.BBANDS, close, timeperiod=20).T
+    ```
+
+    Returns:
+        An array of shape (assets,) for functions with a single output, or (assets, outputs) for functions that
+        return a tuple.
+    """
+    rows = [np.ascontiguousarray(values, dtype=np.float64) for values in inputs]
+    n = len(rows[0])
+    assert all(len(values) == n for values in rows), "all inputs should have the same number of assets"
+
+    def calc(i: int):
+        return func(*(values[i] for values in rows), **kwargs)
+
+    if executor is not None and n > 1:
+        results = list(executor.map(calc, range(n)))
+    else:
+        results = [calc(i) for i in range(n)]
+    return np.asarray(results, dtype=np.float64)
+
 
 class MA_Type(Enum):
     SMA = 0
@@ -0,0 +1,376 @@
+"""Native incremental (streaming) indicators that don't depend on TA-Lib.
+
+Every indicator is a small state machine that is updated with one new value (or bar) per asset at a time, so an
+update is O(1) instead of recalculating over a full history window. The state is stored in NumPy arrays with one
+slot per asset, and a single `update` call processes a whole batch of assets at once:
+
+```
+ema = EMA(20)
+result = ema.update(closes)             # closes[i] is the new value of the asset in slot i
+result = ema.update(closes, idx)        # or only update the slots in idx
+assets, result = ema.update_event(event)  # or use the assets and prices in an event
+```
+
+Indicators marked with `bars = True` require OHLCV values of shape (n, 5) as input, the others require 1-D values.
+The result of an update contains NaN for the slots that don't have enough history yet. The first values are
+seeded in the same way as TA-Lib, so once an indicator is ready, the results match the TA-Lib functions.
+"""
+
+from abc import ABC, abstractmethod
+
+import numpy as np
+from numpy.typing import NDArray
+
+from roboquant.asset import Asset
+from roboquant.event import Bar, Event
+
+
+class Indicator(ABC):
+    """Base class for incremental indicators that hold their state per asset slot in NumPy arrays.
+
+    Subclasses create their state arrays with `_array` and implement `_update`. The arrays grow automatically
+    when a slot beyond the current capacity is updated.
+    """
+
+    bars = False
+    """True if the indicator requires OHLCV values as input instead of a single value"""
+
+    outputs = 1
+    """The number of values the indicator returns per asset, indicators with more outputs return a 2-D array"""
+
+    def __init__(self, assets: int = 64) -> None:
+        self._capacity = assets
+        self._arrays: dict[str, tuple[float, tuple[int, ...]]] = {}
+        self._children: list["Indicator"] = []
+        self._asset_idx: dict[Asset, int] = {}
+        self.assets: list[Asset] = []
+        self._count = self._array("_count", 0, dtype=np.int64)
+
+    def _array(self, name: str, fill: float = 0.0, shape: tuple[int, ...] = (), dtype=np.float64) -> NDArray:
+        """Create a state array with one row per asset slot"""
+        self._arrays[name] = (fill, shape)
+        return np.full((self._capacity, *shape), fill, dtype=dtype)
+
+    def _child(self, indicator: "Indicator") -> "Indicator":
+        """Register an indicator that is used by this indicator, so it is reset together with this indicator"""
+        self._children.append(indicator)
+        return indicator
+
+    def _grow(self, size: int):
+        capacity = self._capacity
+        while capacity < size:
+            capacity *= 2
+        for name, (fill, shape) in self._arrays.items():
+            old = getattr(self, name)
+            new = np.full((capacity, *shape), fill, dtype=old.dtype)
+            new[: self._capacity] = old
+            setattr(self, name, new)
+        self._capacity = capacity
+
+    def update(self, values: NDArray | list[float], idx: NDArray | list[int] | None = None) -> NDArray[np.float64]:
+        """Update the indicator with new values and return the indicator values of the updated slots.
+
+        Args:
+            values: The new values, one row per updated slot.
+            idx: The slot indices of the values, default is the slots 0 until the number of values.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        slots = np.arange(len(values)) if idx is None else np.asarray(idx, dtype=np.int64)
+        assert len(slots) == len(values), "values and idx should have the same length"
+        if len(slots) and (size := int(slots.max()) + 1) > self._capacity:
+            self._grow(size)
+        self._count[slots] += 1
+        return self._update(values, slots)
+
+    @abstractmethod
+    def _update(self, values: NDArray[np.float64], idx: NDArray[np.int64]) -> NDArray[np.float64]:
+        """Update the state of the slots in idx, the count of these slots is already incremented"""
+        ...
+
+    def index(self, asset: Asset) -> int:
+        """Return the slot of an asset, registering the asset if it is new"""
+        idx = self._asset_idx.get(asset)
+        if idx is None:
+            idx = len(self.assets)
+            self._asset_idx[asset] = idx
+            self.assets.append(asset)
+        return idx
+
+    def update_event(self, event: Event, price_type: str = "DEFAULT") -> tuple[list[Asset], NDArray[np.float64]]:
+        """Update the indicator with the price items in the event and return the updated assets and their values.
+        Indicators that require bars only use the `Bar` items, the others use the price of the provided price_type.
+        """
+        if self.bars:
+            items = [(asset, item) for asset, item in event.price_items.items() if isinstance(item, Bar)]
+            values = np.array([item.ohlcv for _, item in items], dtype=np.float64).reshape(len(items), 5)
+        else:
+            items = list(event.price_items.items())
+            values = np.fromiter((item.price(price_type) for _, item in items), np.float64, len(items))
+        assets = [asset for asset, _ in items]
+        idx = np.fromiter((self.index(asset) for asset in assets), np.int64, len(assets))
+        return assets, self.update(values, idx)
+
+    def ready(self, idx: NDArray | list[int] | None = None) -> NDArray[np.bool_]:
+        """Return for the slots in idx, or all the registered slots, if the indicator has enough history"""
+        if idx is None:
+            idx = np.arange(len(self.assets))
+        return self._count[np.asarray(idx, dtype=np.int64)] >= self.warmup()
+
+    @abstractmethod
+    def warmup(self) -> int:
+        """Return the number of updates required before the indicator produces values"""
+        ...
+
+    def reset(self):
+        """Reset the state of all the slots"""
+        for name, (fill, _) in self._arrays.items():
+            getattr(self, name)[:] = fill
+        for child in self._children:
+            child.reset()
+
+    def __repr__(self) -> str:
+        attrs = " ".join([f"{k}={v}" for k, v in self.__dict__.items() if not k.startswith("_") and k != "assets"])
+        return f"{self.__class__.__name__}({attrs})"
+
+
+class SMA(Indicator):
+    """Simple moving average, using a ring buffer and a running sum per asset"""
+
+    def __init__(self, period: int = 30, assets: int = 64) -> None:
+        super().__init__(assets)
+        self.period = period
+        self._ring = self._array("_ring", shape=(period,))
+        self._sum = self._array("_sum")
+
+    def warmup(self):
+        return self.period
+
+    def _update(self, values, idx):
+        pos = (self._count[idx] - 1) % self.period
+        self._sum[idx] += values - self._ring[idx, pos]
+        self._ring[idx, pos] = values
+        return np.where(self._count[idx] >= self.period, self._sum[idx] / self.period, np.nan)
+
+
+class EMA(Indicator):
+    """Exponential moving average, seeded with the simple average of the first `period` values"""
+
+    def __init__(self, period: int = 30, assets: int = 64) -> None:
+        super().__init__(assets)
+        self.period = period
+        self._alpha = 2.0 / (period + 1)
+        self._ema = self._array("_ema")
+
+    def warmup(self):
+        return self.period
+
+    def _update(self, values, idx):
+        count = self._count[idx]
+        ema = self._ema[idx]
+        ema = np.where(count > self.period, ema + self._alpha * (values - ema), ema + values)
+        ema = np.where(count == self.period, ema / self.period, ema)
+        self._ema[idx] = ema
+        return np.where(count >= self.period, ema, np.nan)
+
+
+class RSI(Indicator):
+    """Relative strength index using Wilder's smoothing of the average gains and losses"""
+
+    def __init__(self, period: int = 14, assets: int = 64) -> None:
+        super().__init__(assets)
+        self.period = period
+        self._prev = self._array("_prev")
+        self._gain = self._array("_gain")
+        self._loss = self._array("_loss")
+
+    def warmup(self):
+        return self.period + 1
+
+    def _update(self, values, idx):
+        p = self.period
+        count = self._count[idx]
+        change = np.where(count > 1, values - self._prev[idx], 0.0)
+        self._prev[idx] = values
+        gain, loss = np.maximum(change, 0.0), np.maximum(-change, 0.0)
+
+        # sum the first period changes, and use Wilder's smoothing afterwards
+        smooth = count > p + 1
+        avg_gain = np.where(smooth, (self._gain[idx] * (p - 1) + gain) / p, self._gain[idx] + gain)
+        avg_loss = np.where(smooth, (self._loss[idx] * (p - 1) + loss) / p, self._loss[idx] + loss)
+        seed = count == p + 1
+        avg_gain = np.where(seed, avg_gain / p, avg_gain)
+        avg_loss = np.where(seed, avg_loss / p, avg_loss)
+        self._gain[idx], self._loss[idx] = avg_gain, avg_loss
+
+        total = avg_gain + avg_loss
+        rsi = np.divide(100.0 * avg_gain, total, out=np.zeros_like(total), where=total > 0.0)
+        return np.where(count > p, rsi, np.nan)
+
+
+class MACD(Indicator):
+    """Moving average convergence divergence. The result has the columns macd, signal and histogram."""
+
+    outputs = 3
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9, assets: int = 64) -> None:
+        super().__init__(assets)
+        self.fast = fast
+        self.slow = slow
+        self.signal = signal
+        self._fast = self._child(EMA(fast, assets))
+        self._slow = self._child(EMA(slow, assets))
+        self._signal = self._child(EMA(signal, assets))
+
+    def warmup(self):
+        return self.slow + self.signal - 1
+
+    def _update(self, values, idx):
+        # like TA-Lib, the fast EMA starts later so both EMAs produce their first value at the same bar
+        late = self._count[idx] > self.slow - self.fast
+        fast = np.full(len(idx), np.nan)
+        if late.any():
+            fast[late] = self._fast.update(values[late], idx[late])
+        macd = fast - self._slow.update(values, idx)
+        result = np.full((len(idx), 3), np.nan)
+        valid = ~np.isnan(macd)
+        if valid.any():
+            signal = self._signal.update(macd[valid], idx[valid])
+            result[valid, 0] = macd[valid]
+            result[valid, 1] = signal
+            result[valid, 2] = macd[valid] - signal
+        result[self._count[idx] < self.warmup()] = np.nan
+        return result
+
+
+class BBANDS(Indicator):
+    """Bollinger bands, using a running sum and sum of squares. The result has the columns upper, middle and lower."""
+
+    outputs = 3
+
+    def __init__(self, period: int = 20, nbdevup: float = 2.0, nbdevdn: float = 2.0, assets: int = 64) -> None:
+        super().__init__(assets)
+        self.period = period
+        self.nbdevup = nbdevup
+        self.nbdevdn = nbdevdn
+        self._ring = self._array("_ring", shape=(period,))
+        self._sum = self._array("_sum")
+        self._sum2 = self._array("_sum2")
+
+    def warmup(self):
+        return self.period
+
+    def _update(self, values, idx):
+        pos = (self._count[idx] - 1) % self.period
+        old = self._ring[idx, pos]
+        self._sum[idx] += values - old
+        self._sum2[idx] += values * values - old * old
+        self._ring[idx, pos] = values
+
+        mean = self._sum[idx] / self.period
+        std = np.sqrt(np.maximum(self._sum2[idx] / self.period - mean * mean, 0.0))
+        result = np.stack([mean + self.nbdevup * std, mean, mean - self.nbdevdn * std], axis=1)
+        result[self._count[idx] < self.period] = np.nan
+        return result
+
+
+class OBV(Indicator):
+    """On balance volume, the volume is added on up bars and subtracted on down bars"""
+
+    bars = True
+
+    def __init__(self, assets: int = 64) -> None:
+        super().__init__(assets)
+        self._prev = self._array("_prev")
+        self._obv = self._array("_obv")
+
+    def warmup(self):
+        return 1
+
+    def _update(self, values, idx):
+        close, volume = values[:, 3], values[:, 4]
+        first = self._count[idx] == 1
+        direction = np.sign(close - self._prev[idx])
+        self._obv[idx] = np.where(first, volume, self._obv[idx] + direction * volume)
+        self._prev[idx] = close
+        return self._obv[idx]
+
+
+def _true_range(values: NDArray[np.float64], prev_close: NDArray[np.float64]) -> NDArray[np.float64]:
+    high, low = values[:, 1], values[:, 2]
+    return np.maximum(high - low, np.maximum(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+
+class ATR(Indicator):
+    """Average true range using Wilder's smoothing, the first bar is only used for its close price"""
+
+    bars = True
+
+    def __init__(self, period: int = 14, assets: int = 64) -> None:
+        super().__init__(assets)
+        self.period = period
+        self._prev = self._array("_prev")
+        self._atr = self._array("_atr")
+
+    def warmup(self):
+        return self.period + 1
+
+    def _update(self, values, idx):
+        p = self.period
+        count = self._count[idx]
+        tr = np.where(count > 1, _true_range(values, self._prev[idx]), 0.0)
+        self._prev[idx] = values[:, 3]
+
+        atr = self._atr[idx]
+        atr = np.where(count > p + 1, (atr * (p - 1) + tr) / p, atr + tr)
+        atr = np.where(count == p + 1, atr / p, atr)
+        self._atr[idx] = atr
+        return np.where(count > p, atr, np.nan)
+
+
+class ADX(Indicator):
+    """Average directional movement index.
+
+    The true range and directional movements are smoothed with Wilder's method and the DX values are averaged
+    into the ADX, so the first value is available after `2 * period` bars.
+    """
+
+    bars = True
+
+    def __init__(self, period: int = 14, assets: int = 64) -> None:
+        super().__init__(assets)
+        self.period = period
+        self._prev = self._array("_prev", shape=(3,))
+        self._smooth = self._array("_smooth", shape=(3,))
+        self._adx = self._array("_adx")
+
+    def warmup(self):
+        return 2 * self.period
+
+    def _update(self, values, idx):
+        p = self.period
+        count = self._count[idx]
+        prev = self._prev[idx]
+        high, low = values[:, 1], values[:, 2]
+
+        up, down = high - prev[:, 0], prev[:, 1] - low
+        plus_dm = np.where((up > down) & (up > 0.0), up, 0.0)
+        minus_dm = np.where((down > up) & (down > 0.0), down, 0.0)
+        moves = np.stack([_true_range(values, prev[:, 2]), plus_dm, minus_dm], axis=1)
+        moves[count == 1] = 0.0
+        self._prev[idx] = values[:, 1:4]
+
+        # the first period - 1 movements are summed, afterwards Wilder's smoothing is applied
+        smooth = self._smooth[idx]
+        smooth = np.where((count >= p + 1)[:, None], smooth - smooth / p + moves, smooth + moves)
+        self._smooth[idx] = smooth
+
+        tr = smooth[:, 0]
+        di_sum = smooth[:, 1] + smooth[:, 2]
+        dx = np.divide(100.0 * np.abs(smooth[:, 1] - smooth[:, 2]), di_sum, out=np.zeros_like(tr), where=di_sum > 0.0)
+        dx = np.where(tr > 0.0, dx, 0.0)
+
+        adx = self._adx[idx]
+        adx = np.where(count > 2 * p, (adx * (p - 1) + dx) / p, np.where(count >= p + 1, adx + dx, adx))
+        adx = np.where(count == 2 * p, adx / p, adx)
+        self._adx[idx] = adx
+        return np.where(count >= 2 * p, adx, np.nan)
@@ -1,4 +1,6 @@
 from .trader import Trader
+from .rulestats import RuleStats
 from .flextrader import FlexTrader
+from .targettrader import TargetPortfolioTrader
 
-__all__ = ["Trader", "FlexTrader"]
+__all__ = ["Trader", "FlexTrader", "TargetPortfolioTrader", "RuleStats"]
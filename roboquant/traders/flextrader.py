@@ -5,10 +5,14 @@ from enum import Flag, auto
 import random
 from typing import Any
 
+import numpy as np
+
 from roboquant.asset import Asset
 from roboquant.event import Event
+from roboquant.monetary import Amount
 from roboquant.order import Order
-from roboquant.signal import Signal
+from roboquant.signal import Signal, SignalType
+from .rulestats import RuleStats
 from .trader import Trader
 from ..account import Account
 from ..event import PriceItem
@@ -51,22 +55,47 @@ class _PositionChange(Flag):
         return self.name.split(".")[-1]  # type: ignore
 
 
+_RULES = [
+    "one order only",
+    "no known price",
+    "no shorting",
+    "no exit signal",
+    "cannot exit with order size zero",
+    "no more available buying power",
+    "no entry signal",
+    "available buying power below minimum order value",
+    "calculated available order value below minimum order value",
+    "calculated order size is zero",
+    "order value above available buying power",
+    "order value below minimum order value",
+]
+_RULE_IDX = {rule: idx for idx, rule in enumerate(_RULES)}
+
+
 class _Context:
-    def __init__(self, time: datetime) -> None:
+    def __init__(self, time: datetime, stats: RuleStats | None = None) -> None:
+        self.event_time = time
         self.time = time.replace(tzinfo=None)  # Allow for nicer printing
-
-    def log_received(self, **kwargs):
-        if logger.isEnabledFor(logging.INFO):
+        self.stats = stats
+        self.info = logger.isEnabledFor(logging.INFO)
+        self.asset: Asset | None = None
+
+    def log_received(self, signal: Signal, **kwargs):
+        self.asset = signal.asset
+        if self.stats:
+            self.stats.signals += 1
+        if self.info:
             extra = " ".join(f"{k}={v}" for k, v in kwargs.items())
             logger.info(
-                "==> %s received %s",
+                "==> %s received signal=%s %s",
                 self.time,
+                signal,
                 extra
             )
 
     def log_orders(self, orders):
         """Log an exit due to to a signal being converted into an order"""
-        if logger.isEnabledFor(logging.INFO):
+        if self.info:
             logger.info(
                 "<== %s converter signal into order(s) %s",
                 self.time,
@@ -75,7 +104,10 @@ class _Context:
 
     def log_rule(self, rule: str, **kwargs: Any):
         """Log an exit due to a signal being discarded by a triggered rule"""
-        if logger.isEnabledFor(logging.INFO):
+        if self.stats:
+            assert self.asset is not None
+            self.stats.record(self.event_time, self.asset, _RULE_IDX[rule], **kwargs)
+        if self.info:
             extra = " ".join(f"{k}={v}" for k, v in kwargs.items())
             logger.info(
                 "<== %s discarded signal because of '%s' rule %s",
@@ -102,6 +134,13 @@ class FlexTrader(Trader):
     - price_type: the price type to use when determining order value, for example "CLOSE". Default is "DEFAULT"
     - shuffle_signals: shuffle the signals before processing them, default is false
     - valid_for: the time delta for which the order is valid, default is 3 days
+    - batch_threshold: the minimum number of signals to use the vectorized sizing path, default is 64
+    - diagnostics: count the rejected signals per rule in `stats`, a `RuleStats` instance, default is false
+    - sample_rate: the fraction of rejected signals to store as full records if diagnostics is enabled, default is 0.0
+
+    When there are many signals, for example on rebalance days, the rules and order sizes for all the signals are
+    calculated at once with NumPy arrays, and `Order` objects are only created for the signals that pass all rules.
+    The vectorized path applies the same rules, but it doesn't log the individual rules that have been fired.
 
     It might be sometimes challenging to understand why a signal isn't converted into an order. The flex-trader logs
     at INFO level when certain rules have been fired. Enable higher logging:
@@ -109,6 +148,9 @@ class FlexTrader(Trader):
         logging.basicConfig()
         logging.getLogger("roboquant.traders.flextrader").setLevel(logging.INFO)
     ```
+
+    Logging every rule slows down large runs considerably. Enable the diagnostics instead to only count the rules that
+    have been fired, and inspect the results afterwards with `print(trader.stats)`.
     """
 
     def __init__(
@@ -122,6 +164,9 @@ class FlexTrader(Trader):
         max_position_perc: float = 0.1,
         price_type: str = "DEFAULT",
         shuffle_signals: bool = False,
+        batch_threshold: int = 64,
+        diagnostics: bool = False,
+        sample_rate: float = 0.0,
     ) -> None:
         super().__init__()
         self.one_order_only = one_order_only
@@ -134,6 +179,8 @@ class FlexTrader(Trader):
         self.price_type = price_type
         self.shuffle_signals = shuffle_signals
         self.valid_for: timedelta | None = timedelta(days=3)
+        self.batch_threshold = batch_threshold
+        self.stats = RuleStats(_RULES, sample_rate=sample_rate) if diagnostics else None
 
     def _get_order_size(self, rating: float, contract_price: float, max_order_value: float) -> Decimal:
         """Return the order size"""
@@ -149,6 +196,9 @@ class FlexTrader(Trader):
         if self.shuffle_signals:
             random.shuffle(signals)
 
+        if len(signals) >= self.batch_threshold and not logger.isEnabledFor(logging.INFO):
+            return self._create_orders_batch(signals, event, account)
+
         orders: list[Order] = []
         equity = account.equity_value()
         max_order_value = equity * self.max_order_perc
@@ -156,14 +206,14 @@ class FlexTrader(Trader):
         max_pos_value = equity * self.max_position_perc
         available = account.buying_power.value - self.safety_margin_perc * equity
         order_assets = {order.asset for order in account.orders}
-        ctx = _Context(event.time)
+        ctx = _Context(event.time, self.stats)
 
         for signal in signals:
             asset = signal.asset
             pos_size = account.get_position_size(asset)
             change = _PositionChange.get_change(signal.is_buy, pos_size)
 
-            ctx.log_received(signal=signal, position=pos_size, available=available)
+            ctx.log_received(signal, position=pos_size, available=available)
 
             # logger.info("==> received signal available=%s signal=%s pos=%s change=%s", available, signal, pos_size, change)
 
@@ -242,6 +292,154 @@ class FlexTrader(Trader):
 
         return orders
 
+    def _create_orders_batch(self, signals: list[Signal], event: Event, account: Account) -> list[Order]:
+        """Vectorized version of `create_orders` that evaluates the rules and order sizes for all signals at once"""
+        # pylint: disable=too-many-locals
+        equity = account.equity_value()
+        max_order_value = equity * self.max_order_perc
+        min_order_value = equity * self.min_order_perc
+        max_pos_value = equity * self.max_position_perc
+        available = account.buying_power.value - self.safety_margin_perc * equity
+
+        n = len(signals)
+        prices = event.price_items
+        positions = account.positions
+        order_assets = {order.asset for order in account.orders} if self.one_order_only else set()
+        base_currency = account.base_currency
+        rates: dict[Any, float] = {base_currency: 1.0}
+
+        items: list[PriceItem | None] = [prices.get(signal.asset) for signal in signals]
+        rating = np.fromiter((signal.rating for signal in signals), np.float64, n)
+        types = np.fromiter((signal.type.value for signal in signals), np.int64, n)
+        is_entry_signal = (types & SignalType.ENTRY.value) != 0
+        is_exit_signal = (types & SignalType.EXIT.value) != 0
+        valid = np.ones(n, dtype=np.bool_)
+        pos_size = np.zeros(n)
+        contract_price = np.ones(n)
+        pos_value = np.zeros(n)
+
+        # the first rule that rejected a signal, or -1 if it wasn't rejected (yet)
+        reason = np.full(n, -1, dtype=np.int64)
+
+        def reject(mask, rule: str):
+            reason[mask & (reason < 0)] = _RULE_IDX[rule]
+
+        one = Decimal(1)
+        for i, (signal, item) in enumerate(zip(signals, items)):
+            asset = signal.asset
+            if asset in order_assets:
+                valid[i] = False
+                reason[i] = _RULE_IDX["one order only"]
+                continue
+            if item is None:
+                valid[i] = False
+                reason[i] = _RULE_IDX["no known price"]
+                continue
+            rate = rates.get(asset.currency)
+            if rate is None:
+                rate = account.convert(Amount(asset.currency, 1.0))
+                rates[asset.currency] = rate
+            contract_price[i] = asset.contract_value(one, item.price(self.price_type)) * rate
+            if position := positions.get(asset):
+                pos_size[i] = float(position.size)
+                pos_value[i] = asset.contract_value(position.size, position.mkt_price) * rate
+
+        is_buy = rating > 0.0
+        is_exit = np.where(is_buy, pos_size < 0.0, pos_size > 0.0)
+        is_entry_short = ~is_buy & (pos_size <= 0.0)
+        if not self.shorting:
+            valid &= ~is_entry_short
+            reject(is_entry_short, "no shorting")
+
+        # exits don't require buying power
+        exits = valid & is_exit & is_exit_signal
+        exit_size = np.round(-pos_size * np.abs(rating), self.size_digits)
+        exits &= exit_size != 0.0
+        reject(is_exit & ~is_exit_signal, "no exit signal")
+        reject(is_exit & (exit_size == 0.0), "cannot exit with order size zero")
+
+        # entries are sized based on the available buying power, assuming all preceding entries are accepted
+        entries = valid & ~is_exit & is_entry_signal
+        max_value = np.minimum(max_order_value, max_pos_value - np.abs(pos_value))
+        entries &= max_value >= min_order_value
+        size = np.round(rating * np.minimum(max_value, available) / contract_price, self.size_digits)
+        order_value = np.abs(size * contract_price)
+        entries &= (size != 0.0) & (order_value >= min_order_value)
+
+        is_entry = ~is_exit
+        if available < 0:
+            reject(is_entry, "no more available buying power")
+        reject(is_entry & ~is_entry_signal, "no entry signal")
+        if available < min_order_value:
+            reject(is_entry, "available buying power below minimum order value")
+        reject(is_entry & (max_value < min_order_value), "calculated available order value below minimum order value")
+        reject(is_entry & (size == 0.0), "calculated order size is zero")
+        reject(is_entry & (order_value < min_order_value), "order value below minimum order value")
+
+        candidates = np.flatnonzero(entries)
+        values = order_value[candidates]
+        available_before = available - (np.cumsum(values) - values)
+        accepted = np.zeros(n, dtype=np.bool_)
+        created: dict[int, list[Order]] = {}
+        if available - values.sum() >= max(max_order_value, min_order_value) and np.all(available_before >= values):
+            # the buying power doesn't constrain any of the entries
+            accepted[candidates] = True
+        else:
+            # the buying power runs out, so apply the rules sequentially to all the entries
+            for i in np.flatnonzero(valid & is_entry).tolist():
+                reason[i] = -1
+                if available < 0:
+                    reason[i] = _RULE_IDX["no more available buying power"]
+                    continue
+                if not is_entry_signal[i]:
+                    reason[i] = _RULE_IDX["no entry signal"]
+                    continue
+                if available < min_order_value:
+                    reason[i] = _RULE_IDX["available buying power below minimum order value"]
+                    continue
+                value = min(available, max_value[i])
+                if value < min_order_value:
+                    reason[i] = _RULE_IDX["calculated available order value below minimum order value"]
+                    continue
+                order_size = round(rating[i] * value / contract_price[i], self.size_digits)
+                size[i] = order_size
+                new_value = abs(order_size * contract_price[i])
+                if order_size == 0.0:
+                    reason[i] = _RULE_IDX["calculated order size is zero"]
+                elif new_value > available:
+                    reason[i] = _RULE_IDX["order value above available buying power"]
+                elif new_value < min_order_value:
+                    reason[i] = _RULE_IDX["order value below minimum order value"]
+                else:
+                    # like create_orders, only the entries that result in orders use buying power
+                    accepted[i] = True
+                    signal = signals[i]
+                    order_size = round(Decimal(float(order_size)), self.size_digits)
+                    created[i] = self._get_orders(signal.asset, order_size, items[i], signal, event.time)  # type: ignore
+                    if created[i]:
+                        available -= new_value
+
+        if self.stats:
+            self.stats.signals += n
+            self.stats.record_batch(event.time, [signal.asset for signal in signals], reason)
+
+        orders: list[Order] = []
+        for i in np.flatnonzero(exits | accepted).tolist():
+            if i in created:
+                orders += created[i]
+                continue
+            signal = signals[i]
+            item = items[i]
+            assert item is not None
+            if exits[i]:
+                pos = positions[signal.asset].size
+                order_size = round(-pos * abs(Decimal(signal.rating)), self.size_digits)
+            else:
+                order_size = round(Decimal(float(size[i])), self.size_digits)
+            if not order_size.is_zero():
+                orders += self._get_orders(signal.asset, order_size, item, signal, event.time)
+        return orders
+
     def _get_orders(self, asset: Asset, size: Decimal, item: PriceItem, signal: Signal, time: datetime) -> list[Order]:
         # pylint: disable=unused-argument
         """Return zero or more orders for the provided asset and size.
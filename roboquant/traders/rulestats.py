@@ -0,0 +1,127 @@
+from datetime import datetime, timedelta, timezone
+import random
+from typing import Any
+
+import numpy as np
+from numpy.typing import NDArray
+
+from roboquant.asset import Asset
+from roboquant.journals.metric import Metric
+
+
+class RuleStats(Metric):
+    """Low overhead diagnostics that count how often the rules of a trader rejected a signal.
+
+    The rejections are counted in total, per asset and per time bucket using integer arrays, so no log messages need
+    to be formatted. Optionally a fraction of the rejections is sampled as full records, including the values that
+    triggered the rule. The counters can also be used as a `Metric`, for example in a `MetricsJournal`.
+    """
+
+    def __init__(
+        self,
+        rules: list[str],
+        bucket: timedelta = timedelta(days=1),
+        sample_rate: float = 0.0,
+        max_samples: int = 10_000,
+        seed: int | None = None,
+    ):
+        """
+        Args:
+            rules: The names of the rules that can be triggered.
+            bucket: The size of the time buckets, default is one day.
+            sample_rate: The fraction of rejections to store as full records, default is 0.0.
+            max_samples: The maximum number of stored records, default is 10_000.
+            seed: The seed of the random generator used for sampling.
+        """
+        self.rules = list(rules)
+        self.bucket = bucket
+        self.sample_rate = sample_rate
+        self.max_samples = max_samples
+        self.samples: list[dict[str, Any]] = []
+        self.signals = 0
+        self.totals: NDArray[np.int64] = np.zeros(len(self.rules), dtype=np.int64)
+        self.assets: list[Asset] = []
+        self._asset_idx: dict[Asset, int] = {}
+        self._asset_counts: NDArray[np.int64] = np.zeros((64, len(self.rules)), dtype=np.int64)
+        self._buckets: dict[datetime, NDArray[np.int64]] = {}
+        self._rnd = random.Random(seed)
+        self._epoch = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+    def _get_asset_idx(self, asset: Asset) -> int:
+        idx = self._asset_idx.get(asset)
+        if idx is None:
+            idx = len(self.assets)
+            if idx == len(self._asset_counts):
+                self._asset_counts = np.concatenate([self._asset_counts, np.zeros_like(self._asset_counts)])
+            self._asset_idx[asset] = idx
+            self.assets.append(asset)
+        return idx
+
+    def _get_bucket(self, time: datetime) -> NDArray[np.int64]:
+        start = time - (time - self._epoch) % self.bucket
+        counts = self._buckets.get(start)
+        if counts is None:
+            counts = np.zeros(len(self.rules), dtype=np.int64)
+            self._buckets[start] = counts
+        return counts
+
+    def _sample(self, time: datetime, asset: Asset, rule: int, values: dict[str, Any]):
+        if len(self.samples) < self.max_samples:
+            self.samples.append({"time": time, "asset": asset, "rule": self.rules[rule], **values})
+
+    def record(self, time: datetime, asset: Asset, rule: int, **values: Any):
+        """Record a single rejection, the values are only stored if the rejection is sampled"""
+        self.totals[rule] += 1
+        asset_idx = self._get_asset_idx(asset)
+        self._asset_counts[asset_idx, rule] += 1
+        self._get_bucket(time)[rule] += 1
+        if self.sample_rate and self._rnd.random() < self.sample_rate:
+            self._sample(time, asset, rule, values)
+
+    def record_batch(self, time: datetime, assets: list[Asset], rules: NDArray[np.int64]):
+        """Record the rejections of a batch of signals. Signals with a negative rule value were not rejected."""
+        rejected = np.flatnonzero(rules >= 0)
+        if not len(rejected):
+            return
+        rules = rules[rejected]
+        counts = np.bincount(rules, minlength=len(self.rules))
+        self.totals += counts
+        self._get_bucket(time)[:] += counts
+        asset_idx = np.fromiter((self._get_asset_idx(assets[i]) for i in rejected.tolist()), np.int64, len(rejected))
+        np.add.at(self._asset_counts, (asset_idx, rules), 1)
+        if self.sample_rate:
+            for i in np.flatnonzero(np.random.default_rng(self._rnd.getrandbits(32)).random(len(rejected)) < self.sample_rate):
+                self._sample(time, assets[rejected[i]], int(rules[i]), {})
+
+    def by_asset(self) -> dict[Asset, dict[str, int]]:
+        """Return the number of rejections per asset and rule"""
+        return {
+            asset: {rule: int(cnt) for rule, cnt in zip(self.rules, self._asset_counts[idx]) if cnt}
+            for idx, asset in enumerate(self.assets)
+        }
+
+    def by_time(self) -> dict[datetime, dict[str, int]]:
+        """Return the number of rejections per time bucket and rule"""
+        return {
+            start: {rule: int(cnt) for rule, cnt in zip(self.rules, counts) if cnt}
+            for start, counts in sorted(self._buckets.items())
+        }
+
+    def summary(self) -> str:
+        """Return a table with the number of rejections per rule, sorted by the number of rejections"""
+        width = max(len(rule) for rule in self.rules)
+        lines = [f"{'rule':<{width}} {'count':>10} {'perc':>7}", f"{'signals':<{width}} {self.signals:>10}"]
+        for idx in np.argsort(-self.totals, kind="stable").tolist():
+            cnt = int(self.totals[idx])
+            perc = cnt / self.signals * 100.0 if self.signals else 0.0
+            lines.append(f"{self.rules[idx]:<{width}} {cnt:>10} {perc:>6.1f}%")
+        return "\n".join(lines)
+
+    def calc(self, event, account, signals, orders) -> dict[str, float]:
+        result: dict[str, float] = {"rules/signals": self.signals}
+        for rule, cnt in zip(self.rules, self.totals.tolist()):
+            result[f"rules/{rule.replace(' ', '_')}"] = cnt
+        return result
+
+    def __str__(self) -> str:
+        return self.summary()
@@ -0,0 +1,163 @@
+from datetime import timedelta
+import logging
+from decimal import Decimal
+
+import numpy as np
+from numpy.typing import NDArray
+
+from roboquant.account import Account
+from roboquant.event import Event
+from roboquant.monetary import Amount, Currency
+from roboquant.order import Order
+from roboquant.signal import Signal, SignalType
+from .trader import Trader
+
+logger = logging.getLogger(__name__)
+
+
+class TargetPortfolioTrader(Trader):
+    """Trader that converts the signals into a target portfolio and creates the orders to rebalance towards it.
+
+    The ratings of the signals are scaled into target weights (position value as a fraction of the equity). A single
+    scale factor is solved for all the assets, so that the gross exposure of the target portfolio is as large as
+    possible without exceeding `1.0 - safety_margin_perc`, and the weight of every position is capped at
+    `max_position_perc`. Since all the signals are solved at once, the result doesn't depend on the order of the
+    signals. A rating of zero closes a position, and assets without a signal keep their current position.
+
+    The rebalance trades are then constrained:
+    - ENTRY signals can only increase positions and EXIT signals can only reduce them
+    - the value of a single trade is capped at `max_order_perc` of the equity
+    - the trades that increase the exposure are scaled down to the available buying power
+    - all trades are scaled down so the turnover doesn't exceed `max_turnover_perc` of the equity
+    - trades below `min_order_perc` of the equity are skipped, to avoid many tiny orders
+
+    Assets with open orders or without a price in the event are not rebalanced.
+    """
+
+    def __init__(
+        self,
+        max_position_perc: float = 0.1,
+        max_order_perc: float = 0.1,
+        min_order_perc: float = 0.005,
+        safety_margin_perc: float = 0.05,
+        max_turnover_perc: float | None = None,
+        shorting: bool = False,
+        size_fractions: int = 0,
+        price_type: str = "DEFAULT",
+    ) -> None:
+        super().__init__()
+        self.max_position_perc = max_position_perc
+        self.max_order_perc = max_order_perc
+        self.min_order_perc = min_order_perc
+        self.safety_margin_perc = safety_margin_perc
+        self.max_turnover_perc = max_turnover_perc
+        self.shorting = shorting
+        self.size_digits = size_fractions
+        self.price_type = price_type
+        self.valid_for: timedelta | None = timedelta(days=3)
+
+    def _target_weights(self, ratings: NDArray[np.float64], fixed_exposure: float) -> NDArray[np.float64]:
+        """Solve the scale factor that maps the ratings to the target weights, using bisection over all assets"""
+        budget = max(1.0 - self.safety_margin_perc - fixed_exposure, 0.0)
+        cap = self.max_position_perc
+        abs_ratings = np.abs(ratings)
+        if not abs_ratings.any():
+            return np.zeros_like(ratings)
+
+        def gross(scale: float) -> float:
+            return float(np.minimum(abs_ratings * scale, cap).sum())
+
+        low, high = 0.0, cap / abs_ratings[abs_ratings > 0.0].min()
+        if gross(high) <= budget:
+            return np.clip(ratings * high, -cap, cap)
+
+        for _ in range(50):
+            mid = (low + high) / 2.0
+            if gross(mid) > budget:
+                high = mid
+            else:
+                low = mid
+        return np.clip(ratings * low, -cap, cap)
+
+    def create_orders(self, signals: list[Signal], event: Event, account: Account) -> list[Order]:
+        # pylint: disable=too-many-locals
+        if not signals:
+            return []
+
+        # only the last signal of an asset is used, and assets with open orders or without a price are skipped
+        order_assets = {order.asset for order in account.orders}
+        prices = event.price_items
+        latest = {s.asset: s for s in signals if s.asset not in order_assets and s.asset in prices}
+        if not latest:
+            return []
+
+        equity = account.equity_value()
+        assets = list(latest)
+        n = len(assets)
+        rates = {account.base_currency: 1.0}
+
+        def rate(currency: Currency) -> float:
+            """Return the value of one unit of the currency in the base currency of the account"""
+            if (value := rates.get(currency)) is None:
+                value = rates[currency] = account.convert(Amount(currency, 1.0))
+            return value
+
+        ratings = np.fromiter((latest[asset].rating for asset in assets), np.float64, n)
+        types = np.fromiter((latest[asset].type.value for asset in assets), np.int64, n)
+        contract_price = np.empty(n)
+        current = np.zeros(n)
+
+        one = Decimal(1)
+        for i, asset in enumerate(assets):
+            contract_price[i] = asset.contract_value(one, prices[asset].price(self.price_type)) * rate(asset.currency)
+            if position := account.positions.get(asset):
+                current[i] = float(position.size) * contract_price[i]
+
+        if not self.shorting:
+            ratings = np.maximum(ratings, 0.0)
+
+        # the exposure of positions without a signal remains unchanged, denoted in the base currency like the equity
+        gross_exposure = sum(
+            abs(account.position_value(asset)) * rate(asset.currency) for asset in account.positions if asset not in latest
+        )
+        weights = self._target_weights(ratings, gross_exposure / equity)
+        delta = weights * equity - current
+
+        # ENTRY signals can only increase the position, EXIT signals can only reduce it
+        increases = np.abs(current + delta) > np.abs(current)
+        allowed = np.where(increases, types & SignalType.ENTRY.value, types & SignalType.EXIT.value) != 0
+        delta = np.where(allowed, delta, 0.0)
+
+        max_order_value = self.max_order_perc * equity
+        delta = np.clip(delta, -max_order_value, max_order_value)
+
+        # scale down the increases to the available buying power
+        extra = np.maximum(np.abs(current + delta) - np.abs(current), 0.0)
+        available = max(account.buying_power.value - self.safety_margin_perc * equity, 0.0)
+        if (total := extra.sum()) > available:
+            delta = np.where(extra > 0.0, delta * available / total, delta)
+
+        if self.max_turnover_perc is not None:
+            turnover = np.abs(delta).sum()
+            max_turnover = self.max_turnover_perc * equity
+            if turnover > max_turnover:
+                delta *= max_turnover / turnover
+
+        sizes = np.round(delta / contract_price, self.size_digits)
+        values = np.abs(sizes * contract_price)
+        trades = np.flatnonzero((sizes != 0.0) & (values >= self.min_order_perc * equity))
+
+        gtd = None if not self.valid_for else event.time + self.valid_for
+        orders = []
+        for i in trades.tolist():
+            asset = assets[i]
+            size = round(Decimal(float(sizes[i])), self.size_digits)
+            limit = round(prices[asset].price(self.price_type), 2)
+            orders.append(Order(asset, size, limit, gtd))
+
+        logger.info("rebalance time=%s signals=%s orders=%s", event.time, len(signals), len(orders))
+        return orders
+
+    def __str__(self) -> str:
+        attrs = " ".join([f"{k}={v}" for k, v in self.__dict__.items() if not k.startswith("_")])
+        return f"TargetPortfolioTrader({attrs})"
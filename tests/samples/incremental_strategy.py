@@ -0,0 +1,40 @@
+# %%
+# This sample doesn't require ta-lib, it uses the native incremental indicators
+import numpy as np
+
+import roboquant as rq
+from roboquant.ta.incremental import BBANDS, RSI
+
+
+# %%
+class MyStrategy(rq.strategies.Strategy):
+    """Example using incremental indicators to create a combined RSI/BollingerBand strategy:
+    - BUY if `RSI < 30 and close < lower band`
+    - SELL if `RSI > 70 and close > upper band`
+    - Otherwise do nothing
+
+    The indicators are updated for all the assets in the event at once, and only with the latest bars.
+    """
+
+    def __init__(self, period: int):
+        self.rsi = RSI(period)
+        self.bbands = BBANDS(period, nbdevup=2, nbdevdn=2)
+
+    def create_signals(self, event: rq.Event):
+        assets, rsi = self.rsi.update_event(event, "CLOSE")
+        _, bbands = self.bbands.update_event(event, "CLOSE")
+        close = np.array([event.get_price(asset, "CLOSE") for asset in assets])
+
+        buy = (rsi < 30) & (close < bbands[:, 2])
+        sell = (rsi > 70) & (close > bbands[:, 0])
+        return [rq.Signal.buy(assets[i]) for i in np.flatnonzero(buy)] + [
+            rq.Signal.sell(assets[i]) for i in np.flatnonzero(sell)
+        ]
+
+
+# %%
+feed = rq.feeds.YahooFeed("IBM", "AAPL")
+strategy = MyStrategy(13)
+
+account = rq.run(feed, strategy)
+print(account)
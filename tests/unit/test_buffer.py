@@ -1,8 +1,11 @@
 from array import array
+from datetime import datetime, timezone
 import unittest
 import numpy as np
 
-from roboquant.strategies.buffer import NumpyBuffer
+from roboquant.asset import Stock
+from roboquant.event import Bar, Event
+from roboquant.strategies.buffer import NumpyBuffer, OHLCVTensor
 
 
 class TestBuffer(unittest.TestCase):
@@ -24,6 +27,56 @@ class TestBuffer(unittest.TestCase):
         a = np.asarray(b)
         self.assertEqual(3, len(a))
 
+    def test_ohlcv_tensor(self):
+        tensor = OHLCVTensor(10, assets=2)
+        assets = [Stock(f"S{i}") for i in range(5)]
+        now = datetime.now(timezone.utc)
+        for step in range(25):
+            # the last asset only has a bar every other step
+            bars = [Bar(asset, array("f", [step + i] * 5)) for i, asset in enumerate(assets) if i < 4 or step % 2]
+            ready = tensor.add_event(Event(now, bars))
+            if step == 23:
+                self.assertEqual([0, 1, 2, 3, 4], ready.tolist())
+
+        self.assertEqual([0, 1, 2, 3], ready.tolist())
+        self.assertEqual(5, len(tensor))
+        window = tensor.window(assets[1])
+        self.assertEqual(np.arange(16, 26).tolist(), window[:, 3].tolist())
+        self.assertTrue(np.shares_memory(window, tensor._data))
+        self.assertEqual(list(range(7, 29, 2))[-10:], tensor.window(4)[:, 0].tolist())
+        windows = tensor.windows(np.array([1, 4]))
+        self.assertEqual((2, 10, 5), windows.shape)
+        self.assertEqual(tensor.window(4).tolist(), windows[1].tolist())
+
+        tensor.reset()
+        self.assertEqual(0, len(tensor.window(assets[0])))
+        self.assertFalse(tensor.ready_assets())
+
+    def test_aligned_ohlcv_tensor(self):
+        tensor = OHLCVTensor(4, aligned=True)
+        apple, tesla = Stock("AAPL"), Stock("TSLA")
+        now = datetime.now(timezone.utc)
+        for step in range(6):
+            bars = [Bar(apple, array("f", [step] * 5))]
+            if step >= 3:
+                bars.append(Bar(tesla, array("f", [10 + step] * 5)))
+            ready = tensor.add_event(Event(now, bars))
+        self.assertEqual([0], ready.tolist())
+
+        matrix = tensor.matrix()
+        self.assertEqual((2, 4, 5), matrix.shape)
+        self.assertTrue(np.shares_memory(matrix, tensor._data))
+        self.assertEqual([2.0, 3.0, 4.0, 5.0], matrix[0, :, 3].tolist())
+        self.assertEqual([False, True, True, True], (~np.isnan(matrix[1, :, 3])).tolist())
+        self.assertEqual(15.0, tensor.window(tesla)[-1, 0])
+
+        # tesla has 3 bars, but a window of 4 bars that has a gap isn't ready
+        self.assertEqual({apple}, tensor.ready_assets())
+        tensor.add_event(Event(now, [Bar(tesla, array("f", [16] * 5))]))
+        self.assertEqual({tesla}, tensor.ready_assets())
+        tensor.add_event(Event(now, [Bar(apple, array("f", [7] * 5)), Bar(tesla, array("f", [17] * 5))]))
+        self.assertEqual({tesla}, tensor.ready_assets())
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import numpy as np
+
+from roboquant.asset import Crypto, Stock
+from roboquant.brokers import (
+    BpsCommission,
+    CompositeCommission,
+    PerShareCommission,
+    RegulatoryFee,
+    SimBroker,
+    TieredCommission,
+)
+from roboquant.event import Event, Trade
+from roboquant.monetary import Amount
+from roboquant.order import Order
+
+
+class _FixedFeeBroker(SimBroker):
+
+    def _fee(self, trx):
+        return Amount(trx.asset.currency, super()._fee(trx).value + 2.0)
+
+
+class TestCommission(unittest.TestCase):
+
+    now = datetime(2024, 3, 15, tzinfo=timezone.utc)
+
+    def _calc(self, model, sizes, price=50.0, time=None):
+        sizes = np.array(sizes, dtype=np.float64)
+        prices = np.full(len(sizes), price)
+        return model.calc(time or self.now, sizes, prices, sizes * prices).tolist()
+
+    def test_per_share(self):
+        model = PerShareCommission(0.005, minimum=1.0, max_pct=0.01)
+        self.assertEqual([1.0, 2.5, 0.05], self._calc(model, [100, -500, 1], price=5.0))
+
+    def test_bps(self):
+        self.assertEqual([5.0, 10.0], self._calc(BpsCommission(10.0), [100, -200]))
+
+    def test_tiered(self):
+        model = TieredCommission([(0, 0.01), (1_000, 0.005)], minimum=0.0)
+        self.assertEqual([6.0, 4.0, 2.5], self._calc(model, [600, 400, -500]))
+        self.assertEqual([1.0], self._calc(model, [200]))
+
+        # the volume resets every month
+        self.assertEqual([2.0], self._calc(model, [200], time=datetime(2024, 4, 1, tzinfo=timezone.utc)))
+
+    def test_regulatory(self):
+        model = CompositeCommission(RegulatoryFee(0.0001, 0.001, 0.5), BpsCommission(1.0))
+        fees = self._calc(model, [1000, -1000])
+        self.assertAlmostEqual(5.0, fees[0])
+        self.assertAlmostEqual(5.0 + 5.0 + 0.5, fees[1])
+
+    def test_simbroker_commission(self):
+        apple = Stock("AAPL")
+        btc = Crypto.from_symbol("BTC/USD")
+        commission = {"Stock": PerShareCommission(0.01, minimum=1.0), "Crypto": BpsCommission(10.0)}
+        broker = SimBroker(slippage=0.0, commission=commission, validate=True)
+        broker.place_orders([Order(apple, 50, 110.0), Order(btc, Decimal("0.5"), 60_000.0)])
+        event = Event(self.now, [Trade(apple, 100.0, 1000), Trade(btc, 50_000.0, 10)])
+        account = broker.sync(event)
+
+        self.assertAlmostEqual(1_000_000.0 - 5_000.0 - 1.0 - 25_000.0 - 25.0, account.convert(account.cash))
+        self.assertEqual([1.0, 25.0], broker.transactions.columns()["fee"].tolist())
+
+    def test_simbroker_reset(self):
+        apple = Stock("AAPL")
+        broker = SimBroker(slippage=0.0, commission=TieredCommission([(0, 0.01), (100, 0.005)], minimum=0.0))
+        for _ in range(2):
+            broker.reset()
+            broker.place_orders([Order(apple, 150, 110.0)])
+            broker.sync(Event(self.now, [Trade(apple, 100.0, 1000)]))
+            self.assertEqual([1.5], broker.transactions.columns()["fee"].tolist())
+
+    def test_simbroker_fee_hook(self):
+        apple = Stock("AAPL")
+        for commission, expected in ((None, 2.0), (PerShareCommission(0.01, minimum=1.0), 3.0)):
+            broker = _FixedFeeBroker(slippage=0.0, commission=commission)
+            broker.place_orders([Order(apple, 50, 110.0)])
+            account = broker.sync(Event(self.now, [Trade(apple, 100.0, 1000)]))
+            self.assertAlmostEqual(1_000_000.0 - 5_000.0 - expected, account.convert(account.cash))
+            self.assertEqual([expected], broker.transactions.columns()["fee"].tolist())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,10 @@
 from datetime import datetime, timezone
+import tempfile
 import unittest
 
 import numpy as np
 from roboquant.event import Event
+from roboquant.feeds import RandomWalk
 
 from roboquant.ml.features import (
     CacheFeature,
@@ -14,11 +16,33 @@ from roboquant.ml.features import (
     VolumeFeature,
     FixedValueFeature,
     DayOfWeekFeature,
-    MaxReturnFeature
+    MaxReturnFeature,
+    IndicatorFeature,
+    BarFeature,
+    FillFeature,
+    FillWithConstantFeature,
+    PersistentCacheFeature,
+    TaFeature,
 )
+from roboquant.timeframe import Timeframe
+from roboquant.ta.incremental import ATR, MACD
 from tests.common import get_feed
 
 
+class _Momentum(TaFeature):
+
+    def _calc(self, asset, ohlcv):
+        close = ohlcv.close()
+        return close[-1] / close[0] - 1.0
+
+
+class _MatrixMomentum(TaFeature):
+
+    def _calc_matrix(self, windows, mask):
+        close = windows[:, :, 3]
+        return close[:, -1] / close[:, 0] - 1.0
+
+
 class TestFeatures(unittest.TestCase):
 
     def test_all_features(self):
@@ -55,6 +79,164 @@ class TestFeatures(unittest.TestCase):
             if not np.isnan(result1):
                 self.assertEqual(result1, result2)
 
+    def test_indicator_feature(self):
+        feed = get_feed()
+        assets = list(feed.assets())[:2]
+        feature = CombinedFeature(IndicatorFeature(ATR(5), *assets), IndicatorFeature(MACD(3, 6, 3), *assets))
+        self.assertEqual(8, feature.size())
+
+        seen = np.zeros(2)
+        for evt in feed.play():
+            result = feature.calc(evt)
+            self.assertEqual(feature.size(), len(result))
+            # assets without a bar in the event, or without enough history, have NaN values
+            present = np.array([asset in evt.price_items for asset in assets])
+            seen += present
+            self.assertEqual((present & (seen > 5)).tolist(), (~np.isnan(result[:2])).tolist())
+            self.assertEqual(np.repeat(present & (seen >= 8), 3).tolist(), (~np.isnan(result[2:])).tolist())
+
+        feature.reset()
+        evt = next(iter(feed.play()))
+        self.assertTrue(np.isnan(feature.calc(evt)).all())
+
+    def test_compiled_feature(self):
+        feed = get_feed()
+        symbol1, symbol2 = list(feed.assets())[:2]
+
+        def create():
+            close = PriceFeature(symbol1, price_type="CLOSE")
+            return CombinedFeature(
+                close,
+                CombinedFeature(PriceFeature(symbol1, price_type="CLOSE").returns(), PriceFeature(symbol2).returns(3)),
+                SMAFeature(PriceFeature(symbol1, price_type="CLOSE"), 10),
+                FillFeature(PriceFeature(symbol1, symbol2, price_type="CLOSE").returns()),
+                CombinedFeature(BarFeature(symbol1, symbol2), VolumeFeature(symbol1))[3:9],
+                close.normalize(),
+                DayOfWeekFeature()[2:4],
+            )
+
+        feature, compiled = create(), create().compile()
+        self.assertEqual(feature.size(), compiled.size())
+        # the identical close price features are calculated once, and the nested combined feature is resolved
+        self.assertEqual(13, compiled.nodes())
+
+        for _ in range(2):
+            for evt in feed.play():
+                result = compiled.calc(evt)
+                self.assertTrue(np.array_equal(feature.calc(evt), result, equal_nan=True))
+            feature.reset()
+            compiled.reset()
+
+    def test_calc_batch(self):
+        feed = get_feed()
+        symbol1, symbol2 = list(feed.assets())[:2]
+        events = list(feed.play())
+        first = Timeframe(events[0].time, events[600].time)
+
+        def exact():
+            return CombinedFeature(
+                PriceFeature(symbol1, price_type="CLOSE"),
+                CombinedFeature(PriceFeature(symbol1).returns(), PriceFeature(symbol2).returns(3)),
+                FillFeature(PriceFeature(symbol1, symbol2, price_type="CLOSE").returns()),
+                FillWithConstantFeature(PriceFeature(symbol2), 1.0),
+                CombinedFeature(BarFeature(symbol1, symbol2), VolumeFeature(symbol1))[3:9],
+                DayOfWeekFeature()[2:4],
+            )
+
+        def approx():
+            return CombinedFeature(
+                SMAFeature(PriceFeature(symbol1, symbol2, price_type="CLOSE"), 10),
+                PriceFeature(symbol1, symbol2).returns().normalize(),
+            )
+
+        for create, tolerance in ((exact, 0.0), (approx, 1e-4)):
+            streaming, batch = create(), create()
+            # the batch calculation leaves the feature in the same state, so streaming can continue afterwards
+            expected = np.array([streaming.calc(evt) for evt in events])
+            result = np.vstack([batch.calc_batch(feed, first), [batch.calc(evt) for evt in events[600:]]])
+            self.assertEqual(expected.shape, result.shape)
+            np.testing.assert_allclose(expected, result, rtol=tolerance, atol=tolerance)
+
+    def test_persistent_cache(self):
+        feed = get_feed()
+        symbol1, symbol2 = list(feed.assets())[:2]
+
+        def create():
+            return CombinedFeature(PriceFeature(symbol1, symbol2), PriceFeature(symbol1).returns())
+
+        uncached = create()
+        expected = np.array([uncached.calc(evt) for evt in feed.play()])
+        with tempfile.TemporaryDirectory() as path:
+            feature = PersistentCacheFeature(create(), path, feed, max_items=100)
+            result = np.array([feature.calc(evt) for evt in feed.play()])
+            np.testing.assert_array_equal(expected, result)
+            feature.reset()
+            self.assertEqual(len(expected), len(feature))
+
+            # a new instance, like in another process, finds the same cache and doesn't calculate the feature
+            cached = PersistentCacheFeature(create(), path, feed)
+            self.assertEqual(feature.key, cached.key)
+            self.assertEqual(len(expected), len(cached))
+            cached.feature = FixedValueFeature(np.zeros(3))
+            np.testing.assert_array_equal(expected, [cached.calc(evt) for evt in feed.play()])
+            np.testing.assert_array_equal(expected, cached.calc_batch(feed))
+
+            validated = PersistentCacheFeature(create(), path, feed, validate=True)
+            np.testing.assert_array_equal(expected, [validated.calc(evt) for evt in feed.play()])
+
+            other = PersistentCacheFeature(PriceFeature(symbol1), path, feed)
+            self.assertNotEqual(feature.key, other.key)
+            self.assertEqual(0, len(other))
+
+            cached.clear()
+            self.assertEqual(0, len(PersistentCacheFeature(create(), path, feed)))
+
+    def test_persistent_cache_feed_identity(self):
+        # same type, timeframe and assets, but different prices
+        feed1 = RandomWalk(n_prices=50, seed=1)
+        feed2 = RandomWalk(n_prices=50, seed=1, start_price_min=10.0)
+        self.assertEqual(feed1.assets(), feed2.assets())
+        self.assertEqual(feed1.timeframe(), feed2.timeframe())
+
+        with tempfile.TemporaryDirectory() as path:
+            feature1 = PersistentCacheFeature(PriceFeature(*feed1.assets()), path, feed1)
+            for evt in feed1.play():
+                feature1.calc(evt)
+            feature1.flush()
+
+            self.assertEqual(feature1.key, PersistentCacheFeature(PriceFeature(*feed1.assets()), path, feed1).key)
+            feature2 = PersistentCacheFeature(PriceFeature(*feed2.assets()), path, feed2)
+            self.assertNotEqual(feature1.key, feature2.key)
+            self.assertEqual(0, len(feature2))
+
+            # the data is always part of the key
+            with self.assertRaises(AssertionError):
+                PersistentCacheFeature(PriceFeature(*feed1.assets()), path, "")
+
+    def test_persistent_cache_shared_features(self):
+        feed = get_feed()
+        x, y = PriceFeature(*feed.assets()[:1]), VolumeFeature(*feed.assets()[:1])
+        with tempfile.TemporaryDirectory() as path:
+            key1 = PersistentCacheFeature(CombinedFeature(x, y, x), path, "data").key
+            key2 = PersistentCacheFeature(CombinedFeature(x, y, y), path, "data").key
+            key3 = PersistentCacheFeature(CombinedFeature(x, y, x), path, "data").key
+            self.assertNotEqual(key1, key2)
+            self.assertEqual(key1, key3)
+
+    def test_ta_feature_matrix(self):
+        feed = get_feed()
+        assets = list(feed.assets())
+        feature, matrix = _Momentum(*assets, history_size=10), _MatrixMomentum(*assets, history_size=10)
+        self.assertIsNone(feature._tensor)
+        self.assertIsNotNone(matrix._tensor)
+        for _ in range(2):
+            for evt in feed.play():
+                expected = feature.calc(evt)
+                self.assertTrue(np.array_equal(expected, matrix.calc(evt), equal_nan=True))
+            self.assertFalse(np.isnan(expected).all())
+            feature.reset()
+            matrix.reset()
+
     def test_slice(self):
         f = FixedValueFeature([1, 2, 3, 4, 5, 6, 7, 8])[1:6:2]
         self.assertEqual(3, f.size())
@@ -0,0 +1,201 @@
+import unittest
+from array import array
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import numpy as np
+
+from roboquant.asset import Stock
+from roboquant.brokers import (
+    FullFillModel,
+    IntrabarFillModel,
+    QuoteDepthFillModel,
+    SimBroker,
+    SquareRootImpact,
+    VolumeFillModel,
+)
+from roboquant.event import Bar, Event, Quote, Trade
+from roboquant.order import Order
+
+
+class TestFillModel(unittest.TestCase):
+
+    apple = Stock("AAPL")
+
+    @staticmethod
+    def _orders(n, start=0):
+        result = []
+        for i in range(start, start + n):
+            order = Order(TestFillModel.apple, 1, 100.0)
+            order.id = str(i)
+            result.append(order)
+        return result
+
+    def test_full_fill(self):
+        model = FullFillModel(slippage=None)
+        item = Trade(self.apple, 100.0, 1000)
+        fills, prices = model.fill(item, np.array([10.0, 10.0, -5.0]), np.array([101.0, 99.0, 99.0]), self._orders(3))
+        self.assertEqual([10.0, 0.0, -5.0], fills.tolist())
+        self.assertEqual([100.0, 100.0, 100.0], prices.tolist())
+
+    def test_volume_fill(self):
+        model = VolumeFillModel(0.1)
+        item = Bar(self.apple, array("f", [100.0, 101.0, 99.0, 100.0, 500.0]))
+        fills, _ = model.fill(item, np.array([30.0, -40.0, 10.0]), np.array([101.0, 99.0, 101.0]), self._orders(3))
+        self.assertEqual([30.0, -20.0, 0.0], fills.tolist())
+
+    def test_square_root_impact(self):
+        impact = SquareRootImpact(1.0, volatility=0.02)
+        item = Trade(self.apple, 100.0, 10_000)
+        prices = impact.apply(np.array([100.0, 100.0]), np.array([100.0, -400.0]), item)
+        self.assertAlmostEqual(100.2, prices[0])
+        self.assertAlmostEqual(99.6, prices[1])
+
+    def test_quote_depth(self):
+        model = QuoteDepthFillModel()
+        quote = Quote(self.apple, array("f", [101.0, 50.0, 100.0, 80.0]))
+        remaining = np.array([30.0, 30.0, 20.0])
+        limit = np.array([101.0, 101.0, 100.0])
+        fills, prices = model.fill(quote, remaining, limit, self._orders(3))
+        self.assertEqual([30.0, 20.0, 0.0], fills.tolist())
+        self.assertEqual([101.0, 101.0, 100.0], prices.tolist())
+
+        # The passive BUY order is at the back of the queue of 80 at the bid
+        quote = Quote(self.apple, array("f", [101.0, 50.0, 100.0, 10.0]))
+        fills, _ = model.fill(quote, np.array([20.0]), np.array([100.0]), self._orders(1, 2))
+        self.assertEqual([0.0], fills.tolist())
+        quote = Quote(self.apple, array("f", [101.0, 50.0, 100.0, 0.0]))
+        fills, _ = model.fill(quote, np.array([20.0]), np.array([100.0]), self._orders(1, 2))
+        self.assertEqual([0.0], fills.tolist())
+
+        # The bid moved through the limit of the order
+        quote = Quote(self.apple, array("f", [100.5, 50.0, 99.0, 10.0]))
+        fills, _ = model.fill(quote, np.array([20.0]), np.array([100.0]), self._orders(1, 2))
+        self.assertEqual([20.0], fills.tolist())
+
+    def test_quote_depth_reset(self):
+        model = QuoteDepthFillModel()
+        broker = SimBroker(fill_model=model)
+        now = datetime.now(timezone.utc)
+
+        def run_quotes(*bid_volumes):
+            broker.place_orders([Order(self.apple, 20, 100.0)])
+            sizes = []
+            for i, volume in enumerate(bid_volumes):
+                quote = Quote(self.apple, array("f", [101.0, 50.0, 100.0, volume]))
+                account = broker.sync(Event(now + timedelta(minutes=i), [quote]))
+                sizes.append(account.get_position_size(self.apple))
+            return sizes
+
+        self.assertEqual([Decimal(0), Decimal(0)], run_quotes(20.0, 15.0))
+
+        # after a reset, the new order with the same id joins the back of the queue
+        broker.reset()
+        self.assertEqual([Decimal(0), Decimal(0)], run_quotes(5.0, 5.0))
+
+        # the queue state of a cancelled order is released
+        broker.place_orders([broker.sync().orders[0].cancel()])
+        broker.sync()
+        self.assertFalse(model._queues)
+
+    def test_simbroker_partial_fills(self):
+        broker = SimBroker(fill_model=VolumeFillModel(0.1), validate=True)
+        order = Order(self.apple, 150, 110.0)
+        broker.place_orders([order])
+        now = datetime.now(timezone.utc)
+        for i in range(3):
+            event = Event(now + timedelta(minutes=i), [Trade(self.apple, 100.0, 1000)])
+            account = broker.sync(event)
+            expected = min(150, (i + 1) * 100)
+            self.assertEqual(Decimal(expected), account.get_position_size(self.apple))
+
+        self.assertEqual(0, len(account.orders))
+
+    def test_intrabar(self):
+        model = IntrabarFillModel()
+        # bar closes below the open, so the path is open -> high -> low -> close
+        item = Bar(self.apple, array("f", [100.0, 104.0, 96.0, 98.0, 1000.0]))
+        orders = self._orders(5)
+        orders[2].info["stop"] = 103.0
+        orders[3].info["stop"] = 95.0
+        orders[4].info["stop"] = 102.0
+        remaining = np.array([10.0, -10.0, 10.0, -10.0, -10.0])
+        limit = np.array([97.0, 99.0, 104.0, 94.0, 97.0])
+        fills, prices = model.fill(item, remaining, limit, orders)
+        self.assertEqual([10.0, -10.0, 10.0, 0.0, -10.0], fills.tolist())
+        self.assertEqual([97.0, 100.0, 103.0, 100.0], prices[[0, 1, 2, 4]].tolist())
+
+        # only the order that is touched first within the bar gets filled
+        orders = self._orders(2)
+        for order in orders:
+            order.info["oco"] = "exit"
+        orders[1].info["stop"] = 97.0
+        fills, _ = model.fill(item, np.array([-10.0, -10.0]), np.array([103.0, 90.0]), orders)
+        self.assertEqual([-10.0, 0.0], fills.tolist())
+
+        # the triggered mask is updated with the stops that are reached, and triggered orders start at the open
+        orders = self._orders(3)
+        for order, stop in zip(orders, [97.0, 90.0, 110.0]):
+            order.info["stop"] = stop
+        triggered = np.array([False, False, True])
+        fills, prices = model.fill(item, np.array([-10.0, -10.0, 10.0]), np.array([99.0, 99.0, 101.0]), orders, triggered)
+        self.assertEqual([True, False, True], triggered.tolist())
+        self.assertEqual([0.0, 0.0, 10.0], fills.tolist())
+        self.assertEqual(100.0, prices[2])
+
+    def test_simbroker_bracket(self):
+        broker = SimBroker(fill_model=IntrabarFillModel())
+        entry = Order(self.apple, 100, 100.0)
+        broker.place_orders([entry])
+        take_profit = Order(self.apple, -100, 110.0, parent=entry.id, oco="exit")
+        stop_loss = Order(self.apple, -100, 80.0, parent=entry.id, oco="exit", stop=95.0)
+        broker.place_orders([take_profit, stop_loss])
+
+        now = datetime.now(timezone.utc)
+        bars = [[101.0, 112.0, 99.0, 100.0], [100.0, 101.0, 92.0, 94.0], [94.0, 120.0, 90.0, 100.0]]
+        sizes = []
+        for i, ohlc in enumerate(bars):
+            event = Event(now + timedelta(minutes=i), [Bar(self.apple, array("f", ohlc + [1000.0]))])
+            account = broker.sync(event)
+            sizes.append(account.get_position_size(self.apple))
+
+        # the take profit isn't active in the first bar, the stop loss is triggered in the second bar
+        self.assertEqual([Decimal(100), Decimal(0), Decimal(0)], sizes)
+        self.assertEqual(0, len(account.orders))
+        self.assertAlmostEqual(1_000_000.0 - 100 * 100.0 + 100 * 95.0, account.equity_value())
+
+    def test_simbroker_stop_limit_gap(self):
+        broker = SimBroker(fill_model=IntrabarFillModel())
+        broker.place_orders([Order(self.apple, 100, 101.0)])
+        now = datetime.now(timezone.utc)
+        broker.sync(Event(now, [Bar(self.apple, array("f", [100.0, 101.0, 99.0, 100.0, 1000.0]))]))
+        broker.place_orders([Order(self.apple, -100, 94.0, stop=95.0)])
+
+        # the stop is triggered in the first bar, but the price stays below the limit
+        bars = [[93.0, 93.5, 92.0, 92.5], [96.0, 97.0, 95.5, 96.0]]
+        sizes = []
+        for i, ohlc in enumerate(bars, start=1):
+            event = Event(now + timedelta(minutes=i), [Bar(self.apple, array("f", ohlc + [1000.0]))])
+            account = broker.sync(event)
+            sizes.append(account.get_position_size(self.apple))
+
+        # the second bar doesn't touch the stop again, but the order is still triggered and fills at the open
+        self.assertEqual([Decimal(100), Decimal(0)], sizes)
+        self.assertEqual(0, len(account.orders))
+        self.assertAlmostEqual(1_000_000.0 - 100 * 100.0 + 100 * 96.0, account.equity_value())
+
+    def test_simbroker_cancel_parent(self):
+        broker = SimBroker(fill_model=IntrabarFillModel())
+        entry = Order(self.apple, 100, 90.0)
+        broker.place_orders([entry])
+        broker.place_orders([Order(self.apple, -100, 110.0, parent=entry.id)])
+        now = datetime.now(timezone.utc)
+        account = broker.sync(Event(now, [Trade(self.apple, 100.0, 1000)]))
+        self.assertEqual(2, len(account.orders))
+        broker.place_orders([entry.cancel()])
+        account = broker.sync(Event(now + timedelta(minutes=1), [Trade(self.apple, 100.0, 1000)]))
+        self.assertEqual(0, len(account.orders))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import random
+import unittest
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from roboquant.account import Account, Position
+from roboquant.asset import Stock
+from roboquant.event import Event, Trade
+from roboquant.monetary import Amount, USD, Wallet
+from roboquant.order import Order
+from roboquant.signal import Signal, SignalType
+from roboquant.traders import FlexTrader
+
+
+class _SkippingTrader(FlexTrader):
+    """Doesn't create orders for every other asset"""
+
+    def _get_orders(self, asset, size, item, signal, time):
+        if int(asset.symbol[1:]) % 2:
+            return []
+        return super()._get_orders(asset, size, item, signal, time)
+
+
+class TestFlexTrader(unittest.TestCase):
+
+    @staticmethod
+    def _create(n: int, buying_power: float):
+        rnd = random.Random(42)
+        assets = [Stock(f"S{i}") for i in range(n)]
+        account = Account()
+        account.cash = Wallet(Amount(USD, 1_000_000.0))
+        account.buying_power = Amount(USD, buying_power)
+        items = []
+        for asset in assets:
+            price = rnd.uniform(10.0, 500.0)
+            items.append(Trade(asset, price, 1000))
+            if rnd.random() < 0.3:
+                size = Decimal(rnd.choice([-1, 1]) * rnd.randint(1, 200))
+                account.positions[asset] = Position(size, price, price)
+            if rnd.random() < 0.1:
+                account.orders.append(Order(asset, 10, price))
+
+        types = [SignalType.ENTRY, SignalType.EXIT, SignalType.ENTRY_EXIT]
+        signals = [Signal(asset, rnd.uniform(-1.0, 1.0), rnd.choice(types)) for asset in assets]
+        event = Event(datetime.now(timezone.utc), items[: n - 5])
+        return signals, event, account
+
+    def test_batch_sizing(self):
+        for buying_power, shorting in ((10_000_000.0, False), (10_000_000.0, True), (250_000.0, True)):
+            signals, event, account = self._create(500, buying_power)
+            batch = FlexTrader(shorting=shorting, batch_threshold=1).create_orders(signals, event, account)
+            scalar = FlexTrader(shorting=shorting, batch_threshold=10_000).create_orders(signals, event, account)
+            self.assertTrue(scalar)
+            self.assertEqual([(o.asset, o.size, o.limit) for o in scalar], [(o.asset, o.size, o.limit) for o in batch])
+
+    def test_batch_sizing_skipped_orders(self):
+        # entries without orders don't use buying power, also not in the vectorized version
+        for buying_power in (10_000_000.0, 250_000.0):
+            signals, event, account = self._create(500, buying_power)
+            batch = _SkippingTrader(shorting=True, batch_threshold=1).create_orders(signals, event, account)
+            scalar = _SkippingTrader(shorting=True, batch_threshold=10_000).create_orders(signals, event, account)
+            self.assertTrue(scalar)
+            self.assertEqual([(o.asset, o.size, o.limit) for o in scalar], [(o.asset, o.size, o.limit) for o in batch])
+
+    def test_diagnostics(self):
+        for buying_power in (10_000_000.0, 250_000.0, 10_000.0):
+            signals, event, account = self._create(500, buying_power)
+            batch = FlexTrader(batch_threshold=1, diagnostics=True)
+            scalar = FlexTrader(batch_threshold=10_000, diagnostics=True, sample_rate=0.5)
+            batch.create_orders(signals, event, account)
+            scalar.create_orders(signals, event, account)
+            assert batch.stats and scalar.stats
+            self.assertEqual(500, batch.stats.signals)
+            self.assertEqual(scalar.stats.totals.tolist(), batch.stats.totals.tolist())
+            self.assertEqual(scalar.stats.by_asset(), batch.stats.by_asset())
+
+        self.assertTrue(scalar.stats.samples)
+        self.assertEqual(4, scalar.stats.calc(event, account, signals, [])["rules/no_known_price"])
+        self.assertIn("no known price", scalar.stats.summary())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+import unittest
+
+import numpy as np
+
+from roboquant.ta.incremental import ADX, ATR, BBANDS, EMA, MACD, OBV, RSI, SMA
+
+
+def _ema(values, period):
+    result = np.full(len(values), np.nan)
+    result[period - 1] = values[:period].mean()
+    alpha = 2.0 / (period + 1)
+    for i in range(period, len(values)):
+        result[i] = result[i - 1] + alpha * (values[i] - result[i - 1])
+    return result
+
+
+def _wilder(values, period, start):
+    """Wilder's smoothing of values, seeded with the mean of the `period` values that end at start"""
+    result = np.full(len(values), np.nan)
+    result[start] = values[start - period + 1: start + 1].mean()
+    for i in range(start + 1, len(values)):
+        result[i] = (result[i - 1] * (period - 1) + values[i]) / period
+    return result
+
+
+def _true_range(ohlcv):
+    high, low, prev = ohlcv[1:, 1], ohlcv[1:, 2], ohlcv[:-1, 3]
+    return np.r_[0.0, np.maximum(high - low, np.maximum(np.abs(high - prev), np.abs(low - prev)))]
+
+
+def _random_bars(n, seed):
+    rng = np.random.default_rng(seed)
+    close = 100.0 + np.cumsum(rng.normal(size=n))
+    open_ = close + rng.normal(scale=0.3, size=n)
+    high = np.maximum(open_, close) + rng.random(n)
+    low = np.minimum(open_, close) - rng.random(n)
+    volume = rng.integers(1_000, 10_000, n).astype(np.float64)
+    return np.stack([open_, high, low, close, volume], axis=1)
+
+
+class TestIncremental(unittest.TestCase):
+
+    def setUp(self):
+        # three assets with a different number of bars, the updates are interleaved
+        self.bars = [_random_bars(n, seed) for seed, n in enumerate([120, 80, 100])]
+
+    def _run(self, indicator):
+        """Update the indicator one bar at a time, for all assets that still have bars"""
+        results = [[] for _ in self.bars]
+        for step in range(max(len(b) for b in self.bars)):
+            idx = [i for i, b in enumerate(self.bars) if step < len(b)]
+            bars = np.array([self.bars[i][step] for i in idx])
+            values = bars if indicator.bars else bars[:, 3]
+            for i, value in zip(idx, indicator.update(values, idx)):
+                results[i].append(value)
+        return [np.array(r) for r in results]
+
+    def _assert_equal(self, expected, actual):
+        np.testing.assert_array_equal(np.isnan(expected), np.isnan(actual))
+        np.testing.assert_allclose(expected[~np.isnan(expected)], actual[~np.isnan(actual)], rtol=1e-9)
+
+    def test_sma_ema(self):
+        for ohlcv, sma, ema in zip(self.bars, self._run(SMA(10)), self._run(EMA(10))):
+            close = ohlcv[:, 3]
+            expected = np.r_[np.full(9, np.nan), np.convolve(close, np.ones(10) / 10, "valid")]
+            self._assert_equal(expected, sma)
+            self._assert_equal(_ema(close, 10), ema)
+
+    def test_rsi(self):
+        for ohlcv, rsi in zip(self.bars, self._run(RSI(14))):
+            change = np.r_[0.0, np.diff(ohlcv[:, 3])]
+            gain = _wilder(np.maximum(change, 0.0), 14, 14)
+            loss = _wilder(np.maximum(-change, 0.0), 14, 14)
+            self._assert_equal(100.0 * gain / (gain + loss), rsi)
+
+    def test_macd(self):
+        for ohlcv, macd in zip(self.bars, self._run(MACD(12, 26, 9))):
+            close = ohlcv[:, 3]
+            fast = np.r_[np.full(14, np.nan), _ema(close[14:], 12)]
+            line = fast - _ema(close, 26)
+            signal = np.r_[np.full(25, np.nan), _ema(line[25:], 9)]
+            line[np.isnan(signal)] = np.nan
+            self._assert_equal(line, macd[:, 0])
+            self._assert_equal(signal, macd[:, 1])
+            self._assert_equal(line - signal, macd[:, 2])
+
+    def test_bbands(self):
+        for ohlcv, bbands in zip(self.bars, self._run(BBANDS(20, 2.0, 1.5))):
+            windows = np.lib.stride_tricks.sliding_window_view(ohlcv[:, 3], 20)
+            mean, std = windows.mean(axis=1), windows.std(axis=1)
+            self._assert_equal(np.r_[np.full(19, np.nan), mean + 2.0 * std], bbands[:, 0])
+            self._assert_equal(np.r_[np.full(19, np.nan), mean], bbands[:, 1])
+            self._assert_equal(np.r_[np.full(19, np.nan), mean - 1.5 * std], bbands[:, 2])
+
+    def test_obv_atr(self):
+        for ohlcv, obv, atr in zip(self.bars, self._run(OBV()), self._run(ATR(14))):
+            direction = np.r_[1.0, np.sign(np.diff(ohlcv[:, 3]))]
+            self._assert_equal(np.cumsum(direction * ohlcv[:, 4]), obv)
+            self._assert_equal(_wilder(_true_range(ohlcv), 14, 14), atr)
+
+    def test_adx(self):
+        p = 14
+        for ohlcv, adx in zip(self.bars, self._run(ADX(p))):
+            up = np.r_[0.0, np.diff(ohlcv[:, 1])]
+            down = np.r_[0.0, -np.diff(ohlcv[:, 2])]
+            plus_dm = np.where((up > down) & (up > 0), up, 0.0)
+            minus_dm = np.where((down > up) & (down > 0), down, 0.0)
+            moves = [_true_range(ohlcv), plus_dm, minus_dm]
+            smoothed = []
+            for move in moves:
+                s = np.full(len(move), np.nan)
+                s[p] = move[1:p].sum() - move[1:p].sum() / p + move[p]
+                for i in range(p + 1, len(move)):
+                    s[i] = s[i - 1] - s[i - 1] / p + move[i]
+                smoothed.append(s)
+            dx = 100.0 * np.abs(smoothed[1] - smoothed[2]) / (smoothed[1] + smoothed[2])
+            self._assert_equal(_wilder(dx, p, 2 * p - 1), adx)
+
+    def test_grow_and_reset(self):
+        ema = EMA(3, assets=2)
+        for _ in range(3):
+            result = ema.update(np.ones(5) * 2.0, np.arange(5) * 3)
+        np.testing.assert_array_equal(np.full(5, 2.0), result)
+        self.assertEqual(16, len(ema._ema))
+
+        ema.reset()
+        self.assertTrue(np.isnan(ema.update([1.0])).all())
+
+
+if __name__ == "__main__":
+    unittest.main()
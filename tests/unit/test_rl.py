@@ -0,0 +1,129 @@
+import unittest
+
+import numpy as np
+from stable_baselines3 import PPO
+
+import roboquant as rq
+from roboquant.ml.features import BarFeature, EquityFeature
+from roboquant.ml.rl import TradingEnv, VecTradingEnv
+from tests.common import get_feed
+
+
+class TestRL(unittest.TestCase):
+
+    def setUp(self):
+        self.feed = get_feed()
+        self.assets = [asset for asset in self.feed.assets() if asset.symbol in ("AAPL", "AMZN")]
+        self.obs_feature = self._obs_feature()
+
+    def _obs_feature(self):
+        return BarFeature(*self.assets).returns().normalize(20)
+
+    def _env(self, **kwargs):
+        tf = rq.Timeframe.fromisoformat("2022-04-01", "2023-01-01")
+        reward_feature = EquityFeature().returns()
+        return TradingEnv(self.feed, self._obs_feature(), reward_feature, self.assets, timeframe=tf, **kwargs)
+
+    def test_precompute(self):
+        env1 = self._env()
+        env2 = self._env(precompute=True)
+        obs1, _ = env1.reset()
+        obs2, _ = env2.reset()
+        first_obs = obs2
+        done = False
+        while not done:
+            np.testing.assert_allclose(obs1, obs2, atol=1e-4)
+            action = np.ones(len(self.assets))
+            obs1, reward1, done, _, _ = env1.step(action)
+            obs2, reward2, done2, _, _ = env2.step(action)
+            self.assertEqual(done, done2)
+            np.testing.assert_allclose(reward1, reward2, atol=1e-6)
+        self.assertEqual(env1.account.equity_value(), env2.account.equity_value())
+
+        # like a CacheFeature, every episode replays the observations of the first one
+        obs2, _ = env2.reset()
+        np.testing.assert_array_equal(first_obs, obs2)
+
+        # changing the returned observation in-place doesn't change the next episode
+        obs2 *= 0.0
+        obs2, _ = env2.reset()
+        np.testing.assert_array_equal(first_obs, obs2)
+        self.assertFalse(np.shares_memory(obs2, env2._observations))
+
+    def test_random_start(self):
+        account_feature = EquityFeature()
+        env = self._env(precompute=True, random_start=True, episode_length=10, account_feature=account_feature)
+        self.assertEqual((self.obs_feature.size() + 1,), env.observation_space.shape)
+        times = set()
+        for seed in range(5):
+            obs, _ = env.reset(seed=seed)
+            times.add(env.event.time)
+            self.assertEqual(env.observation_space.shape, obs.shape)
+            self.assertFalse(np.isnan(obs).any())
+            for step in range(10):
+                obs, _, done, truncated, _ = env.step(np.ones(len(self.assets)))
+                self.assertFalse(done)
+                self.assertEqual(step == 9, truncated)
+        self.assertEqual(5, len(times))
+
+    def test_vec_env(self):
+        timeframes = rq.Timeframe.fromisoformat("2023-01-01", "2023-07-01").split(3)
+        env = VecTradingEnv(self.feed, self.obs_feature, self.assets, timeframes, slippage=0.0)
+        self.assertEqual(3, env.num_envs)
+
+        obs = env.reset()
+        self.assertEqual((3, self.obs_feature.size()), obs.shape)
+        self.assertFalse(np.isnan(obs).any())
+
+        # no positions means no change in equity
+        env.step_async(np.zeros((3, len(self.assets))))
+        obs, rewards, dones, infos = env.step_wait()
+        self.assertEqual((3, self.obs_feature.size()), obs.shape)
+        np.testing.assert_array_equal(np.zeros(3), rewards)
+        self.assertFalse(dones.any())
+        self.assertEqual(1_000_000.0, infos[0]["equity"])
+
+        # run until all environments are done at least once, they are reset automatically
+        done = np.zeros(3, dtype=np.bool_)
+        actions = np.ones((3, len(self.assets)))
+        for _ in range(200):
+            env.step_async(actions)
+            obs, rewards, dones, infos = env.step_wait()
+            self.assertFalse(np.isnan(rewards).any())
+            for idx in np.flatnonzero(dones):
+                self.assertIn("terminal_observation", infos[idx])
+                self.assertEqual(1_000_000.0, env._equity[idx])
+            done |= dones
+        self.assertTrue(done.all())
+        env.close()
+
+    def test_vec_env_attrs(self):
+        timeframes = rq.Timeframe.fromisoformat("2023-01-01", "2023-07-01").split(3)
+        env = VecTradingEnv(self.feed, self.obs_feature, self.assets, timeframes)
+        self.assertEqual(timeframes, env.get_attr("timeframe"))
+        self.assertEqual([None] * 3, env.get_attr("render_mode"))
+
+        # only the selected environments are changed
+        timeframe = rq.Timeframe.fromisoformat("2023-03-01", "2023-04-01")
+        env.set_attr("timeframe", timeframe, indices=[1])
+        self.assertEqual([timeframes[0], timeframe, timeframes[2]], env.get_attr("timeframe"))
+        self.assertEqual([timeframe], env.get_attr("timeframe", indices=1))
+        self.assertNotIn("timeframe", vars(env))
+
+        env.reset()
+        events = env.env_method("play", indices=[1])
+        self.assertEqual(1, len(events))
+        self.assertIn(next(events[0]).time, timeframe)
+        env.close()
+
+    def test_vec_env_ppo(self):
+        timeframes = rq.Timeframe.fromisoformat("2022-04-01", "2024-01-01").split(4)
+        env = VecTradingEnv(self.feed, self.obs_feature, self.assets, timeframes)
+        model = PPO("MlpPolicy", env, n_steps=32, batch_size=64, n_epochs=1, seed=42)
+        model.learn(total_timesteps=256)
+        actions, _ = model.predict(env.reset(), deterministic=True)
+        self.assertEqual((4, len(self.assets)), actions.shape)
+
+
+if __name__ == "__main__":
+    unittest.main()
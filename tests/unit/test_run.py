@@ -1,10 +1,45 @@
+import asyncio
+import threading
+import time
 import unittest
 from datetime import timedelta
 
 import roboquant as rq
+from roboquant.feeds.live import LiveFeed
+from roboquant.journals.journal import Journal
 from tests.common import get_feed
 
 
+class _ReplayLiveFeed(LiveFeed):
+    """Publishes the events of another feed from a separate thread, like a live feed would"""
+
+    def __init__(self, feed):
+        super().__init__()
+        self.events = list(feed.play())
+
+    def start(self):
+        def publish():
+            while self._async_queue is None:
+                time.sleep(0.001)
+            for event in self.events:
+                self._put(event)
+
+        threading.Thread(target=publish, daemon=True).start()
+
+
+class _AsyncJournal(Journal):
+
+    def __init__(self):
+        self.events = 0
+
+    def track(self, event, account, signals, orders):
+        raise NotImplementedError()
+
+    async def async_track(self, event, account, signals, orders):
+        await asyncio.sleep(0)
+        self.events += 1
+
+
 class TestRoboquant(unittest.TestCase):
 
     def setUp(self):
@@ -16,6 +51,27 @@ class TestRoboquant(unittest.TestCase):
         self.assertEqual(self.feed.timeframe().end, account.last_update)
         self.assertEqual(self.feed.count_items(), journal.items)
 
+    def test_async_run(self):
+        journal = rq.journals.BasicJournal()
+        account = asyncio.run(rq.arun(self.feed, rq.strategies.EMACrossover(), journal=journal))
+        self.assertEqual(self.feed.timeframe().end, account.last_update)
+        self.assertEqual(self.feed.count_items(), journal.items)
+
+        account2 = rq.run(self.feed, rq.strategies.EMACrossover())
+        self.assertAlmostEqual(account2.equity_value(), account.equity_value())
+
+    def test_async_live_run(self):
+        feed = _ReplayLiveFeed(self.feed)
+        tf = rq.Timeframe(feed.events[0].time, feed.events[99].time, True)
+        journal = _AsyncJournal()
+        feed.start()
+        account = asyncio.run(rq.arun(feed, rq.strategies.EMACrossover(), journal=journal, timeframe=tf))
+        self.assertEqual(100, journal.events)
+        self.assertEqual(feed.events[99].time, account.last_update)
+
+        account2 = rq.run(self.feed, rq.strategies.EMACrossover(), timeframe=tf)
+        self.assertAlmostEqual(account2.equity_value(), account.equity_value())
+
     def test_walkforward_run(self):
         account = None
         for tf in self.feed.timeframe().split(5):
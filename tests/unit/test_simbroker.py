@@ -1,12 +1,18 @@
 import unittest
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from decimal import Decimal
 
 from roboquant.event import Event, Trade
 from roboquant.order import Order
 from roboquant.account import Account
 from roboquant.asset import Stock
-from roboquant.brokers import SimBroker
+from roboquant.monetary import Amount, USD
+from roboquant.brokers import SimBroker, FastSimBroker, MarginSimBroker, RegulatoryFee, TransactionLog, VolumeFillModel
+from roboquant.run import run
+from roboquant.signal import Signal
+from roboquant.strategies import EMACrossover
+from roboquant.traders import FlexTrader
+from tests.common import get_feed
 
 
 class TestSimbroker(unittest.TestCase):
@@ -64,6 +70,167 @@ class TestSimbroker(unittest.TestCase):
         self.assertEqual(len(account.positions), 1)
         self.assertEqual(Decimal(50), account.positions[TestSimbroker.apple].size)
 
+    def test_simbroker_order_book(self):
+        broker = SimBroker()
+        tesla = Stock("TSLA")
+        now = datetime.now(timezone.utc)
+        orders = [Order(TestSimbroker.apple, 10, 90.0), Order(tesla, 10, 90.0, now + timedelta(days=1))]
+        broker.place_orders(orders)
+        account = broker.sync()
+        self.assertEqual(len(account.orders), 2)
+
+        # Only the tesla order is still open after cancelling the apple order
+        broker.place_orders([orders[0].cancel()])
+        account = broker.sync()
+        self.assertEqual([o.id for o in account.orders], [orders[1].id])
+
+        # The tesla order expires, even without a price in the event
+        event = Event(now + timedelta(days=2), [Trade(TestSimbroker.apple, 100.0, 1000)])
+        account = broker.sync(event)
+        self.assertEqual(len(account.orders), 0)
+
+    def test_simbroker_running_totals(self):
+        broker = SimBroker(validate=True)
+        broker.place_orders([Order(TestSimbroker.apple, -100, 99.0), Order(TestSimbroker.apple, 10, 90.0)])
+        account = broker.sync(self._create_event(100.0))
+        self.assertEqual(Decimal(-100), account.positions[TestSimbroker.apple].size)
+        self.assertEqual(len(account.orders), 1)
+
+        # The open buy order reduces the short position, so it doesn't require any buying power
+        account = broker.sync(self._create_event(110.0))
+        self.assertAlmostEqual(1_000_000.0 + 100 * 99.9 - 100 * 110.0, account.equity_value())
+        self.assertAlmostEqual(1_000_000.0 + 100 * 99.9 - 100 * 110.0, account.buying_power.value)
+
+    def test_simbroker_stop(self):
+        for broker in (SimBroker(slippage=0.0), SimBroker(fill_model=VolumeFillModel(1.0))):
+            broker.place_orders([Order(self.apple, 100, 1000.0)])
+            broker.sync(self._create_event(100.0))
+
+            # the stop loss isn't triggered at a price of 100
+            broker.place_orders([Order(self.apple, -100, 1.0, stop=90.0)])
+            account = broker.sync(self._create_event(100.0))
+            self.assertEqual(Decimal(100), account.get_position_size(self.apple))
+            self.assertEqual(1, len(account.orders))
+
+            account = broker.sync(self._create_event(89.0))
+            self.assertEqual(Decimal(0), account.get_position_size(self.apple))
+            self.assertEqual(0, len(account.orders))
+
+    def test_fast_simbroker(self):
+        feed = get_feed()
+        accounts = []
+        for broker in (SimBroker(), FastSimBroker(validate=True)):
+            trader = FlexTrader(shorting=True, one_order_only=False)
+            accounts.append(run(feed, EMACrossover(2, 5), trader=trader, broker=broker))
+
+        acc1, acc2 = accounts
+        self.assertAlmostEqual(acc1.equity_value(), acc2.equity_value(), delta=1e-6)
+        self.assertAlmostEqual(acc1.buying_power.value, acc2.buying_power.value, delta=1e-6)
+        self.assertEqual(acc1.positions.keys(), acc2.positions.keys())
+        for asset, position in acc1.positions.items():
+            self.assertEqual(position.size, acc2.positions[asset].size)
+            self.assertAlmostEqual(position.avg_price, acc2.positions[asset].avg_price)
+
+    def test_simbroker_latency(self):
+        broker = SimBroker(latency=timedelta(milliseconds=250))
+        start = datetime.now(timezone.utc)
+        broker.sync(Event(start, []))
+        order = Order(self.apple, 100, 110.0)
+        broker.place_orders([order])
+        for ms in (0, 100, 200):
+            event = Event(start + timedelta(milliseconds=ms), [Trade(self.apple, 100.0, 1000)])
+            account = broker.sync(event)
+            self.assertEqual([order], account.orders)
+            self.assertFalse(account.positions)
+            self.assertEqual(1_000_000.0, account.buying_power.value)
+
+        event = Event(start + timedelta(milliseconds=300), [Trade(self.apple, 100.0, 1000)])
+        account = broker.sync(event)
+        self.assertEqual(Decimal(100), account.get_position_size(self.apple))
+
+        # cancellations are subject to the same latency
+        latencies = iter([timedelta(seconds=2), timedelta(seconds=1)])
+        broker = SimBroker(latency=lambda: next(latencies))
+        broker.sync(Event(start, []))
+        order = Order(self.apple, 100, 90.0)
+        broker.place_orders([order])
+        broker.place_orders([order.cancel()])
+        account = broker.sync(Event(start + timedelta(seconds=1), []))
+        self.assertEqual([order], account.orders)
+        account = broker.sync(Event(start + timedelta(seconds=2), []))
+        self.assertEqual([order], account.orders)
+        self.assertNotEqual(1_000_000.0, account.buying_power.value)
+
+        # a trader sees the orders that haven't reached the broker yet, so it doesn't place duplicate orders
+        broker = SimBroker(slippage=0.0, latency=timedelta(days=3))
+        trader = FlexTrader()
+        placed = []
+        for day in range(3):
+            event = Event(start + timedelta(days=day), [Trade(self.apple, 100.0, 1000)])
+            account = broker.sync(event)
+            orders = trader.create_orders([Signal(self.apple, 1.0)], event, account)
+            broker.place_orders(orders)
+            placed += orders
+        self.assertEqual(1, len(placed))
+        account = broker.sync(Event(start + timedelta(days=3), [Trade(self.apple, 100.0, 1000)]))
+        self.assertEqual(placed[0].size, account.get_position_size(self.apple))
+
+    def test_transaction_log(self):
+        log = TransactionLog()
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        tesla = Stock("TSLA")
+        log.append(start, self.apple, Decimal(100), 100.0, 1.0)
+        log.append(start + timedelta(hours=1), tesla, Decimal(-10), 200.0)
+        log.append(start + timedelta(hours=2), self.apple, Decimal(-150), 110.0, 1.5)
+        log.append(start + timedelta(hours=3), self.apple, Decimal(50), 105.0)
+        log.append(start + timedelta(hours=5), tesla, Decimal(10), 210.0)
+
+        # the SELL of 150 AAPL closes the first trade and opens a short position
+        trades = log.trades()
+        self.assertEqual([998.0, 249.5, -100.0], trades["pnl"].tolist())
+        self.assertAlmostEqual(2 / 3, log.win_rate())
+        self.assertEqual(timedelta(hours=7) / 3, log.avg_holding_time())
+        self.assertAlmostEqual(1147.5, log.realized_pnl())
+
+        broker = SimBroker(slippage=0.0)
+        broker.place_orders([Order(self.apple, 100, 110.0)])
+        broker.sync(self._create_event(100.0))
+        broker.place_orders([Order(self.apple, -100, 90.0)])
+        broker.sync(self._create_event(105.0))
+        self.assertEqual(2, len(broker.transactions))
+        self.assertAlmostEqual(500.0, broker.transactions.realized_pnl())
+
+    def test_margin_simbroker(self):
+        broker = MarginSimBroker(Amount(USD, 10_000.0), slippage=0.0, validate=True)
+        broker.place_orders([Order(self.apple, 150, 110.0)])
+        account = broker.sync(self._create_event(100.0))
+        self.assertEqual(Decimal(150), account.get_position_size(self.apple))
+        self.assertAlmostEqual(-5_000.0, account.convert(account.cash))
+
+        # equity 10_000, initial margin 7_500, so the excess equity supports 5_000 extra contract value
+        self.assertAlmostEqual(5_000.0, account.buying_power.value)
+        initial, maintenance = broker.margin_requirements()
+        self.assertAlmostEqual(7_500.0, initial)
+        self.assertAlmostEqual(3_750.0, maintenance)
+
+        # equity 1_000 is below the maintenance margin of 1_500
+        account = broker.sync(self._create_event(40.0))
+        self.assertEqual(Decimal(0), account.get_position_size(self.apple))
+        self.assertAlmostEqual(1_000.0, account.equity_value())
+
+    def test_margin_liquidation_costs(self):
+        tesla = Stock("TSLA")
+        broker = MarginSimBroker(Amount(USD, 10_000.0), slippage=0.0, commission=RegulatoryFee(0.3, 0.0))
+        broker.place_orders([Order(self.apple, 100, 110.0), Order(tesla, 50, 110.0)])
+        now = datetime.now(timezone.utc)
+        broker.sync(Event(now, [Trade(self.apple, 100.0, 1000), Trade(tesla, 100.0, 1000)]))
+
+        # equity 1_600 is below the maintenance margin of 1_650. Closing AAPL alone would be enough without fees,
+        # but the fee of 1_320 on the closing trade means TSLA has to be closed as well.
+        account = broker.sync(Event(now + timedelta(days=1), [Trade(self.apple, 44.0, 1000), Trade(tesla, 44.0, 1000)]))
+        self.assertFalse(account.positions)
+        self.assertAlmostEqual(1_600.0 - 0.3 * 4_400.0 - 0.3 * 2_200.0, account.equity_value())
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,9 +1,23 @@
 import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 
-from roboquant.strategies import EMACrossover, MultiStrategy, IBSStrategy
+from roboquant.asset import Stock
+from roboquant.event import Event, Trade
+from roboquant.signal import Signal
+from roboquant.strategies import EMACrossover, MultiStrategy, IBSStrategy, Strategy
 from tests.common import run_strategy
 
 
+class _FixedStrategy(Strategy):
+
+    def __init__(self, *signals: Signal):
+        self.signals = list(signals)
+
+    def create_signals(self, event):
+        return self.signals
+
+
 class TestStrategy(unittest.TestCase):
 
     def test_ibs_strategy(self):
@@ -14,6 +28,21 @@ class TestStrategy(unittest.TestCase):
         strategy = EMACrossover(13, 26)
         run_strategy(strategy, self)
 
+    def test_ema_universe(self):
+        strategy = EMACrossover(2, 4)
+        assets = [Stock(f"S{i}") for i in range(100)]
+        now = datetime.now(timezone.utc)
+        signals = []
+        for step in range(10):
+            # even assets trend down and then up, odd assets trend up and then down
+            change = step if step < 6 else 18 - 2 * step
+            items = [Trade(asset, 100.0 + (change if i % 2 else -change), 100) for i, asset in enumerate(assets)]
+            signals += strategy.create_signals(Event(now, items))
+
+        self.assertEqual(100, len(signals))
+        for signal in signals:
+            self.assertEqual(int(signal.asset.symbol[1:]) % 2 == 0, signal.is_buy)
+
     def test_multi_strategies(self):
         strategy = MultiStrategy(
             EMACrossover(13, 26),
@@ -22,6 +51,40 @@ class TestStrategy(unittest.TestCase):
         )
         run_strategy(strategy, self)
 
+    def test_multi_strategies_filters(self):
+        a, b = Stock("A"), Stock("B")
+        children = [
+            _FixedStrategy(Signal(a, 1.0), Signal(b, 0.5)),
+            _FixedStrategy(Signal(b, -0.5), Signal(a, 0.5)),
+            _FixedStrategy(Signal(a, 0.0)),
+        ]
+        event = Event(datetime.now(timezone.utc), [])
+
+        with ThreadPoolExecutor(3) as executor:
+            for ex in (None, executor):
+                signals = MultiStrategy(*children, signal_filter="mean", executor=ex).create_signals(event)
+                self.assertEqual([Signal(a, 0.5)], signals)
+
+                signals = MultiStrategy(*children, signal_filter="first", executor=ex).create_signals(event)
+                self.assertEqual({a: 1.0, b: 0.5}, {s.asset: s.rating for s in signals})
+
+                signals = MultiStrategy(*children, signal_filter="last", executor=ex).create_signals(event)
+                self.assertEqual({a: 0.0, b: -0.5}, {s.asset: s.rating for s in signals})
+
+                signals = MultiStrategy(*children, executor=ex).create_signals(event)
+                self.assertEqual(5, len(signals))
+
+    def test_multi_strategies_executor(self):
+        with ThreadPoolExecutor(3) as executor:
+            strategy = MultiStrategy(
+                EMACrossover(13, 26),
+                EMACrossover(5, 12),
+                EMACrossover(2, 10),
+                signal_filter="mean",
+                executor=executor,
+            )
+            run_strategy(strategy, self)
+
 
 if __name__ == "__main__":
     unittest.main()
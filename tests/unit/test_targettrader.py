@@ -0,0 +1,85 @@
+import random
+import unittest
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from roboquant.account import Account, Position
+from roboquant.asset import Stock
+from roboquant.event import Event, Trade
+from roboquant.monetary import Amount, JPY, NoConversion, StaticConversion, USD, Wallet
+from roboquant.run import run
+from roboquant.signal import Signal, SignalType
+from roboquant.strategies import EMACrossover
+from roboquant.traders import TargetPortfolioTrader
+from tests.common import get_feed
+
+
+class TestTargetPortfolioTrader(unittest.TestCase):
+
+    assets = [Stock(f"S{i}") for i in range(20)]
+
+    def _account(self):
+        account = Account()
+        account.cash = Wallet(Amount(USD, 900_000.0))
+        account.buying_power = Amount(USD, 900_000.0)
+        account.positions[self.assets[0]] = Position(Decimal(1000), 100.0, 100.0)
+        return account
+
+    def _event(self):
+        return Event(datetime.now(timezone.utc), [Trade(asset, 100.0, 1000) for asset in self.assets])
+
+    def test_target_portfolio(self):
+        rnd = random.Random(7)
+        signals = [Signal(asset, rnd.uniform(-1.0, 1.0)) for asset in self.assets]
+        trader = TargetPortfolioTrader(max_position_perc=0.1, max_order_perc=0.08, shorting=True)
+        orders = trader.create_orders(signals, self._event(), self._account())
+
+        # the result doesn't depend on the order of the signals
+        rnd.shuffle(signals)
+        shuffled = trader.create_orders(signals, self._event(), self._account())
+        self.assertEqual(sorted((o.asset.symbol, o.size) for o in orders), sorted((o.asset.symbol, o.size) for o in shuffled))
+
+        equity = 1_000_000.0
+        gross = 0.0
+        for order in orders:
+            self.assertLessEqual(abs(order.value()), 0.08 * equity + 100.0)
+            gross += abs(order.value())
+        self.assertLessEqual(gross, 0.95 * equity + 100.0 * len(orders))
+
+    def test_constraints(self):
+        account = self._account()
+        signals = [Signal(self.assets[0], 0.0, SignalType.ENTRY), Signal(self.assets[1], -1.0), Signal(self.assets[2], 1.0)]
+        trader = TargetPortfolioTrader(max_turnover_perc=0.05)
+        orders = trader.create_orders(signals, self._event(), account)
+
+        # an ENTRY signal cannot close a position, and shorting is not allowed
+        self.assertEqual(1, len(orders))
+        self.assertEqual(self.assets[2], orders[0].asset)
+        self.assertEqual(Decimal(500), orders[0].size)
+
+    def test_multi_currency(self):
+        Amount.register_converter(StaticConversion(USD, {JPY: 150.0}))
+        try:
+            account = self._account()
+            del account.positions[self.assets[0]]
+            # a position of 15M JPY is worth 100K USD
+            jp_asset = Stock("JP1", JPY)
+            account.positions[jp_asset] = Position(Decimal(1000), 15_000.0, 15_000.0)
+
+            signals = [Signal(self.assets[1], 1.0)]
+            trader = TargetPortfolioTrader(max_position_perc=1.0, max_order_perc=1.0)
+            orders = trader.create_orders(signals, self._event(), account)
+
+            # the budget is 95% of the equity minus the exposure of the JPY position
+            self.assertEqual(1, len(orders))
+            self.assertEqual(Decimal(8500), orders[0].size)
+        finally:
+            Amount.register_converter(NoConversion())
+
+    def test_run(self):
+        account = run(get_feed(), EMACrossover(), TargetPortfolioTrader())
+        self.assertTrue(account.positions)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,13 @@
+from concurrent.futures import ThreadPoolExecutor
 import unittest
 
+import numpy as np
+
+from roboquant import ta
+from roboquant.event import Event
 from roboquant.signal import Signal
-from roboquant.strategies import TaStrategy, OHLCVBuffer
-from tests.common import run_strategy
+from roboquant.strategies import TaStrategy, TaBatchStrategy, TaCrossSectionalStrategy, OHLCVBuffer
+from tests.common import get_feed, run_strategy
 
 
 class _MyStrategy(TaStrategy):
@@ -18,6 +23,40 @@ class _MyStrategy(TaStrategy):
             return Signal.sell(asset)
         return None
 
+
+def _sma(values, period):
+    return values[-period:].mean()
+
+
+class _MyBatchStrategy(TaBatchStrategy):
+    """The same strategy as _MyStrategy, but evaluated for all the assets in a single batch"""
+
+    def __init__(self, size, executor=None):
+        super().__init__(size)
+        self.executor = executor
+
+    def process_batch(self, assets, ohlcv):
+        close = ohlcv[3]
+        sma12 = ta.batch(_sma, close, executor=self.executor, period=12)
+        sma26 = ta.batch(_sma, close, executor=self.executor, period=26)
+        return [Signal.buy(assets[i]) for i in np.flatnonzero(sma12 > sma26)] + [
+            Signal.sell(assets[i]) for i in np.flatnonzero(sma12 < sma26)
+        ]
+
+
+class _MyCrossSectionalStrategy(TaCrossSectionalStrategy):
+    """Example that buys the top-2 and sells the bottom-2 assets based on their momentum z-score"""
+
+    def process_universe(self, data, valid, assets):
+        close = data[:, :, 3]
+        ok = valid[:, 0] & valid[:, -1]
+        momentum = np.where(ok, close[:, -1] / close[:, 0] - 1.0, np.nan)
+        std = np.nanstd(momentum)
+        zscore = (momentum - np.nanmean(momentum)) / std if std > 0.0 else np.zeros_like(momentum)
+        ranked = np.argsort(np.where(ok, zscore, 0.0))
+        return [Signal.buy(assets[i]) for i in ranked[-2:]] + [Signal.sell(assets[i]) for i in ranked[:2]]
+
+
 class TestTaStrategy(unittest.TestCase):
 
     def test_my_ta_strategy(self):
@@ -25,6 +64,40 @@ class TestTaStrategy(unittest.TestCase):
         strategy = _MyStrategy(27)
         run_strategy(strategy, self)
 
+    def test_batch_strategy(self):
+        strategy = _MyBatchStrategy(27)
+        run_strategy(strategy, self)
+
+        # the batch strategy creates the same signals as the per asset strategy
+        feed = get_feed()
+        with ThreadPoolExecutor(2) as executor:
+            strategies = [_MyStrategy(27), _MyBatchStrategy(27), _MyBatchStrategy(27, executor)]
+            for event in feed.play():
+                signals = [{(s.asset, s.rating) for s in strategy.create_signals(event)} for strategy in strategies]
+                self.assertEqual(signals[0], signals[1])
+                self.assertEqual(signals[0], signals[2])
+
+    def test_batch(self):
+        values = np.arange(12.0).reshape(3, 4)
+        np.testing.assert_array_equal([3.0, 7.0, 11.0], ta.batch(lambda x: x[-1], values))
+        result = ta.batch(lambda x, y: (x.min(), y.max()), values, values * 2)
+        np.testing.assert_array_equal([[0.0, 6.0], [4.0, 14.0], [8.0, 22.0]], result)
+
+    def test_cross_sectional_strategy(self):
+        strategy = _MyCrossSectionalStrategy(20)
+        run_strategy(strategy, self)
+
+    def test_cross_sectional_no_bars(self):
+        strategy = _MyCrossSectionalStrategy(20)
+        events = list(get_feed().play())[:20]
+        signals = []
+        for event in events:
+            signals = strategy.create_signals(event)
+        self.assertTrue(signals)
+
+        # events without bars, like heartbeats, don't repeat the signals of the previous event
+        self.assertEqual([], strategy.create_signals(Event.empty(events[-1].time)))
+
 
 if __name__ == "__main__":
     unittest.main()